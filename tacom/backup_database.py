@@ -1,50 +1,48 @@
-import gzip
+import argparse
 import os
-import subprocess
-from datetime import datetime
+import sys
 
 import environ
+from pgbackup import COMPRESSIONS, FORMATS, BackupError, backup, read_manifest
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
 env = environ.Env()
-
 env.read_env(env_file=f"{SCRIPT_DIR}/tacom/.env")
 backup_dir = "db_backup"
 
-timestamp_str = datetime.now().strftime("%Y-%m-%d_%H%M%S")
-
-db_config = env.db()
-cmd = [
-    "pg_dump",
-    "-U",
-    db_config["USER"],
-    "-h",
-    db_config["HOST"],
-    "-p",
-    str(db_config["PORT"]),
-    "-d",
-    db_config["NAME"],
-    "-n",
-    db_config["OPTIONS"]["options"].split("=")[1],
-]
-
-os.environ["PGPASSWORD"] = db_config["PASSWORD"]
-
-
-with gzip.open(
-    f"{SCRIPT_DIR}/{backup_dir}/backup_{timestamp_str}.gz",
-    "wb",
-) as f:
-    popen = subprocess.Popen(
-        cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True
+parser = argparse.ArgumentParser(
+    description="Back up the database with parallel pg_dump to db_backup directory."
+)
+parser.add_argument("--format", choices=FORMATS, default="directory")
+parser.add_argument(
+    "--compression",
+    choices=COMPRESSIONS,
+    help="zstd with pg_dump 16 or newer, gzip with older versions by default",
+)
+parser.add_argument("--level", type=int, help="Compression level")
+parser.add_argument(
+    "-j", "--jobs", type=int, help="Parallel pg_dump jobs (CPU count by default)"
+)
+parser.add_argument("--output-dir", default=os.path.join(SCRIPT_DIR, backup_dir))
+args = parser.parse_args()
+
+try:
+    path = backup(
+        env.db(),
+        args.output_dir,
+        backup_format=args.format,
+        compression=args.compression,
+        level=args.level,
+        jobs=args.jobs,
     )
-
-    # Iterate over stdout until the process finishes
-    for stdout_line in iter(popen.stdout.readline, ""):
-        if stdout_line:
-            f.write(stdout_line.encode("utf-8"))
-
-    # Close the stdout after reading
-    popen.stdout.close()
-    popen.wait()  # Ensure the process finishes
+except BackupError as e:
+    print(e, file=sys.stderr)
+    sys.exit(1)
+
+manifest = read_manifest(path)
+print(
+    f"Backup written to {path}: {manifest['size']} bytes, "
+    f"dump {manifest['timings']['dump']:.1f} s, "
+    f"checksums {manifest['timings']['checksums']:.1f} s."
+)
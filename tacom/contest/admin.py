@@ -1,6 +1,7 @@
 import copy
 
-from django.contrib import admin
+import requests
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin
 from django.db.models import QuerySet, TextField
 from django.shortcuts import redirect
@@ -9,11 +10,13 @@ from django.utils.translation import gettext_lazy as _
 from simple_history.admin import SimpleHistoryAdmin
 from tinymce.widgets import TinyMCE
 
+from . import judging, payu
 from .models import (
     Category,
     Contest,
     EntriesPackage,
     Entry,
+    OutboxEmail,
     Participant,
     Payment,
     PaymentMethod,
@@ -59,9 +62,30 @@ def duplicate_contest(_modeladmin, _request, queryset):
             getattr(obj_copy, m2m_field.name).set(field.all())
 
 
+@admin.action(description=_("Allocate judging tables"))
+def allocate_judging_tables(modeladmin, request, queryset):
+    for contest in queryset:
+        plan = judging.plan_judging(contest)
+        judging.save_plan(contest, plan)
+        modeladmin.message_user(
+            request,
+            _(
+                "%(contest)s: judging tables: %(tables)s, judges not seated: "
+                "%(unassigned)s, tables without judges: %(judgeless)s."
+            )
+            % {
+                "contest": contest,
+                "tables": len(plan.tables),
+                "unassigned": len(plan.unassigned_judges),
+                "judgeless": len(plan.judgeless_tables),
+            },
+            messages.WARNING if plan.judgeless_tables else messages.INFO,
+        )
+
+
 @admin.register(Contest)
 class ContestAdmin(admin.ModelAdmin):
-    actions = [duplicate_contest]
+    actions = [duplicate_contest, allocate_judging_tables]
     # save_on_top = True
     model = Contest
     inlines = (CategoriesForContest,)
@@ -256,7 +280,19 @@ class ParticipantAdmin(admin.ModelAdmin):
     )
 
     def get_queryset(self, request):
-        return super().get_queryset(request).prefetch_related("entries")
+        return super().get_queryset(request).with_entries_stats()
+
+    @admin.display(description=_("Registered"), ordering="total_entries")
+    def entries_total(self, obj):
+        return obj.entries_total
+
+    @admin.display(description=_("Paid"), ordering="paid_entries")
+    def entries_paid(self, obj):
+        return obj.entries_paid
+
+    @admin.display(description=_("Received"), ordering="received_entries")
+    def entries_received(self, obj):
+        return obj.entries_received
 
 
 @admin.register(Entry)
@@ -270,10 +306,12 @@ class EntryAdmin(admin.ModelAdmin):
         "name",
         "is_paid",
         "is_received",
+        "rank",
         "extra_info",
     ]
     readonly_fields = [
         "modified_at",
+        "rank",
     ]
     list_filter = [
         "is_paid",
@@ -281,6 +319,7 @@ class EntryAdmin(admin.ModelAdmin):
         "category__contest__title",
         "category__style__name",
     ]
+    list_select_related = ("brewer", "category__style")
     search_fields = [
         "brewer__username",
         "brewer__first_name",
@@ -319,8 +358,29 @@ class PaymentMethodAdmin(admin.ModelAdmin):
     pass
 
 
+@admin.action(description=_("Check status of PayU payment(s)"))
+def check_payu_status(modeladmin, request, queryset: QuerySet[Payment]):
+    payments = queryset.filter(method__code="payu", code__isnull=False).select_related(
+        "method"
+    )
+    try:
+        checked, changed, errors = payu.reconcile_payments(payments)
+    except requests.RequestException as e:
+        modeladmin.message_user(
+            request, _("Cannot connect to PayU: %s") % e, messages.ERROR
+        )
+        return
+    modeladmin.message_user(
+        request,
+        _("Checked: %(checked)s, changed: %(changed)s, errors: %(errors)s.")
+        % {"checked": checked, "changed": changed, "errors": errors},
+        messages.WARNING if errors else messages.SUCCESS,
+    )
+
+
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
+    actions = [check_payu_status]
     list_display = (
         "id",
         "user",
@@ -329,11 +389,23 @@ class PaymentAdmin(admin.ModelAdmin):
         "status",
         "amount",
         "currency",
+        "status_checked_at",
     )
+    list_filter = ("contest", "method", "status")
+    list_select_related = ("user", "method")
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "to", "subject", "status", "attempts", "sent_at")
+    list_filter = ("status",)
+    readonly_fields = ("created_at", "sent_at", "last_error")
 
 
 @admin.register(ScoreSheet)
 class ScoreSheetAdmin(SimpleHistoryAdmin):
+    list_display = ("entry", "total_points", "final_round")
+    list_select_related = ("entry",)
     formfield_overrides = {
         TextField: {"widget": TinyMCE(attrs={"cols": 80, "rows": 100})},
     }
@@ -358,39 +430,53 @@ class RebateCodeAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
 
 
+def set_judge_applications_status(modeladmin, request, queryset, status):
+    # single UPDATE, applications are not loaded
+    updated = queryset.exclude(status=status).update(status=status)
+    modeladmin.message_user(
+        request,
+        _("Applications changed to %(status)s: %(count)s.")
+        % {"status": JudgeInCompetition.Status(status).label, "count": updated},
+    )
+
+
 @admin.action(description=_("Reject judge application(s)"))
 def reject_judge_applications(
-    _modeladmin, _request, queryset: QuerySet[JudgeInCompetition]
+    modeladmin, request, queryset: QuerySet[JudgeInCompetition]
 ):
-    objs_to_update = list(queryset)
-    for obj in objs_to_update:
-        obj.status = JudgeInCompetition.Status.REJECTED
-    JudgeInCompetition.objects.bulk_update(objs_to_update, ["status"])
+    set_judge_applications_status(
+        modeladmin, request, queryset, JudgeInCompetition.Status.REJECTED
+    )
 
 
 @admin.action(description=_("Approve judge application(s)"))
 def approve_judge_applications(
-    _modeladmin, _request, queryset: QuerySet[JudgeInCompetition]
+    modeladmin, request, queryset: QuerySet[JudgeInCompetition]
 ):
-    objs_to_update = list(queryset)
-    for obj in objs_to_update:
-        obj.status = JudgeInCompetition.Status.APPROVED
-    JudgeInCompetition.objects.bulk_update(objs_to_update, ["status"])
+    set_judge_applications_status(
+        modeladmin, request, queryset, JudgeInCompetition.Status.APPROVED
+    )
 
 
 @admin.register(JudgeInCompetition)
 class JudgeApplicationAdin(admin.ModelAdmin):
     actions = [approve_judge_applications, reject_judge_applications]
-    list_display = ("contest", "user", "status", "mjp_level", "bjcp", "other")
+    list_display = ("contest", "user", "status", "table", "mjp_level", "bjcp", "other")
     list_filter = ("contest", "status")
-    # list_select_related = ("user", "contest", "judge")
+    # certification is joined (LEFT OUTER JOIN), missing one is cached as well
+    list_select_related = ("user__judgecertification", "contest", "table")
 
-    @admin.display(description="MJP", ordering="user__judgecertification__mjp_level")
-    def mjp_level(self, obj):
+    @staticmethod
+    def certification(obj) -> JudgeCertification | None:
         try:
-            return obj.user.judgecertification.mjp_level
+            return obj.user.judgecertification
         except JudgeCertification.DoesNotExist:
-            return "-"
+            return None
+
+    @admin.display(description="MJP", ordering="user__judgecertification__mjp_level")
+    def mjp_level(self, obj):
+        certification = self.certification(obj)
+        return certification.mjp_level if certification else "-"
 
     @admin.display(
         description="BJCP",
@@ -398,19 +484,15 @@ class JudgeApplicationAdin(admin.ModelAdmin):
         boolean=True,
     )
     def bjcp(self, obj):
-        try:
-            return obj.user.judgecertification.is_mead_bjcp
-        except JudgeCertification.DoesNotExist:
-            return False
+        certification = self.certification(obj)
+        return certification.is_mead_bjcp if certification else False
 
     @admin.display(
         description="Other", ordering="user__judgecertification__other_description"
     )
     def other(self, obj):
-        try:
-            return obj.user.judgecertification.other_description
-        except JudgeCertification.DoesNotExist:
-            return "-"
+        certification = self.certification(obj)
+        return certification.other_description if certification else "-"
 
     # make sure to filter by one contest by defaul
     def changelist_view(self, request, extra_context=None):
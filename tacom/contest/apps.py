@@ -7,3 +7,6 @@ class ContestConfig(AppConfig):
     name = 'contest'
     # Translators: name of the app that's displayed in admin panel for managing data
     verbose_name = _('Competitions')
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
@@ -0,0 +1,113 @@
+from time import time_ns
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import translation
+
+from .models import Contest, Entry
+
+RESULTS_CACHE_TIMEOUT = 60 * 60
+USER_GROUPS_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def is_cache_shared() -> bool:
+    """
+    Whether the cache is seen by other processes, so invalidation by signals
+    and caching by management commands reach the web workers.
+    """
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache))
+
+
+def results_version_key(slug):
+    return f"results:{slug}:version"
+
+
+def results_version(slug) -> int:
+    # initial version differs after cache flush, so old pages are never matched
+    return cache.get_or_set(results_version_key(slug), time_ns, None)
+
+
+def bump_results_version(slug):
+    """
+    Invalidates cached results of the contest (in all languages).
+    """
+    try:
+        cache.incr(results_version_key(slug))
+    except ValueError:
+        cache.set(results_version_key(slug), time_ns(), None)
+
+
+def results_cache_key(slug, language):
+    return f"results:{slug}:{language}:{results_version(slug)}"
+
+
+def render_results(contest: Contest, language) -> str:
+    entries = (
+        Entry.objects.filter(category__contest=contest)
+        .filter(place__gt=0)
+        .with_score()
+        .order_by("category__style__name", "place", "-score")
+        .select_related("brewer", "category__style")
+    )
+    with translation.override(language):
+        return render_to_string(
+            "contest/contest/results.html",
+            {"entries": entries, "best_of_show": contest.bos_entry},
+        )
+
+
+def get_results(slug, language) -> str | None:
+    """
+    Rendered results of the contest, None if results are not published.
+    Results are cached until any of them change, see signals.
+    """
+    key = results_cache_key(slug, language)
+    results = cache.get(key)
+    if results is None:
+        contest = (
+            Contest.objects.select_related(
+                "bos_entry__brewer", "bos_entry__category__style"
+            )
+            .filter(slug=slug)
+            .first()
+        )
+        # not cached, so results show up once autopublish time passes
+        if contest is None or not contest.show_results:
+            return None
+        results = render_results(contest, language)
+        cache.set(key, results, RESULTS_CACHE_TIMEOUT)
+    return results
+
+
+def user_groups_key(user_id):
+    return f"user:{user_id}:groups"
+
+
+def get_user_groups(user) -> frozenset[str]:
+    """
+    Names of user's groups, cached per user until membership changes
+    (see signals) and memoized on the user object for the request.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    groups = getattr(user, "_group_names", None)
+    if groups is None:
+        groups = cache.get(user_groups_key(user.pk))
+        if groups is None:
+            groups = frozenset(user.groups.values_list("name", flat=True))
+            cache.set(user_groups_key(user.pk), groups, USER_GROUPS_CACHE_TIMEOUT)
+        user._group_names = groups
+    return groups
+
+
+def invalidate_user_groups(user_ids):
+    """
+    Drops cached groups of the users now and once the transaction commits,
+    as requests running meanwhile may cache the old groups again.
+    """
+    keys = [user_groups_key(user_id) for user_id in user_ids]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
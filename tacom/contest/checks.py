@@ -0,0 +1,19 @@
+from django.core.checks import Tags, Warning, register
+
+from .cache import is_cache_shared
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    if is_cache_shared():
+        return []
+    return [
+        Warning(
+            "Cache is local to the process.",
+            hint=(
+                "Set CACHE_URL to a cache shared by all web workers, otherwise "
+                "they keep serving stale results and revoked groups."
+            ),
+            id="contest.W001",
+        )
+    ]
@@ -0,0 +1,99 @@
+import csv
+
+from django.utils.translation import gettext_lazy as _
+
+from .models import Contest, Entry
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # XLSX export is optional
+    Workbook = None
+
+EXPORT_CHUNK_SIZE = 2000
+
+# (value, column header)
+EXPORT_COLUMNS = (
+    ("code", _("Code")),
+    ("category__style__name", _("Style")),
+    ("name", _("Name")),
+    ("brewer__last_name", _("Last name")),
+    ("brewer__first_name", _("First name")),
+    ("brewer__email", _("Email")),
+    ("is_paid", _("Is paid")),
+    ("is_received", _("Is received")),
+    ("place", _("Place")),
+    ("score", _("Score")),
+)
+
+# cells starting with these are evaluated as formulas by spreadsheets
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def xlsx_available() -> bool:
+    return Workbook is not None
+
+
+def export_header():
+    return [str(header) for _value, header in EXPORT_COLUMNS]
+
+
+def export_rows(contest: Contest, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Entries of the contest as tuples of EXPORT_COLUMNS values.
+    Rows are fetched in chunks, so memory use does not depend
+    on number of entries.
+    """
+    return (
+        Entry.objects.filter(category__contest=contest)
+        .with_score()
+        .order_by("code")
+        .values_list(*(value for value, _header in EXPORT_COLUMNS))
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def escape_formula(value):
+    """
+    Text cell as literal text: entry names and brewers' data are user input,
+    so they must not become formulas (CSV injection).
+    """
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def export_cells(contest: Contest, chunk_size=EXPORT_CHUNK_SIZE):
+    for row in export_rows(contest, chunk_size):
+        yield [escape_formula(value) for value in row]
+
+
+class Echo:
+    """
+    File-like object returning written value, for streaming csv.writer output.
+    """
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(contest: Contest, chunk_size=EXPORT_CHUNK_SIZE):
+    # byte order mark lets spreadsheets detect UTF-8
+    writer = csv.writer(Echo())
+    yield "\ufeff" + writer.writerow(export_header())
+    for row in export_cells(contest, chunk_size):
+        yield writer.writerow(row)
+
+
+def write_xlsx(contest: Contest, file, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Writes entries of the contest to `file` as XLSX workbook.
+    Write-only workbook keeps rows on disk instead of in memory.
+    """
+    if Workbook is None:
+        raise ImportError("XLSX export requires openpyxl")
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=str(_("Entries")))
+    sheet.append(export_header())
+    for row in export_cells(contest, chunk_size):
+        sheet.append(row)
+    workbook.save(file)
@@ -1,4 +1,19 @@
 from .contest_factory import ContestFactory, ContestState, PeriodState
+from .entry_factory import (
+    CategoryFactory,
+    EntryFactory,
+    ScoreSheetFactory,
+    StyleFactory,
+)
 from .user_factory import UserFactory
 
-__all__ = ["ContestFactory", "ContestState", "PeriodState", "UserFactory"]
+__all__ = [
+    "CategoryFactory",
+    "ContestFactory",
+    "ContestState",
+    "EntryFactory",
+    "PeriodState",
+    "ScoreSheetFactory",
+    "StyleFactory",
+    "UserFactory",
+]
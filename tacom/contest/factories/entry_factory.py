@@ -0,0 +1,51 @@
+import random
+
+import factory
+from contest.models import Category, Entry, ScoreSheet, Style
+from factories import RandomLocaleDjangoModelFactory
+
+from .contest_factory import ContestFactory
+from .user_factory import UserFactory
+
+
+class StyleFactory(RandomLocaleDjangoModelFactory):
+    class Meta:
+        model = Style
+
+    name = factory.Sequence(lambda n: f"Style {n}")
+    description = factory.Faker(locale="en_US", provider="paragraph", nb_sentences=3)
+    description_pl = factory.Faker(locale="pl_PL", provider="paragraph", nb_sentences=3)
+
+
+class CategoryFactory(RandomLocaleDjangoModelFactory):
+    class Meta:
+        model = Category
+
+    contest = factory.SubFactory(ContestFactory)
+    style = factory.SubFactory(StyleFactory)
+    entries_limit = 1
+
+
+class EntryFactory(RandomLocaleDjangoModelFactory):
+    class Meta:
+        model = Entry
+
+    category = factory.SubFactory(CategoryFactory)
+    brewer = factory.SubFactory(UserFactory, profile=True)
+    name = factory.LazyAttribute(lambda o: o.faker.word()[:50])
+    sweetness = factory.LazyFunction(lambda: random.choice(Entry.SweetnessLevel.values))
+    carbonation = factory.LazyFunction(
+        lambda: random.choice(Entry.CarbonationLevel.values)
+    )
+
+
+class ScoreSheetFactory(RandomLocaleDjangoModelFactory):
+    class Meta:
+        model = ScoreSheet
+
+    entry = factory.SubFactory(EntryFactory)
+    appearance_score = factory.Faker("random_int", min=0, max=12)
+    aroma_score = factory.Faker("random_int", min=0, max=30)
+    flavor_score = factory.Faker("random_int", min=0, max=32)
+    finish_score = factory.Faker("random_int", min=0, max=14)
+    overall_score = factory.Faker("random_int", min=0, max=12)
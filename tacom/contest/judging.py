@@ -0,0 +1,199 @@
+"""
+Judging plan: received entries split into tables (flights) with approved judges.
+
+Entries of a category stay at one table unless the category is larger than
+a table should be, tables get balanced numbers of entries, and judges are never
+seated at a table judging their own entries. Every table gets a judge, if
+the conflicts allow it, before any table gets a second one.
+"""
+
+import heapq
+from dataclasses import dataclass, field
+from math import ceil
+
+from django.db import transaction
+from django.db.models import Q, QuerySet
+
+from .models import Contest, Entry, User
+from .models.judges import JudgeInCompetition, JudgingTable
+
+JUDGES_PER_TABLE = 2
+
+
+@dataclass
+class Table:
+    number: int
+    entries: list = field(default_factory=list)
+    categories: list = field(default_factory=list)
+    brewers: set = field(default_factory=set)
+    judges: list = field(default_factory=list)
+
+
+@dataclass
+class JudgingPlan:
+    tables: list[Table]
+    # judges with own entries at every table
+    unassigned_judges: list = field(default_factory=list)
+    # numbers of tables without judges (too few judges or conflicts),
+    # their entries are judged only by staff until the plan is changed
+    judgeless_tables: list = field(default_factory=list)
+
+
+def split_categories(entries, capacity) -> list[tuple]:
+    """
+    (category, entries) pieces: whole categories, larger ones than `capacity`
+    are cut into pieces filling whole tables and the rest.
+    """
+    categories = {}
+    for entry in entries:
+        categories.setdefault(entry[1], []).append(entry)
+    return [
+        (category, category_entries[start : start + capacity])  # noqa: E203
+        for category, category_entries in categories.items()
+        for start in range(0, len(category_entries), capacity)
+    ]
+
+
+def allocate(entries, judges, tables=None, judges_per_table=JUDGES_PER_TABLE):
+    """
+    Plans judging of `entries` - (entry id, category id, brewer id) rows
+    in judging order - by `judges` - (judge id, user id) rows.
+
+    Category pieces are assigned, largest first, to the table with fewest entries
+    (longest processing time first). First judges of tables are chosen by
+    matching, so conflicts leave as few tables without judges as possible.
+    Other judges are seated, most constrained first, at the table with fewest
+    judges among tables without their own entries.
+    """
+    entries = list(entries)
+    judges = list(judges)
+    count = tables or max(len(judges) // judges_per_table, 1)
+    count = max(min(count, len(entries)), 1)
+    plan = JudgingPlan([Table(number) for number in range(1, count + 1)])
+
+    capacity = ceil(len(entries) / count) or 1
+    pieces = split_categories(entries, capacity)
+    # stable sort keeps judging order of categories of the same size
+    pieces.sort(key=lambda piece: len(piece[1]), reverse=True)
+    loads = [(0, table.number) for table in plan.tables]
+    for category, piece in pieces:
+        load, number = heapq.heappop(loads)
+        table = plan.tables[number - 1]
+        table.entries.extend(entry[0] for entry in piece)
+        table.brewers.update(entry[2] for entry in piece)
+        if category not in table.categories:
+            table.categories.append(category)
+        heapq.heappush(loads, (load + len(piece), number))
+    # categories may not fill all tables
+    plan.tables = [table for table in plan.tables if table.entries]
+    for number, table in enumerate(plan.tables, 1):
+        table.number = number
+
+    allowed = {
+        judge: [table for table in plan.tables if user not in table.brewers]
+        for judge, user in judges
+    }
+    # most constrained judges first
+    judges = sorted(judges, key=lambda judge: len(allowed[judge[0]]))
+    plan.unassigned_judges = [judge for judge, _user in judges if not allowed[judge]]
+    for judge, table in first_judges(plan.tables, judges, allowed).items():
+        table.judges.append(judge)
+    seated = {judge for table in plan.tables for judge in table.judges}
+    for judge, _user in judges:
+        if judge in seated or not allowed[judge]:
+            continue
+        table = min(
+            allowed[judge],
+            key=lambda table: (len(table.judges), -len(table.entries), table.number),
+        )
+        table.judges.append(judge)
+    plan.judgeless_tables = [table.number for table in plan.tables if not table.judges]
+    return plan
+
+
+def first_judges(tables, judges, allowed) -> dict:
+    """
+    {judge: table} seating one judge at as many tables as possible: maximum
+    bipartite matching by augmenting paths, judges tried in the given order.
+    """
+    allowed_numbers = {
+        judge: {table.number for table in judge_tables}
+        for judge, judge_tables in allowed.items()
+    }
+    seats = {}
+
+    def seat(table, visited):
+        for judge, _user in judges:
+            if judge in visited or table.number not in allowed_numbers[judge]:
+                continue
+            visited.add(judge)
+            # judge is free or the judge's table gets another one
+            if judge not in seats or seat(seats[judge], visited):
+                seats[judge] = table
+                return True
+        return False
+
+    for table in tables:
+        seat(table, set())
+    return seats
+
+
+def plan_judging(
+    contest: Contest, tables=None, judges_per_table=JUDGES_PER_TABLE
+) -> JudgingPlan:
+    entries = (
+        Entry.objects.filter(category__contest=contest, is_received=True, is_paid=True)
+        .order_by("category__style__name", "code")
+        .values_list("id", "category_id", "brewer_id")
+    )
+    judges = (
+        JudgeInCompetition.approved.filter(contest=contest)
+        .order_by("pk")
+        .values_list("id", "user_id")
+    )
+    return allocate(entries, judges, tables, judges_per_table)
+
+
+@transaction.atomic
+def save_plan(contest: Contest, plan: JudgingPlan):
+    """
+    Replaces the stored judging plan of the contest.
+    """
+    JudgingTable.objects.filter(contest=contest).delete()
+    tables = JudgingTable.objects.bulk_create(
+        JudgingTable(contest=contest, number=table.number) for table in plan.tables
+    )
+    JudgingTable.entries.through.objects.bulk_create(
+        (
+            JudgingTable.entries.through(judgingtable=stored, entry_id=entry)
+            for stored, table in zip(tables, plan.tables)
+            for entry in table.entries
+        ),
+        batch_size=1000,
+    )
+    JudgeInCompetition.objects.bulk_update(
+        [
+            JudgeInCompetition(pk=judge, table=stored)
+            for stored, table in zip(tables, plan.tables)
+            for judge in table.judges
+        ],
+        ["table"],
+        batch_size=500,
+    )
+
+
+def judge_entries(entries: QuerySet, user: User, contest_slug) -> QuerySet:
+    """
+    Entries, which the user may judge: never own ones and, once the judging plan
+    of the contest is stored, only these at user's table (staff judges all).
+    Entries received or paid after the plan was stored are not at any table,
+    every judge sees them until the plan is allocated again.
+    """
+    entries = entries.exclude(brewer=user)
+    if user.is_staff:
+        return entries
+    if JudgingTable.objects.filter(contest__slug=contest_slug).exists():
+        entries = entries.filter(
+            Q(judging_tables__judges__user=user) | Q(judging_tables=None)
+        )
+    return entries
@@ -0,0 +1,187 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from math import floor
+from pathlib import Path
+
+from django.conf import settings
+
+from .models import Contest, EntriesPackage, Entry
+
+try:
+    from reportlab.graphics.barcode.code128 import Code128
+    from reportlab.lib.units import mm
+    from reportlab.pdfbase.pdfmetrics import registerFont, stringWidth
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfgen.canvas import Canvas
+except ImportError:  # PDF labels are optional, HTML printout is used instead
+    Canvas = None
+
+LABELS_CHUNK_SIZE = 1000
+
+
+def pdf_available() -> bool:
+    # built-in PDF fonts have no Polish characters, so a TrueType font is required
+    return Canvas is not None and bool(getattr(settings, "LABELS_FONT", None))
+
+
+@dataclass(frozen=True)
+class LabelLayout:
+    """
+    Grid of labels on a page, dimensions in millimetres.
+    Defaults match common A4 sheets of 3 x 8 labels (70 x 37 mm).
+    """
+
+    columns: int = 3
+    rows: int = 8
+    page_width: float = 210
+    page_height: float = 297
+    margin: float = 0
+    padding: float = 3
+
+    @property
+    def label_width(self):
+        return (self.page_width - 2 * self.margin) / self.columns
+
+    @property
+    def label_height(self):
+        return (self.page_height - 2 * self.margin) / self.rows
+
+
+@lru_cache
+def label_positions(layout: LabelLayout) -> tuple[tuple[float, float], ...]:
+    """
+    Bottom left corners of labels on a page (in points), row by row from the top.
+    """
+    return tuple(
+        (
+            (layout.margin + column * layout.label_width) * mm,
+            (layout.page_height - layout.margin - (row + 1) * layout.label_height) * mm,
+        )
+        for row in range(layout.rows)
+        for column in range(layout.columns)
+    )
+
+
+@lru_cache
+def register_font(path) -> str:
+    """
+    Registers TrueType font once per process, returns its name.
+    """
+    name = f"Label-{Path(path).stem}"
+    registerFont(TTFont(name, path))
+    return name
+
+
+def label_font() -> str:
+    """
+    settings.LABELS_FONT, path to TrueType font with Polish characters
+    (eg. DejaVuSans.ttf).
+    """
+    return register_font(settings.LABELS_FONT)
+
+
+@lru_cache(maxsize=4096)
+def fit_text(text: str, font: str, size: float, width: float) -> tuple[str, float]:
+    """
+    Text and font size to draw `text` within `width`: font is reduced down
+    to 2/3 of `size`, then text is truncated. Style names repeat on labels,
+    so results are cached.
+    """
+    text_width = stringWidth(text, font, size)
+    if text_width <= width:
+        return text, size
+    size = max(floor(size * width / text_width * 10) / 10, size * 2 / 3)
+    if stringWidth(text, font, size) <= width:
+        return text, size
+    while text and stringWidth(text + "…", font, size) > width:
+        text = text[:-1]
+    return text + "…", size
+
+
+class LabelRenderer:
+    """
+    Draws bottle labels (style, entry code, judging language and optionally
+    a Code 128 barcode of the code) on consecutive pages of a PDF.
+    reportlab keeps finished pages in memory and writes the whole document
+    to the file on save, only entries are read in chunks.
+    """
+
+    def __init__(self, file, layout=LabelLayout(), copies=2, barcodes=True):
+        self.layout = layout
+        self.copies = copies
+        self.barcodes = barcodes
+        self.font = label_font()
+        self.positions = label_positions(layout)
+        self.canvas = Canvas(
+            file, pagesize=(layout.page_width * mm, layout.page_height * mm)
+        )
+        self.canvas.setLineWidth(0.2)
+        self.slot = 0
+        self.pages = 0
+
+    def draw_label(self, x, y, code, style, language):
+        canvas = self.canvas
+        width = self.layout.label_width * mm
+        height = self.layout.label_height * mm
+        padding = self.layout.padding * mm
+        center = x + width / 2
+        # cut guides
+        canvas.rect(x, y, width, height)
+
+        text, size = fit_text(style, self.font, 9, width - 2 * padding)
+        canvas.setFont(self.font, size)
+        canvas.drawCentredString(center, y + height - padding - size, text)
+
+        code_size = 20
+        canvas.setFont(self.font, code_size)
+        code_y = y + height / 2 - (0 if self.barcodes else code_size / 2)
+        canvas.drawCentredString(center, code_y, str(code))
+        canvas.setFont(self.font, 8)
+        canvas.drawRightString(x + width - padding, y + padding, language.upper())
+
+        if self.barcodes:
+            barcode = Code128(str(code), barHeight=7 * mm, barWidth=0.3 * mm)
+            barcode.drawOn(canvas, center - barcode.width / 2, y + padding)
+
+    def add(self, code, style, language):
+        for _copy in range(self.copies):
+            if self.slot == len(self.positions):
+                self.canvas.showPage()
+                self.slot = 0
+            if self.slot == 0:
+                self.pages += 1
+            self.draw_label(*self.positions[self.slot], code, style, language)
+            self.slot += 1
+
+    def render(self, rows) -> int:
+        """
+        Draws labels for (code, style name, language) rows, returns number of pages.
+        """
+        for row in rows:
+            self.add(*row)
+        self.canvas.save()
+        return self.pages
+
+
+def render_labels(rows, file, **kwargs) -> int:
+    """
+    Writes PDF with labels for (code, style name, language) rows to `file`,
+    see LabelRenderer for options. Returns number of pages.
+    """
+    return LabelRenderer(file, **kwargs).render(rows)
+
+
+def label_rows(entries, chunk_size=LABELS_CHUNK_SIZE):
+    return (
+        entries.order_by("code")
+        .values_list("code", "category__style__name", "brewer__language")
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def package_label_rows(package: EntriesPackage):
+    return label_rows(Entry.objects.filter(packages=package))
+
+
+def contest_label_rows(contest: Contest):
+    return label_rows(Entry.objects.filter(category__contest=contest))
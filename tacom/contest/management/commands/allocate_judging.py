@@ -0,0 +1,59 @@
+from time import perf_counter
+
+from contest import judging
+from contest.models import Contest
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Split received entries of the contest into judging tables and seat "
+        "approved judges at them. The stored plan replaces the previous one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("slug", help="Slug of the contest")
+        parser.add_argument(
+            "--tables", type=int, help="Number of tables (by judges by default)"
+        )
+        parser.add_argument(
+            "--judges-per-table", type=int, default=judging.JUDGES_PER_TABLE
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Print the plan without storing it"
+        )
+
+    def handle(self, *args, **options):
+        contest = Contest.objects.filter(slug=options["slug"]).first()
+        if contest is None:
+            raise CommandError(f"Contest not found: {options['slug']}")
+
+        start = perf_counter()
+        plan = judging.plan_judging(
+            contest, options["tables"], options["judges_per_table"]
+        )
+        if not options["dry_run"]:
+            judging.save_plan(contest, plan)
+        elapsed = perf_counter() - start
+
+        for table in plan.tables:
+            self.stdout.write(
+                f"Table {table.number}: {len(table.entries)} entries, "
+                f"{len(table.categories)} categories, {len(table.judges)} judges"
+            )
+        if plan.unassigned_judges:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Judges with entries at every table: {len(plan.unassigned_judges)}"
+                )
+            )
+        if plan.judgeless_tables:
+            numbers = ", ".join(map(str, plan.judgeless_tables))
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Tables without judges (judged by staff only): {numbers}"
+                )
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f"{contest.slug}: planned in {elapsed:.2f} s.")
+        )
@@ -0,0 +1,205 @@
+import random
+from statistics import median
+from time import perf_counter
+
+from contest.models import Entry, Payment, PaymentMethod
+from contest.models.judges import JudgeInCompetition
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+# models, which indexes are benchmarked
+INDEXED_MODELS = (Entry, Payment, JudgeInCompetition)
+
+# hot view queries: name -> function(seeded data) returning the queryset
+HOT_QUERIES = {
+    "user entries in contest": lambda d: Entry.objects.filter(
+        brewer=d["brewer"], category__contest=d["contest"]
+    ),
+    "category results": lambda d: Entry.objects.filter(
+        category=d["category"], place__gt=0
+    ),
+    "entries to deliver": lambda d: Entry.objects.filter(
+        category__contest=d["contest"], is_paid=True, is_received=False
+    ),
+    "entry by code": lambda d: Entry.objects.filter(
+        category__contest=d["contest"], code=d["code"]
+    ),
+    "pending transfers of contest": lambda d: Payment.pending.filter(
+        contest=d["contest"]
+    ),
+    "pending payu payments": lambda d: Payment.pending_payu.filter(code__isnull=False),
+    "approved judges of contest": lambda d: JudgeInCompetition.objects.filter(
+        contest=d["contest"], status=JudgeInCompetition.Status.APPROVED
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed large contests with the factories and report EXPLAIN plans and "
+        "timings of hot queries with and without the indexes. "
+        "Everything is rolled back at the end, but the tables stay locked "
+        "while it runs, so it refuses to run outside DEBUG unless forced."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--contests", type=int, default=5)
+        parser.add_argument("--categories", type=int, default=20)
+        parser.add_argument(
+            "--entries", type=int, default=5000, help="Entries per contest"
+        )
+        parser.add_argument("--brewers", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=20, help="Runs of each query")
+        parser.add_argument(
+            "--no-explain", action="store_true", help="Report timings only"
+        )
+        parser.add_argument(
+            "--i-know-this-locks-tables",
+            action="store_true",
+            help="Run without DEBUG, eg. on a copy of the production database",
+        )
+
+    def handle(self, *args, **options):
+        # seeded rows and dropped indexes lock entries, payments and judges
+        # tables (ACCESS EXCLUSIVE on PostgreSQL) until the end of the run
+        if not (settings.DEBUG or options["i_know_this_locks_tables"]):
+            raise CommandError(
+                "Benchmark locks entries, payments and judges tables, "
+                "run it with DEBUG or --i-know-this-locks-tables."
+            )
+        try:
+            from contest import factories
+        except ImportError as e:
+            raise CommandError(
+                f"Factories need development requirements (requirements/local.txt): {e}"
+            )
+
+        with transaction.atomic():
+            self.stdout.write("Seeding...")
+            data = self.seed(factories, options)
+            self.analyze()
+
+            indexed = self.measure(data, options)
+            self.drop_indexes()
+            self.analyze()
+            not_indexed = self.measure(data, options)
+
+            self.report(indexed, not_indexed, options)
+            transaction.set_rollback(True)
+
+    def seed(self, factories, options):
+        brewers = factories.UserFactory.build_batch(options["brewers"], profile=True)
+        for i, brewer in enumerate(brewers):
+            brewer.username = f"benchmark-{i}"
+        brewers = factories.UserFactory._meta.model.objects.bulk_create(brewers)
+        methods = [
+            PaymentMethod.objects.get_or_create(
+                code=code, defaults={"name": code, "name_pl": code}
+            )[0]
+            for code in ("transfer", "payu")
+        ]
+
+        contests = []
+        for _ in range(options["contests"]):
+            contest = factories.ContestFactory()
+            categories = factories.CategoryFactory.create_batch(
+                options["categories"], contest=contest, entries_limit=options["entries"]
+            )
+            entries = []
+            for code in range(1000, 1000 + options["entries"]):
+                entry = factories.EntryFactory.build(
+                    category=random.choice(categories),
+                    brewer=random.choice(brewers),
+                    code=code,
+                    is_paid=random.random() < 0.8,
+                    is_received=random.random() < 0.5,
+                )
+                entry.place = random.choice((1, 2, 3)) if random.random() < 0.05 else 0
+                entries.append(entry)
+            Entry.objects.bulk_create(entries, batch_size=1000)
+
+            Payment.objects.bulk_create(
+                [
+                    Payment(
+                        method=random.choice(methods),
+                        user=brewer,
+                        contest=contest,
+                        amount=10,
+                        currency="PLN",
+                        status=random.choice(Payment.PaymentStatus.values),
+                        code=str(i),
+                    )
+                    for i, brewer in enumerate(brewers)
+                ],
+                batch_size=1000,
+            )
+            JudgeInCompetition.objects.bulk_create(
+                [
+                    JudgeInCompetition(
+                        user=brewer,
+                        contest=contest,
+                        status=random.choice(JudgeInCompetition.Status.values),
+                    )
+                    for brewer in random.sample(brewers, min(len(brewers), 100))
+                ]
+            )
+            contests.append((contest, categories, entries))
+
+        contest, categories, entries = contests[0]
+        entry = random.choice(entries)
+        return {
+            "contest": contest,
+            "category": categories[0],
+            "brewer": entry.brewer,
+            "code": entry.code,
+        }
+
+    def analyze(self):
+        # refresh planner statistics
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def drop_indexes(self):
+        # DROP INDEX is rolled back together with the seeded data
+        # (schema editor itself cannot be entered inside SQLite transaction)
+        sql = connection.schema_editor().sql_delete_index
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            for model in INDEXED_MODELS:
+                for index in model._meta.indexes:
+                    cursor.execute(
+                        sql
+                        % {
+                            "table": quote(model._meta.db_table),
+                            "name": quote(index.name),
+                        }
+                    )
+
+    def measure(self, data, options):
+        results = {}
+        for name, query in HOT_QUERIES.items():
+            queryset = query(data)
+            timings = []
+            for _ in range(options["repeat"]):
+                start = perf_counter()
+                list(queryset.all())
+                timings.append((perf_counter() - start) * 1000)
+            plan = "" if options["no_explain"] else queryset.explain()
+            results[name] = (median(timings), plan)
+        return results
+
+    def report(self, indexed, not_indexed, options):
+        self.stdout.write(f"\n{'query':<32}{'no indexes':>14}{'indexes':>14}")
+        for name in HOT_QUERIES:
+            self.stdout.write(
+                f"{name:<32}"
+                f"{not_indexed[name][0]:>11.2f} ms"
+                f"{indexed[name][0]:>11.2f} ms"
+            )
+        if options["no_explain"]:
+            return
+        for name in HOT_QUERIES:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{name}"))
+            self.stdout.write(f"no indexes:\n{not_indexed[name][1]}")
+            self.stdout.write(f"indexes:\n{indexed[name][1]}")
@@ -0,0 +1,39 @@
+from contest import export
+from contest.models import Contest
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Export entries of the contest as CSV (to standard output by default) "
+        "or XLSX (needs openpyxl). Entries are read in chunks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("slug", help="Slug of the contest")
+        parser.add_argument("--format", choices=("csv", "xlsx"), default="csv")
+        parser.add_argument(
+            "-o", "--output", help="Output file, required for XLSX export"
+        )
+        parser.add_argument("--chunk-size", type=int, default=export.EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        contest = Contest.objects.filter(slug=options["slug"]).first()
+        if contest is None:
+            raise CommandError(f"Contest not found: {options['slug']}")
+
+        if options["format"] == "xlsx":
+            if not export.xlsx_available():
+                raise CommandError("XLSX export requires openpyxl.")
+            if not options["output"]:
+                raise CommandError("XLSX export requires --output.")
+            export.write_xlsx(contest, options["output"], options["chunk_size"])
+            return
+
+        lines = export.csv_lines(contest, options["chunk_size"])
+        if not options["output"]:
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+        with open(options["output"], "w", encoding="utf-8", newline="") as file:
+            file.writelines(lines)
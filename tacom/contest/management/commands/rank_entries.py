@@ -0,0 +1,52 @@
+from time import perf_counter
+
+from contest import ranking
+from contest.models import Category, Contest
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Rank scored entries of the contest by category, optionally qualify "
+        "finalists and apply proposed places."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("slug", help="Slug of the contest")
+        parser.add_argument(
+            "--finalists-top",
+            type=int,
+            help="Qualify entries ranked up to this place (ties included)",
+        )
+        parser.add_argument(
+            "--finalists-threshold",
+            type=float,
+            help="Qualify entries scoring at least this many points",
+        )
+        parser.add_argument(
+            "--apply-places",
+            action="store_true",
+            help="Set proposed places, replacing the entered ones",
+        )
+
+    def handle(self, *args, **options):
+        contest = Contest.objects.filter(slug=options["slug"]).first()
+        if contest is None:
+            raise CommandError(f"Contest not found: {options['slug']}")
+        categories = Category.objects.filter(contest=contest)
+
+        start = perf_counter()
+        ranked = ranking.update_ranks(categories)
+        self.stdout.write(f"Ranks changed: {ranked}")
+        top, threshold = options["finalists_top"], options["finalists_threshold"]
+        if top is not None or threshold is not None:
+            finalists = ranking.qualify_finalists(categories, top, threshold)
+            self.stdout.write(f"Finalists: {finalists}")
+        if options["apply_places"]:
+            placed = ranking.apply_places(categories)
+            self.stdout.write(f"Places changed: {placed}")
+        elapsed = perf_counter() - start
+
+        self.stdout.write(
+            self.style.SUCCESS(f"{contest.slug}: ranked in {elapsed:.2f} s.")
+        )
@@ -0,0 +1,90 @@
+from time import sleep
+
+import requests
+from contest import payu
+from contest.models import Contest, Payment
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Check statuses of pending PayU payments. "
+        "Older payments are checked less often."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Number of payments checked in one batch",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=8,
+            help="Number of concurrent requests to PayU",
+        )
+        parser.add_argument(
+            "--contest",
+            help="Slug of the contest, which payments are checked",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Check all pending payments, regardless of when last checked",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and poll for payments due for a check",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=60,
+            help="Seconds to wait between runs (with --loop)",
+        )
+
+    def handle(self, *args, **options):
+        if (
+            options["contest"]
+            and not Contest.objects.filter(slug=options["contest"]).exists()
+        ):
+            raise CommandError(f"Contest not found: {options['contest']}")
+        while True:
+            checked, changed, errors = self.reconcile(options)
+            if checked:
+                style = self.style.WARNING if errors else self.style.SUCCESS
+                self.stdout.write(
+                    style(f"Checked: {checked}, changed: {changed}, errors: {errors}.")
+                )
+            if not options["loop"]:
+                return
+            sleep(options["interval"])
+
+    def reconcile(self, options):
+        if options["force"]:
+            payments = Payment.pending_payu.filter(code__isnull=False)
+        else:
+            payments = payu.payments_due_for_check()
+        if options["contest"]:
+            payments = payments.filter(contest__slug=options["contest"])
+        pks = list(payments.values_list("pk", flat=True))
+
+        checked = changed = errors = 0
+        batch_size = options["batch_size"]
+        for i in range(0, len(pks), batch_size):
+            batch = Payment.objects.filter(pk__in=pks[i : i + batch_size])  # noqa: E203
+            try:
+                batch_result = payu.reconcile_payments(
+                    batch.select_related("method"), options["workers"]
+                )
+            except requests.RequestException as e:
+                # PayU not available, payments are checked in the next run
+                self.stderr.write(self.style.ERROR(f"Cannot connect: {e!r}"))
+                break
+            checked += batch_result[0]
+            changed += batch_result[1]
+            errors += batch_result[2]
+        return checked, changed, errors
@@ -0,0 +1,31 @@
+from contest.models import Contest
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild entries counters (used for registration limits) from entries. "
+        "Run after loading fixtures or manual changes in the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "contests",
+            nargs="*",
+            type=str,
+            help="Slugs of contests to recount (all if none specified)",
+        )
+
+    def handle(self, *args, **options):
+        contests = Contest.objects.all()
+        slugs = options["contests"]
+        if slugs:
+            contests = contests.filter(slug__in=slugs)
+            missing = set(slugs) - set(contests.values_list("slug", flat=True))
+            if missing:
+                raise CommandError(f"Invalid contest slugs: {', '.join(missing)}.")
+
+        for contest in contests:
+            corrected = contest.recount_entries()
+            style = self.style.WARNING if corrected else self.style.SUCCESS
+            self.stdout.write(style(f"{contest.slug}: {corrected} counters corrected."))
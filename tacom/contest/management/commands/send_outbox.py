@@ -0,0 +1,51 @@
+from time import sleep
+
+from contest.models import OutboxEmail
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Send queued emails (eg. entries status notifications) in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Number of messages sent over one SMTP connection",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and poll for new messages",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=30,
+            help="Seconds to wait when there is nothing to send (with --loop)",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = self.drain(options["batch_size"])
+            if sent or failed:
+                style = self.style.WARNING if failed else self.style.SUCCESS
+                self.stdout.write(style(f"Sent: {sent}, failed: {failed}."))
+            if not options["loop"]:
+                return
+            sleep(options["interval"])
+
+    def drain(self, batch_size):
+        sent = failed = 0
+        while True:
+            try:
+                batch_sent, batch_failed = OutboxEmail.objects.send_pending(batch_size)
+            except OSError as e:
+                # SMTP server not available, whole batch stays in the queue
+                self.stderr.write(self.style.ERROR(f"Cannot connect: {e!r}"))
+                return sent, failed
+            sent += batch_sent
+            failed += batch_failed
+            if batch_sent + batch_failed < batch_size:
+                return sent, failed
@@ -0,0 +1,37 @@
+from time import sleep
+
+from contest.cache import bump_results_version
+from contest.models import Contest
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Update stored phase of contests (publication, registration, delivery, "
+        "judging, results), run it periodically, eg. every minute."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and update phases periodically",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=60,
+            help="Seconds between updates (with --loop)",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            for contest in Contest.objects.tick():
+                # bulk update does not send signals
+                bump_results_version(contest.slug)
+                self.stdout.write(
+                    f"{contest.slug}: {contest.previous_phase} -> {contest.phase}"
+                )
+            if not options["loop"]:
+                return
+            sleep(options["interval"])
@@ -0,0 +1,36 @@
+from contest.cache import get_results, is_cache_shared
+from contest.models import Contest
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Render and cache results of contests (all with published results "
+        "by default) in all languages, eg. right after results publication."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("slugs", nargs="*", help="Slugs of the contests")
+
+    def handle(self, *args, **options):
+        if not is_cache_shared():
+            raise CommandError(
+                "Cache is local to this process, results cached here would not "
+                "be used by the server (set CACHE_URL)."
+            )
+        contests = Contest.objects.all()
+        if options["slugs"]:
+            contests = contests.filter(slug__in=options["slugs"])
+            missing = set(options["slugs"]) - {contest.slug for contest in contests}
+            if missing:
+                raise CommandError(f"Contest(s) not found: {', '.join(missing)}")
+
+        for contest in contests:
+            if not contest.show_results:
+                if options["slugs"]:
+                    self.stderr.write(f"{contest.slug}: results are not published.")
+                continue
+            for language, _name in settings.LANGUAGES:
+                get_results(contest.slug, language)
+            self.stdout.write(self.style.SUCCESS(f"{contest.slug}: results cached."))
@@ -1,11 +1,43 @@
-from datetime import date
+from datetime import timedelta
+from logging import getLogger
 
-from django.db import models
-from django.db.models import Q
+from django.contrib.auth.models import UserManager
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import IntegrityError, models, transaction
+from django.db.models import (
+    Avg,
+    Count,
+    Exists,
+    F,
+    FilteredRelation,
+    OuterRef,
+    Q,
+    Subquery,
+)
+from django.db.models.functions import Coalesce, Greatest
 from django.utils import timezone
 
 # from contest.models import Contest
 
+logger = getLogger("models")
+
+
+class ParticipantQuerySet(models.QuerySet):
+    def with_entries_stats(self):
+        """
+        Annotates participants with numbers of their registered, paid
+        and received entries, counted in a single query.
+        """
+        return self.annotate(
+            total_entries=Count("entries"),
+            paid_entries=Count("entries", filter=Q(entries__is_paid=True)),
+            received_entries=Count("entries", filter=Q(entries__is_received=True)),
+        )
+
+
+class ParticipantManager(UserManager.from_queryset(ParticipantQuerySet)):
+    pass
+
 
 class StyleManager(models.Manager):
     def get_by_natural_key(self, slug):
@@ -19,44 +51,149 @@ class ContestManager(models.Manager):
     def get_default(self) -> "Contest":
         return super().get_queryset().first()
 
+    def tick(self, now=None) -> list:
+        """
+        Stores current phase of contests, which phase has changed
+        (eg. autopublish time or a date boundary passed).
+        Returns changed contests.
+        """
+        changed = []
+        for contest in self.all():
+            phase = contest.get_phase(now)
+            if phase != contest.phase:
+                contest.previous_phase = contest.phase
+                contest.phase = phase
+                changed.append(contest)
+        self.bulk_update(changed, ["phase"])
+        return changed
+
 
 class PublishedContestManager(models.Manager):
     def get_queryset(self):
-        now = timezone.now()
-        return (
-            super()
-            .get_queryset()
-            .filter(
-                Q(competition_is_published=True)
-                | Q(competition_autopublish_datetime__lte=now)
-            )
-        )
+        return super().get_queryset().exclude(phase=self.model.Phase.DRAFT)
 
 
 class RegistrableContestManager(models.Manager):
     def get_queryset(self):
+        return super().get_queryset().filter(phase=self.model.Phase.REGISTRATION)
+
+
+class CategoryManager(models.Manager):
+    def with_availability(self, user):
+        """
+        Annotates categories with user's entries count (from entries counters),
+        number of slots left for the user and whether category is full.
+        Counter is LEFT JOINed, so everything comes in a single query.
+        """
+        user_entries_count = Coalesce(models.F("user_counter__count"), 0)
         return (
             super()
             .get_queryset()
-            .filter(competition_is_published=True)
-            .filter(registration_date_from__lte=date.today())
-            .filter(registration_date_to__gte=date.today())
+            .annotate(
+                user_counter=FilteredRelation(
+                    "entries_counters", condition=Q(entries_counters__brewer=user)
+                ),
+                user_entries_count=user_entries_count,
+                slots_left=Greatest(models.F("entries_limit") - user_entries_count, 0),
+                is_full=models.ExpressionWrapper(
+                    Q(entries_limit__lte=user_entries_count),
+                    output_field=models.BooleanField(),
+                ),
+            )
         )
 
+    def availability(self, contest, user):
+        return (
+            self.with_availability(user)
+            .filter(contest=contest)
+            .select_related("style")
+            .order_by("style__name")
+        )
+
+    def with_finals(self):
+        """
+        Annotates categories with number of entries in the final round,
+        number of entries with a place, whether final round is done
+        (3 places assigned or every finalist has a place) and average points
+        of the scoresheets.
+        Counts are subqueries, so other annotations joining entries
+        are not multiplied and everything comes in a single query.
+        """
+        entries = (
+            self.model._meta.get_field("entries")
+            .related_model.objects.filter(category=OuterRef("pk"))
+            .order_by()
+        )
+
+        def count(queryset):
+            return Coalesce(
+                Subquery(
+                    queryset.values("category")
+                    .annotate(count=Count("pk"))
+                    .values("count")
+                ),
+                0,
+            )
 
-class CategoryManager(models.Manager):
-    def full(self, user):
         return (
             super()
             .get_queryset()
-            .filter(entries__brewer=user)
-            .prefetch_related("entries")
-            .annotate(entries_count=models.Count("entries"))
-            .filter(entries_count__gte=models.F("entries_limit"))
+            .annotate(
+                finals_count=count(entries.finalists()),
+                places_count=count(entries.filter(place__gt=0)),
+                is_final_round_done=models.ExpressionWrapper(
+                    Q(places_count=3)
+                    | Q(finals_count=0)
+                    | Q(finals_count=F("places_count")),
+                    output_field=models.BooleanField(),
+                ),
+                average_score=Subquery(
+                    entries.values("category")
+                    .annotate(average=Avg("scoresheets__total_points"))
+                    .values("average")
+                ),
+            )
         )
 
+    def full(self, user):
+        return self.with_availability(user).filter(is_full=True)
+
     def not_full(self, user):
-        return super().get_queryset().exclude(id__in=self.full(user))
+        return self.with_availability(user).filter(is_full=False)
+
+
+class EntryQuerySet(models.QuerySet):
+    def _final_round(self):
+        scoresheets = self.model._meta.get_field("scoresheets").related_model
+        return Exists(
+            scoresheets.objects.filter(entry=OuterRef("pk"), final_round=True)
+        )
+
+    def with_final_round(self):
+        """
+        Annotates entries with `in_final_round`, whether entry has
+        a final round scoresheet.
+        """
+        return self.annotate(in_final_round=self._final_round())
+
+    def finalists(self):
+        return self.filter(self._final_round())
+
+    def with_score(self):
+        """
+        Annotates entries with `score`, average total points of their scoresheets
+        (None when not scored yet).
+        """
+        return self.annotate(score=Avg("scoresheets__total_points"))
+
+    def with_scoresheet(self):
+        """
+        Prefetches scoresheets of entries to `scoresheets_list`,
+        so Entry.scoresheet and Entry.in_final_round do not query them.
+        """
+        return self.prefetch_related(
+            models.Prefetch("scoresheets", to_attr="scoresheets_list")
+        )
 
 
 class PaymentManagerExcludeStatuses(models.Manager):
@@ -78,5 +215,161 @@ class PaymentMethodManager(models.Manager):
         return self.get(code=code)
 
 
+class EntryCodeCounterManager(models.Manager):
+    # first code handed out in a contest without any entries
+    first_code = 1000
+
+    def allocate(self, contest, n=1) -> range:
+        """
+        Reserves `n` consecutive entry codes in the contest and returns them.
+        Counter row is locked by the UPDATE, so concurrent registrations
+        never get the same code and the cost does not depend on number of entries.
+        """
+        if n < 1:
+            raise ValueError("allocate: at least one code has to be requested.")
+        counter = self.filter(contest=contest)
+        with transaction.atomic():
+            if not counter.update(last_code=F("last_code") + n):
+                self._create_counter(contest)
+                counter.update(last_code=F("last_code") + n)
+            last_code = counter.values_list("last_code", flat=True).get()
+        return range(last_code - n + 1, last_code + 1)
+
+    def _create_counter(self, contest):
+        # seed from codes already registered in the contest (one-time scan)
+        maximum_code = contest.categories.aggregate(
+            maximum_code=models.Max("entries__code")
+        )["maximum_code"]
+        try:
+            with transaction.atomic():
+                self.create(
+                    contest=contest, last_code=maximum_code or self.first_code - 1
+                )
+        except IntegrityError:
+            # created by concurrent request in the meantime
+            pass
+
+
+class CounterManager(models.Manager):
+    """
+    Manager of rows holding a `count` column maintained along with the counted rows
+    """
+
+    def increment(self, n=1, **keys):
+        """
+        Adds `n` to the counter identified by `keys`, creating it when needed.
+        Negative `n` never creates a counter (rows may be already gone on cascades).
+        """
+        counter = self.filter(**keys)
+        with transaction.atomic():
+            if counter.update(count=F("count") + n) or n <= 0:
+                return
+            try:
+                with transaction.atomic():
+                    self.create(count=n, **keys)
+            except IntegrityError:
+                # created by concurrent request in the meantime
+                counter.update(count=F("count") + n)
+
+
+class OutboxEmailManager(models.Manager):
+    # delay before n-th retry is retry_delay * 2 ** (n - 1), capped at max_retry_delay
+    retry_delay = timedelta(minutes=1)
+    max_retry_delay = timedelta(hours=6)
+    max_attempts = 8
+
+    def enqueue(self, message: EmailMultiAlternatives, dedup_key=None):
+        """
+        Stores the message to be sent by `manage.py send_outbox`.
+        Message with `dedup_key` that has been already queued is ignored.
+        """
+        html = next(
+            (
+                content
+                for content, mimetype in message.alternatives
+                if mimetype == "text/html"
+            ),
+            "",
+        )
+        fields = {
+            "subject": message.subject,
+            "from_email": message.from_email,
+            "to": list(message.to),
+            "body": message.body,
+            "html": html,
+        }
+        if dedup_key is None:
+            return self.create(**fields)
+        try:
+            with transaction.atomic():
+                return self.create(dedup_key=dedup_key, **fields)
+        except IntegrityError:
+            logger.info(f"OutboxEmail: {dedup_key} already queued, skipping.")
+            return None
+
+    def due(self):
+        return self.filter(
+            status=self.model.Status.PENDING, next_attempt_at__lte=timezone.now()
+        ).order_by("next_attempt_at")
+
+    def send_pending(self, batch_size=100) -> tuple[int, int]:
+        """
+        Sends a batch of due messages over a single SMTP connection.
+        Failed messages are retried with exponential backoff.
+        Returns number of sent and failed messages.
+        """
+        sent, failed = self._send(self.due()[:batch_size])
+        return len(sent), len(failed)
+
+    def send_now(self, emails) -> tuple[list, list]:
+        """
+        Sends given messages right away over a single SMTP connection,
+        skipping ones already sent or claimed by a worker.
+        Returns sent and failed messages, failed ones stay queued for retry.
+        """
+        pks = [email.pk for email in emails]
+        return self._send(
+            self.filter(pk__in=pks, status=self.model.Status.PENDING).order_by()
+        )
+
+    def _send(self, queryset) -> tuple[list, list]:
+        sent, failed = [], []
+        with transaction.atomic():
+            # concurrent workers skip messages claimed by each other
+            emails = list(queryset.select_for_update(skip_locked=True))
+            if not emails:
+                return sent, failed
+
+            now = timezone.now()
+            with get_connection(fail_silently=False) as connection:
+                for email in emails:
+                    try:
+                        # one message at a time, so one refused recipient
+                        # does not fail the rest of the batch
+                        connection.send_messages([email.as_message()])
+                    except Exception as e:
+                        failed.append(email)
+                        email.attempts += 1
+                        email.last_error = repr(e)
+                        if email.attempts >= self.max_attempts:
+                            email.status = self.model.Status.FAILED
+                        email.next_attempt_at = now + min(
+                            self.retry_delay * 2 ** (email.attempts - 1),
+                            self.max_retry_delay,
+                        )
+                        logger.warning(f"OutboxEmail {email.pk}: {email.last_error}")
+                    else:
+                        sent.append(email)
+                        email.attempts += 1
+                        email.status = self.model.Status.SENT
+                        email.sent_at = now
+
+            self.bulk_update(
+                emails,
+                ["status", "attempts", "last_error", "next_attempt_at", "sent_at"],
+            )
+        return sent, failed
+
+
 class DefaultManager(models.Manager):
     pass
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.9 on 2026-10-17 19:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contest", "0028_alter_judgeincompetition_options_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EntryCodeCounter",
+            fields=[
+                (
+                    "contest",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="entry_code_counter",
+                        serialize=False,
+                        to="contest.contest",
+                    ),
+                ),
+                ("last_code", models.IntegerField(verbose_name="Last entry code")),
+            ],
+            options={
+                "verbose_name": "Entry code counter",
+                "verbose_name_plural": "Entry code counters",
+            },
+        ),
+        migrations.AlterField(
+            model_name="entry",
+            name="code",
+            field=models.IntegerField(default=0, editable=False, verbose_name="code"),
+        ),
+    ]
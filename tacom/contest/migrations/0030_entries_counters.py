@@ -0,0 +1,119 @@
+# Generated by Django 5.2.9 on 2026-10-17 19:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def count_existing_entries(apps, schema_editor):
+    Entry = apps.get_model("contest", "Entry")
+    BrewerEntriesCounter = apps.get_model("contest", "BrewerEntriesCounter")
+    ContestEntriesCounter = apps.get_model("contest", "ContestEntriesCounter")
+
+    totals = {}
+    counters = []
+    for row in (
+        Entry.objects.values("category__contest", "category", "brewer")
+        .annotate(count=models.Count("id"))
+        .order_by()
+    ):
+        contest = row["category__contest"]
+        totals[contest] = totals.get(contest, 0) + row["count"]
+        counters.append(
+            BrewerEntriesCounter(
+                contest_id=contest,
+                category_id=row["category"],
+                brewer_id=row["brewer"],
+                count=row["count"],
+            )
+        )
+    BrewerEntriesCounter.objects.bulk_create(counters)
+    ContestEntriesCounter.objects.bulk_create(
+        ContestEntriesCounter(contest_id=contest, count=count)
+        for contest, count in totals.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contest", "0029_entrycodecounter"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ContestEntriesCounter",
+            fields=[
+                (
+                    "contest",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="entries_counter",
+                        serialize=False,
+                        to="contest.contest",
+                    ),
+                ),
+                ("count", models.IntegerField(default=0, verbose_name="Entries")),
+            ],
+            options={
+                "verbose_name": "Contest entries counter",
+                "verbose_name_plural": "Contest entries counters",
+            },
+        ),
+        migrations.CreateModel(
+            name="BrewerEntriesCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("count", models.IntegerField(default=0, verbose_name="Entries")),
+                (
+                    "brewer",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "category",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="entries_counters",
+                        to="contest.category",
+                    ),
+                ),
+                (
+                    "contest",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="contest.contest",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Participant entries counter",
+                "verbose_name_plural": "Participant entries counters",
+                "indexes": [
+                    models.Index(
+                        fields=["contest", "brewer"],
+                        name="contest_bre_contest_84a0f4_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("category", "brewer"), name="unique_entries_counter"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(count_existing_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-17 19:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contest", "0031_outboxemail"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payment",
+            name="status_checked_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
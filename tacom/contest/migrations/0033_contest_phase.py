@@ -0,0 +1,73 @@
+# Generated by Django 5.2.9 on 2026-10-17 19:46
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def contest_phase(contest, now):
+    # frozen copy of contest.utils.contest_phase
+    today = now.date()
+
+    def passed(moment):
+        return moment is not None and moment <= now
+
+    def started(day):
+        return day is not None and day <= today
+
+    if not (
+        contest.competition_is_published
+        or passed(contest.competition_autopublish_datetime)
+    ):
+        return "draft"
+    if contest.result_is_published or passed(contest.result_autopublish_datetime):
+        return "results"
+    if started(contest.registration_date_from) and (
+        contest.registration_date_to is not None
+        and today <= contest.registration_date_to
+    ):
+        return "registration"
+    if started(contest.judging_date_from):
+        return "judging"
+    if started(contest.delivery_date_from):
+        return "delivery"
+    return "published"
+
+
+def set_phases(apps, schema_editor):
+    Contest = apps.get_model("contest", "Contest")
+    now = timezone.now()
+    contests = list(Contest.objects.all())
+    for contest in contests:
+        contest.phase = contest_phase(contest, now)
+    Contest.objects.bulk_update(contests, ["phase"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contest", "0032_payment_status_checked_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contest",
+            name="phase",
+            field=models.CharField(
+                choices=[
+                    ("draft", "Draft"),
+                    ("published", "Published"),
+                    ("registration", "Entry registration"),
+                    ("delivery", "Samples delivery"),
+                    ("judging", "Judging"),
+                    ("results", "Results"),
+                ],
+                db_index=True,
+                default="draft",
+                editable=False,
+                help_text="Updated on save and by manage.py tick_contests",
+                max_length=12,
+                verbose_name="Phase",
+            ),
+        ),
+        migrations.RunPython(set_phases, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.9 on 2026-10-17 19:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contest", "0033_contest_phase"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="entry",
+            index=models.Index(
+                fields=["brewer", "category"], name="contest_ent_brewer__f47cd7_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="entry",
+            index=models.Index(
+                fields=["category", "place"], name="contest_ent_categor_0c8843_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="entry",
+            index=models.Index(
+                fields=["category", "is_paid", "is_received"],
+                name="contest_ent_categor_d10fc7_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="entry",
+            index=models.Index(fields=["code"], name="contest_ent_code_6e764a_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="judgeincompetition",
+            index=models.Index(
+                fields=["contest", "status"], name="contest_jud_contest_2b283e_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                fields=["contest", "method", "status"],
+                name="contest_pay_contest_dd214d_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                fields=["method", "status"], name="contest_pay_method__f71f72_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.9 on 2026-10-17 20:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contest", "0034_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JudgingTable",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("number", models.PositiveSmallIntegerField(verbose_name="Number")),
+                (
+                    "contest",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="judging_tables",
+                        to="contest.contest",
+                    ),
+                ),
+                (
+                    "entries",
+                    models.ManyToManyField(
+                        related_name="judging_tables",
+                        to="contest.entry",
+                        verbose_name="Entries",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Judging table",
+                "verbose_name_plural": "Judging tables",
+                "ordering": ["contest", "number"],
+            },
+        ),
+        migrations.AddField(
+            model_name="judgeincompetition",
+            name="table",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="judges",
+                to="contest.judgingtable",
+                verbose_name="Judging table",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="judgingtable",
+            constraint=models.UniqueConstraint(
+                fields=("contest", "number"), name="unique_judging_table_number"
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.9 on 2026-10-17 20:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contest", "0035_judging_tables"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="entry",
+            name="rank",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Rank"
+            ),
+        ),
+    ]
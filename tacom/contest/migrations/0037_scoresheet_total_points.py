@@ -0,0 +1,43 @@
+# Generated by Django 5.2.9 on 2026-10-17 20:35
+
+from django.db import migrations, models
+from django.db.models import F
+
+TOTAL_POINTS = (
+    F("appearance_score")
+    + F("aroma_score")
+    + F("flavor_score")
+    + F("finish_score")
+    + F("overall_score")
+)
+
+
+def set_total_points(apps, schema_editor):
+    # a single UPDATE per table, history included
+    for name in ("ScoreSheet", "HistoricalScoreSheet"):
+        apps.get_model("contest", name).objects.update(total_points=TOTAL_POINTS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contest", "0036_entry_rank"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="historicalscoresheet",
+            name="total_points",
+            field=models.PositiveIntegerField(
+                db_index=True, default=0, editable=False, verbose_name="Total points"
+            ),
+        ),
+        migrations.AddField(
+            model_name="scoresheet",
+            name="total_points",
+            field=models.PositiveIntegerField(
+                db_index=True, default=0, editable=False, verbose_name="Total points"
+            ),
+        ),
+        migrations.RunPython(set_total_points, migrations.RunPython.noop),
+    ]
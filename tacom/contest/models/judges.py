@@ -1,4 +1,4 @@
-from contest.models import Contest, User
+from contest.models import Contest, Entry, User
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
@@ -61,9 +61,44 @@ class JudgeCertification(models.Model):
         super().save(*args, **kwargs)
 
 
+class JudgingTable(models.Model):
+    """
+    Table (flight) of the contest judging plan, see contest.judging
+    """
+
+    contest = models.ForeignKey(
+        Contest, on_delete=models.CASCADE, related_name="judging_tables"
+    )
+    number = models.PositiveSmallIntegerField(verbose_name=_("Number"))
+    entries = models.ManyToManyField(
+        Entry, related_name="judging_tables", verbose_name=_("Entries")
+    )
+
+    class Meta:
+        ordering = ["contest", "number"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["contest", "number"], name="unique_judging_table_number"
+            )
+        ]
+        verbose_name = _("Judging table")
+        verbose_name_plural = _("Judging tables")
+
+    def __str__(self):
+        return _("Table %(number)s") % {"number": self.number}
+
+
 class JudgeInCompetition(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     contest = models.ForeignKey(Contest, on_delete=models.CASCADE)
+    table = models.ForeignKey(
+        JudgingTable,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="judges",
+        verbose_name=_("Judging table"),
+    )
 
     class Status(models.TextChoices):
         APPLICATION = "application", _("Application")
@@ -83,6 +118,7 @@ class JudgeInCompetition(models.Model):
                 name="unique_judge_application_per_contest",
             )
         ]
+        indexes = [models.Index(fields=["contest", "status"])]
         verbose_name = _("Judge")
         verbose_name_plural = _("Judges")
 
@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from datetime import date, datetime
 from logging import getLogger
 from random import choices
@@ -7,20 +8,27 @@ from uuid import uuid1
 from contest.managers import (
     CategoryManager,
     ContestManager,
+    CounterManager,
     DefaultManager,
+    EntryCodeCounterManager,
+    EntryQuerySet,
+    OutboxEmailManager,
+    ParticipantManager,
     PaymentManagerExcludeStatuses,
     PaymentMethodManager,
     PublishedContestManager,
     RegistrableContestManager,
     StyleManager,
 )
-from contest.utils import mail_entry_status_change
+from contest.utils import contest_phase, mail_entry_status_change
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
+from django.core.mail import EmailMultiAlternatives
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
 from django.db.utils import OperationalError
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.functional import cached_property
 from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
@@ -94,17 +102,23 @@ class Participant(User):
         verbose_name = _("Participant")
         verbose_name_plural = _("Participants")
 
+    objects = ParticipantManager()
+
     @cached_property
     def entries_stats(self):
-        entries = (
-            self.entries.values("is_paid", "is_received")
-            # .annotate(paid=models.Count('is_paid'), received=models.Count('is_received'))
-            .annotate(count=models.Count("is_paid"))
-        )
+        # annotated by ParticipantQuerySet.with_entries_stats()
+        if not hasattr(self, "total_entries"):
+            stats = (
+                Participant.objects.with_entries_stats()
+                .filter(pk=self.pk)
+                .values("total_entries", "paid_entries", "received_entries")
+                .get()
+            )
+            self.__dict__.update(stats)
         return {
-            "total": entries.aggregate(total=models.Sum("count")).get("total") or 0,
-            "paid": entries.filter(is_paid=True).count(),
-            "received": entries.filter(is_received=True).count(),
+            "total": self.total_entries,
+            "paid": self.paid_entries,
+            "received": self.received_entries,
         }
 
     @property
@@ -217,12 +231,32 @@ class Style(models.Model):
         super(Style, self).save(*args, **kwargs)
 
 
+@dataclass(frozen=True)
+class EntriesCount:
+    """
+    Number of entries registered in the contest: in total, by the user
+    and by the user in a single category.
+    """
+
+    total: int
+    user: int
+    category: int
+
+
 class Contest(models.Model):
     class Meta:
         verbose_name = _("contest")
         verbose_name_plural = _("contests")
         ordering = ("-judging_date_from", "-delivery_date_to")
 
+    class Phase(models.TextChoices):
+        DRAFT = "draft", _("Draft")
+        PUBLISHED = "published", _("Published")
+        REGISTRATION = "registration", _("Entry registration")
+        DELIVERY = "delivery", _("Samples delivery")
+        JUDGING = "judging", _("Judging")
+        RESULTS = "results", _("Results")
+
     title = models.CharField(_("title"), max_length=255, blank=False, null=False)
     slug = models.SlugField(
         unique=True,
@@ -323,6 +357,16 @@ class Contest(models.Model):
         verbose_name=_("When to publish results automatically"),
     )
 
+    phase = models.CharField(
+        max_length=12,
+        choices=Phase.choices,
+        default=Phase.DRAFT,
+        editable=False,
+        db_index=True,
+        verbose_name=_("Phase"),
+        help_text=_("Updated on save and by manage.py tick_contests"),
+    )
+
     styles = models.ManyToManyField(
         Style, through="Category", through_fields=("contest", "style")
     )
@@ -402,22 +446,87 @@ class Contest(models.Model):
     def global_limit_left(self):
         if self.entry_global_limit is None:
             return None
-        return max(
-            0,
-            self.entry_global_limit - Entry.objects.filter(category__contest=self)
-            # .filter(is_paid=True)
-            .count(),
+        entries_count = (
+            ContestEntriesCounter.objects.filter(contest=self)
+            .values_list("count", flat=True)
+            .first()
         )
+        return max(0, self.entry_global_limit - (entries_count or 0))
 
     def user_limit_left(self, user):
         if self.entry_user_limit is None:
             return None
-        return max(
-            0,
-            self.entry_user_limit
-            - Entry.objects.filter(category__contest=self).filter(brewer=user).count(),
+        entries_count = BrewerEntriesCounter.objects.filter(
+            contest=self, brewer=user
+        ).aggregate(count=models.Sum("count"))["count"]
+        return max(0, self.entry_user_limit - (entries_count or 0))
+
+    def count_entries(self, user, category, lock=False) -> EntriesCount:
+        """
+        Counts entries needed to validate contest limits with a single query.
+        With lock=True the contest row is locked until the end of the transaction,
+        so concurrent registrations are validated (and saved) one after another.
+        """
+        if lock:
+            list(
+                Contest.objects.select_for_update()
+                .filter(pk=self.pk)
+                .values_list("pk", flat=True)
+            )
+        counts = Entry.objects.filter(category__contest=self).aggregate(
+            total=models.Count("id"),
+            user=models.Count("id", filter=models.Q(brewer=user)),
+            category=models.Count(
+                "id", filter=models.Q(brewer=user, category=category)
+            ),
+        )
+        return EntriesCount(**counts)
+
+    @transaction.atomic
+    def recount_entries(self) -> int:
+        """
+        Rebuilds entries counters of the contest from its entries.
+        Returns number of counters that had to be corrected.
+        """
+        list(
+            Contest.objects.select_for_update()
+            .filter(pk=self.pk)
+            .values_list("pk", flat=True)
+        )
+        actual = {
+            (row["category"], row["brewer"]): row["count"]
+            for row in Entry.objects.filter(category__contest=self)
+            .values("category", "brewer")
+            .annotate(count=models.Count("id"))
+            .order_by()
+        }
+        stored = {
+            (row["category"], row["brewer"]): row["count"]
+            for row in BrewerEntriesCounter.objects.filter(contest=self).values(
+                "category", "brewer", "count"
+            )
+        }
+        corrected = sum(
+            actual.get(key) != stored.get(key) for key in actual.keys() | stored.keys()
         )
 
+        BrewerEntriesCounter.objects.filter(contest=self).delete()
+        BrewerEntriesCounter.objects.bulk_create(
+            BrewerEntriesCounter(
+                contest=self, category_id=category, brewer_id=brewer, count=count
+            )
+            for (category, brewer), count in actual.items()
+        )
+        total = sum(actual.values())
+        counter, created = ContestEntriesCounter.objects.get_or_create(
+            contest=self, defaults={"count": total}
+        )
+        if not created and counter.count != total:
+            counter.count = total
+            counter.save(update_fields=["count"])
+            corrected += 1
+        return corrected
+
     def natural_key(self):
         return (self.slug,)
 
@@ -445,9 +554,15 @@ class Contest(models.Model):
                     self.title + "-" + str(Contest.objects.latest("id").id),
                     allow_unicode=True,
                 )
+        self.phase = self.get_phase()
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "phase"}
 
         super(Contest, self).save(*args, **kwargs)
 
+    def get_phase(self, now=None) -> "Contest.Phase":
+        return Contest.Phase(contest_phase(self, now))
+
     def __str__(self):
         return self.title
 
@@ -505,28 +620,21 @@ class Category(models.Model):
 
     @cached_property
     def is_final_round_done(self):
-        # number of assigned places in finals (up to 3)
-        entries_with_place = self.entries.filter(place__gt=0).count()
-        if entries_with_place == 3:
-            return True
-        # if not 3, check if there were sufficient entries in finals
-        entries_in_final = len(self.entries_in_final)
-        # print(self, entries_in_final)
-        # no final round
-        if entries_in_final == 0:
-            return True
-
-        # all entries in final got their place
-        return entries_in_final == entries_with_place
+        # annotated by CategoryManager.with_finals() in category lists
+        return (
+            Category.objects.with_finals()
+            .filter(pk=self.pk)
+            .values_list("is_final_round_done", flat=True)
+            .get()
+        )
 
     @cached_property
     def entries_in_final(self):
-        return [entry.id for entry in self.entries.all() if entry.in_final_round]
+        return list(self.entries.finalists().values_list("id", flat=True))
 
 
 def code_generator():
-    # for migration only:
-    # return 0
+    # for migrations only, codes are assigned by EntryCodeCounter in Entry.save()
     try:
         maximum_code = Entry.objects.aggregate(models.Max("code"))["code__max"]
     except OperationalError:
@@ -548,9 +656,7 @@ class Entry(models.Model):
         SPARKLING = "sparkling", _("Sparkling")
 
     id = models.UUIDField(primary_key=True, editable=False, default=uuid1)
-    code = models.IntegerField(
-        verbose_name=_("code"), default=code_generator, editable=False
-    )
+    code = models.IntegerField(verbose_name=_("code"), default=0, editable=False)
     category = models.ForeignKey(
         Category,
         on_delete=models.CASCADE,
@@ -578,6 +684,10 @@ class Entry(models.Model):
         decimal_places=2,
     )
     place = models.PositiveIntegerField(verbose_name=_("Place"), default=0)
+    # position in the category by score, maintained by contest.ranking
+    rank = models.PositiveIntegerField(
+        verbose_name=_("Rank"), null=True, blank=True, editable=False
+    )
     is_paid = models.BooleanField(
         default=False, verbose_name=_("Is paid"), editable=False
     )
@@ -586,6 +696,8 @@ class Entry(models.Model):
     )
     modified_at = models.DateTimeField(auto_now=True, editable=False)
 
+    objects = EntryQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("entry")
         verbose_name_plural = _("entries")
@@ -595,6 +707,15 @@ class Entry(models.Model):
             "brewer",
             "name",
         ]
+        indexes = [
+            # user's entries in a contest (brewer, category__contest)
+            models.Index(fields=["brewer", "category"]),
+            # results, finals and Best of Show candidates
+            models.Index(fields=["category", "place"]),
+            # delivery and labels selection
+            models.Index(fields=["category", "is_paid", "is_received"]),
+            models.Index(fields=["code"]),
+        ]
 
     def __str__(self):
         return str(self.code)
@@ -610,14 +731,14 @@ class Entry(models.Model):
                 _(f'Providing "{self.category.style.extra_info_hint}" is mandatory!')
             )
 
-        if Entry.objects.filter(pk=self.id).exists():
-            logger.debug("Entry.clean(): (pk=self.id).exists()")
+        old = Entry.objects.filter(pk=self.pk).order_by().first()
+        if old is not None:
             # update
-            old = Entry.objects.get(pk=self.pk).__dict__
             altered_fields = [
-                key for key, value in self.__dict__.items() if value != old.get(key)
+                key
+                for key, value in self.__dict__.items()
+                if key != "_state" and value != old.__dict__.get(key)
             ]
-            altered_fields.remove("_state")
 
             logger.debug("Entry.clean(): altered_fields={}".format(altered_fields))
             logger.debug("Entry.clean(): can_be_edited={}".format(self.can_be_edited()))
@@ -632,58 +753,64 @@ class Entry(models.Model):
                 if not changes_allowed:
                     raise ValidationError(_("Entry cannot be edited anymore!"))
 
-            extra = 0
+            # only category limit has to be validated if category changed
+            if "category_id" not in altered_fields:
+                return
+
+        contest = self.category.contest
+        with transaction.atomic():
+            count = contest.count_entries(self.brewer, self.category, lock=True)
 
-            # validate category limit if category changed
-            if (
-                "category_id" in altered_fields
-                and self.category.entries_limit
-                <= Entry.objects.filter(category=self.category)
-                .filter(brewer=self.brewer)
-                .count()
-            ):
+        if old is not None:
+            if self.category.entries_limit <= count.category:
                 raise ValidationError(
                     _("Cannot change category due to target category limit")
                 )
-        else:
-            # insert
-            extra = 1
-
-        # validate limits
-        if extra:
-            # verify category limit
-            if (
-                self.category.entries_limit
-                < Entry.objects.filter(category=self.category)
-                .filter(brewer=self.brewer)
-                .count()
-                + extra
-            ):
-                raise ValidationError(
-                    _(
-                        f"You have reached entry limit for this category ({self.category.entries_limit})!"
-                    )
+            return
+
+        # validate limits of a new entry
+        if self.category.entries_limit <= count.category:
+            raise ValidationError(
+                _(
+                    f"You have reached entry limit for this category ({self.category.entries_limit})!"
                 )
+            )
 
-            # verify global limit
-            if (
-                self.category.contest.entry_global_limit is not None
-                and self.category.contest.global_limit_left <= 0
-            ):
-                raise ValidationError(
-                    _(
-                        "This contest has reached maximum number of entries, no more entries can be registered."
-                    )
+        if (
+            contest.entry_global_limit is not None
+            and contest.entry_global_limit <= count.total
+        ):
+            raise ValidationError(
+                _(
+                    "This contest has reached maximum number of entries, no more entries can be registered."
                 )
+            )
 
-            # verify user limit
-            limit_left = self.category.contest.user_limit_left(self.brewer)
-            if limit_left is not None and limit_left <= 0:
-                raise ValidationError(
-                    _(
-                        "You have reached maximum number of entries per user in this competition."
-                    )
+        if (
+            contest.entry_user_limit is not None
+            and contest.entry_user_limit <= count.user
+        ):
+            raise ValidationError(
+                _(
+                    "You have reached maximum number of entries per user in this competition."
                 )
+            )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # needed to move entries counters when category changes
+        instance._loaded_category_id = instance.__dict__.get("category_id")
+        # needed to invalidate cached results when place changes
+        instance._loaded_place = instance.__dict__.get("place")
+        return instance
+
+    def save(self, *args, **kwargs):
+        # entries counters are updated by signals within the same transaction
+        with transaction.atomic():
+            if self._state.adding and not self.code:
+                self.code = EntryCodeCounter.objects.allocate(self.category.contest)[0]
+            super().save(*args, **kwargs)
 
     def delete(self, using=None, keep_parents=False):
         if not self.can_be_deleted():
@@ -699,17 +826,107 @@ class Entry(models.Model):
         # return not self.is_received
         return self.category.contest.registration_date_to >= date.today()
 
+    def prefetched_scoresheets(self) -> list | None:
+        """
+        Scoresheets prefetched by EntryQuerySet.with_scoresheet()
+        or prefetch_related("scoresheets"), None if not prefetched.
+        """
+        if hasattr(self, "scoresheets_list"):
+            return self.scoresheets_list
+        if "scoresheets" in getattr(self, "_prefetched_objects_cache", {}):
+            return list(self.scoresheets.all())
+        return None
+
     @cached_property
     def scoresheet(self):
-        if self.scoresheets.count() == 1:
-            return self.scoresheets.first()
+        scoresheets = self.prefetched_scoresheets()
+        if scoresheets is None:
+            scoresheets = self.scoresheets.all()[:2]
+        if len(scoresheets) == 1:
+            return scoresheets[0]
         return None
 
     @cached_property
     def in_final_round(self):
-        if self.scoresheets.count() == 1:
-            return self.scoresheets.first().final_round
-        return False
+        # annotated by EntryQuerySet.with_final_round()
+        scoresheets = self.prefetched_scoresheets()
+        if scoresheets is None:
+            return self.scoresheets.filter(final_round=True).exists()
+        return any(scoresheet.final_round for scoresheet in scoresheets)
+
+
+class EntryCodeCounter(models.Model):
+    """
+    Last entry code handed out in the contest, see EntryCodeCounterManager.allocate
+    """
+
+    contest = models.OneToOneField(
+        Contest,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="entry_code_counter",
+    )
+    last_code = models.IntegerField(verbose_name=_("Last entry code"))
+
+    objects = EntryCodeCounterManager()
+
+    class Meta:
+        verbose_name = _("Entry code counter")
+        verbose_name_plural = _("Entry code counters")
+
+    def __str__(self):
+        return f"{self.contest}: {self.last_code}"
+
+
+class ContestEntriesCounter(models.Model):
+    """
+    Number of entries registered in the contest, maintained by contest.signals
+    """
+
+    contest = models.OneToOneField(
+        Contest,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="entries_counter",
+    )
+    count = models.IntegerField(default=0, verbose_name=_("Entries"))
+
+    objects = CounterManager()
+
+    class Meta:
+        verbose_name = _("Contest entries counter")
+        verbose_name_plural = _("Contest entries counters")
+
+    def __str__(self):
+        return f"{self.contest}: {self.count}"
+
+
+class BrewerEntriesCounter(models.Model):
+    """
+    Number of participant's entries in the category, maintained by contest.signals
+    """
+
+    contest = models.ForeignKey(Contest, on_delete=models.CASCADE, related_name="+")
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, related_name="entries_counters"
+    )
+    brewer = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    count = models.IntegerField(default=0, verbose_name=_("Entries"))
+
+    objects = CounterManager()
+
+    class Meta:
+        verbose_name = _("Participant entries counter")
+        verbose_name_plural = _("Participant entries counters")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["category", "brewer"], name="unique_entries_counter"
+            )
+        ]
+        indexes = [models.Index(fields=["contest", "brewer"])]
+
+    def __str__(self):
+        return f"{self.category} / {self.brewer}: {self.count}"
 
 
 class EntriesPackage(models.Model):
@@ -757,6 +974,12 @@ class Payment(models.Model):
         ordering = ("-created_at",)
         verbose_name = _("payment")
         verbose_name_plural = _("payments")
+        indexes = [
+            # pending payments of a contest
+            models.Index(fields=["contest", "method", "status"]),
+            # PayU reconciliation across contests
+            models.Index(fields=["method", "status"]),
+        ]
 
     class PaymentStatus(models.TextChoices):
         CREATED = "created", _("Created")
@@ -793,12 +1016,17 @@ class Payment(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     code = models.CharField(max_length=50, null=True)
+    # last time the status has been checked with the payment operator
+    status_checked_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     # managers
     objects = DefaultManager()
     pending = PaymentManagerExcludeStatuses(
         (PaymentStatus.OK, PaymentStatus.FAILED), methods=("transfer",)
     )
+    pending_payu = PaymentManagerExcludeStatuses(
+        (PaymentStatus.OK, PaymentStatus.FAILED), methods=("payu",)
+    )
 
     def __str__(self):
         return f"{self.user}: {self.amount} {self.currency} [{self.status}]"
@@ -809,11 +1037,19 @@ class Payment(models.Model):
             or not self._state.adding
             and Payment.objects.get(pk=self.pk).status != self.status
         ):
-            self.entries.update(is_paid=True)
-            mail_entry_status_change(self.entries.all(), "PAID")
+            Payment.mark_entries_paid([self])
 
         super().save(*args, **kwargs)
 
+    @staticmethod
+    def mark_entries_paid(payments):
+        """
+        Marks entries of completed payments as paid and notifies their brewers.
+        """
+        entries = Entry.objects.filter(payments__in=payments).distinct()
+        entries.update(is_paid=True)
+        mail_entry_status_change(entries, "PAID")
+
 
 class ScoreSheet(models.Model):
     id = models.UUIDField(primary_key=True, editable=False, default=uuid1)
@@ -847,6 +1083,10 @@ class ScoreSheet(models.Model):
     overall_score = models.PositiveIntegerField(
         verbose_name=_("Overal impression score"), validators=(MaxValueValidator(12),)
     )
+    # sum of the scores, stored on save for sorting and aggregating in the database
+    total_points = models.PositiveIntegerField(
+        verbose_name=_("Total points"), default=0, editable=False, db_index=True
+    )
     history = HistoricalRecords()
 
     class Meta:
@@ -856,15 +1096,17 @@ class ScoreSheet(models.Model):
     def __str__(self):
         return f"{self.entry.code}"
 
-    @cached_property
-    def total_points(self):
-        return (
+    def save(self, *args, **kwargs):
+        self.total_points = (
             self.aroma_score
             + self.flavor_score
             + self.appearance_score
             + self.finish_score
             + self.overall_score
         )
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "total_points"}
+        super().save(*args, **kwargs)
 
 
 def rebate_code_generator():
@@ -906,3 +1148,53 @@ class RebateCode(models.Model):
         self.user = user
         self.is_used = True
         self.save()
+
+
+class OutboxEmail(models.Model):
+    """
+    Email waiting to be sent by `manage.py send_outbox`, see OutboxEmailManager
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", _("Pending")
+        SENT = "sent", _("Sent")
+        FAILED = "failed", _("Failed")
+
+    subject = models.CharField(max_length=255, verbose_name=_("Subject"))
+    from_email = models.CharField(max_length=255, verbose_name=_("From"))
+    to = models.JSONField(verbose_name=_("To"))
+    body = models.TextField(verbose_name=_("Text content"))
+    html = models.TextField(blank=True, verbose_name=_("HTML content"))
+    dedup_key = models.CharField(
+        max_length=100,
+        unique=True,
+        null=True,
+        blank=True,
+        help_text=_("Messages with the same key are sent only once"),
+    )
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    objects = OutboxEmailManager()
+
+    class Meta:
+        verbose_name = _("Outbox email")
+        verbose_name_plural = _("Outbox emails")
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+
+    def __str__(self):
+        return f"{', '.join(self.to)}: {self.subject} [{self.status}]"
+
+    def as_message(self, connection=None) -> EmailMultiAlternatives:
+        message = EmailMultiAlternatives(
+            self.subject, self.body, self.from_email, self.to, connection=connection
+        )
+        if self.html:
+            message.attach_alternative(self.html, "text/html")
+        return message
@@ -1,10 +1,21 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from logging import getLogger
+
 import requests
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 from django.utils.translation import get_language
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from .models import Payment, User
 
-PAYU_URL = settings.PAYU_URL
+logger = getLogger("payu")
+
 PAYU_OAUTH_ENDPOINT = "/pl/standard/user/oauth/authorize"
 PAYU_ORDER_ENDPOINT = "/api/v2_1/orders"
 PAYU_STATUS_MAPPING = {
@@ -12,25 +23,110 @@ PAYU_STATUS_MAPPING = {
     "COMPLETED": Payment.PaymentStatus.OK,
     "CANCELED": Payment.PaymentStatus.FAILED,
 }
+# (payment age, time between status checks) - the older the payment,
+# the less likely its status changes, payments older than all are checked
+# with the last interval
+PAYU_CHECK_INTERVALS = (
+    (timedelta(minutes=15), timedelta(minutes=1)),
+    (timedelta(hours=2), timedelta(minutes=5)),
+    (timedelta(days=1), timedelta(minutes=30)),
+    (None, timedelta(hours=6)),
+)
+
+
+class PayUClient:
+    """
+    PayU REST API client.
+    Keeps one pooled HTTP session per process and shares the OAuth token
+    between processes via Django's cache until shortly before it expires.
+    """
+
+    token_cache_key = "payu:oauth_token"
+    # token is refreshed this many seconds before PayU expires it
+    token_expiry_margin = 60
+    # (connect, read) timeouts in seconds
+    timeout = (3.05, 10)
+    retries = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        # creating an order is not idempotent, only connection errors are retried
+        allowed_methods=frozenset({"GET"}),
+    )
+
+    def __init__(self, url=None, client_id=None, client_secret=None):
+        self._url = url
+        self._client_id = client_id
+        self._client_secret = client_secret
+        self.session = requests.Session()
+        adapter = HTTPAdapter(max_retries=self.retries)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @property
+    def url(self):
+        return self._url or settings.PAYU_URL
+
+    def get_token(self):
+        token = cache.get(self.token_cache_key)
+        if token:
+            return token
+        data = {
+            "grant_type": "client_credentials",
+            "client_id": self._client_id or settings.PAYU_CLIENT_ID,
+            "client_secret": self._client_secret or settings.PAYU_CLIENT_SECRET,
+        }
+        r = self.session.post(
+            self.url + PAYU_OAUTH_ENDPOINT, data=data, timeout=self.timeout
+        )
+        r.raise_for_status()
+        response = r.json()
+        token = response["access_token"]
+        ttl = int(response.get("expires_in", 0)) - self.token_expiry_margin
+        if ttl > 0:
+            cache.set(self.token_cache_key, token, ttl)
+        return token
+
+    def invalidate_token(self):
+        cache.delete(self.token_cache_key)
+
+    def request(self, method, endpoint, token=None, **kwargs):
+        """
+        Sends authorized request, token rejected by PayU is renewed once.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        headers = {"Authorization": f"Bearer {token or self.get_token()}"}
+        r = self.session.request(method, self.url + endpoint, headers=headers, **kwargs)
+        if r.status_code == 401:
+            logger.info("PayU: token rejected, renewing.")
+            self.invalidate_token()
+            headers = {"Authorization": f"Bearer {self.get_token()}"}
+            r = self.session.request(
+                method, self.url + endpoint, headers=headers, **kwargs
+            )
+        return r
+
+    def create_order(self, data, token=None):
+        r = self.request(
+            "POST", PAYU_ORDER_ENDPOINT, token, json=data, allow_redirects=False
+        )
+        return r.json()
+
+    def get_order(self, code, token=None):
+        r = self.request("GET", PAYU_ORDER_ENDPOINT + f"/{code}/", token)
+        return r.json()
+
+
+client = PayUClient()
 
 
 def get_oauth_token():
-    data = {
-        "grant_type": "client_credentials",
-        "client_id": settings.PAYU_CLIENT_ID,
-        "client_secret": settings.PAYU_CLIENT_SECRET,
-    }
-    url = PAYU_URL + PAYU_OAUTH_ENDPOINT
-    r = requests.post(url, data=data)
-    return r.json().get("access_token")
+    return client.get_token()
 
 
 def get_order_link(
     payment: Payment, token=None, ip="127.0.0.1", next_url=None, notify_url=None
 ):
-    if not token:
-        token = get_oauth_token()
-    headers = {"Authorization": f"Bearer {token}"}
     data = {
         "customerIp": ip,
         "continueUrl": next_url,
@@ -48,37 +144,133 @@ def get_order_link(
         },
     }
 
-    url = PAYU_URL + PAYU_ORDER_ENDPOINT
-    # print(json.dumps(data, indent=2))
-    r = requests.post(url, headers=headers, json=data, allow_redirects=False)
-    # print(r.json())
-    payment.code = r.json().get("orderId")
+    response = client.create_order(data, token)
+    payment.code = response.get("orderId")
     payment.save()
-    return r.json().get("redirectUri")
+    return response.get("redirectUri")
+
+
+def order_status(response):
+    """
+    Payment status matching PayU order status, None if unknown.
+    """
+    orders = response.get("orders")
+    return PAYU_STATUS_MAPPING.get(orders[0].get("status") if orders else None)
+
+
+def apply_order_status(payment: Payment, response, checked_at=None):
+    """
+    Updates payment with order status returned by PayU.
+    Returns True if payment status has changed.
+    """
+    payment.status_checked_at = checked_at or timezone.now()
+    status = order_status(response)
+    changed = status is not None and payment.status != status
+    # unchanged status is not written back, a notification may have changed it
+    update_fields = ["status_checked_at"]
+    if changed:
+        payment.status = status
+        update_fields.append("status")
+    payment.save(update_fields=update_fields)
+    return changed
 
 
 def update_payment_status(payment: Payment, token=None):
     if payment.method.code != "payu":
-        return
-    if not token:
-        token = get_oauth_token()
-    headers = {"Authorization": f"Bearer {token}"}
-    url = PAYU_URL + PAYU_ORDER_ENDPOINT + f"/{payment.code}/"
-    r = requests.get(url, headers=headers)
-    orders = r.json().get("orders")
-    if not orders:
-        return
-    status = orders[0].get("status")
-    if status in PAYU_STATUS_MAPPING.keys():
-        payment.status = PAYU_STATUS_MAPPING.get(status)
-        payment.save(update_fields=["status"])
-
-
-def update_user_payments_statuses(user: User):
-    payments = (
-        Payment.pending.filter(user=user).filter(method__code="payu")
-        # .exclude(status__in=[Payment.PaymentStatus.OK, Payment.PaymentStatus.FAILED])
+        return False
+    return apply_order_status(payment, client.get_order(payment.code, token))
+
+
+def payments_due_for_check(now=None):
+    """
+    Pending PayU payments, which status has not been checked recently.
+    Check interval grows with payment age, see PAYU_CHECK_INTERVALS.
+    """
+    now = now or timezone.now()
+    due = Q()
+    younger_than = None
+    for age, interval in PAYU_CHECK_INTERVALS:
+        tier = Q(status_checked_at__lte=now - interval)
+        if age is not None:
+            tier &= Q(created_at__gt=now - age)
+        if younger_than is not None:
+            tier &= Q(created_at__lte=now - younger_than)
+        due |= tier
+        younger_than = age
+    return (
+        Payment.pending_payu.filter(code__isnull=False)
+        .filter(Q(status_checked_at__isnull=True) | due)
+        .select_related("method")
+        .order_by("-created_at")
     )
-    token = get_oauth_token()
-    for payment in payments:
-        update_payment_status(payment, token)
+
+
+def fetch_orders(payments, workers=8, token=None):
+    """
+    Fetches PayU orders of given payments concurrently, at most `workers`
+    requests at a time over the shared session.
+    Returns responses in payments order, None for failed requests.
+    """
+    token = token or client.get_token()
+
+    def fetch(payment):
+        try:
+            return client.get_order(payment.code, token)
+        except (requests.RequestException, ValueError) as e:
+            logger.warning(f"PayU: cannot check payment {payment.pk}: {e!r}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(fetch, payments))
+
+
+def reconcile_payments(payments, workers=8) -> tuple[int, int, int]:
+    """
+    Fetches statuses of given payments from PayU concurrently and stores them
+    locally: check times of unchanged payments with one update, changed
+    statuses only if not changed meanwhile (eg. by a PayU notification).
+    Returns number of checked payments, changed statuses and errors.
+    """
+    payments = list(payments)
+    if not payments:
+        return 0, 0, 0
+
+    # only HTTP calls run in threads, database is accessed from this one
+    responses = fetch_orders(payments, workers)
+
+    checked_at = timezone.now()
+    checked, completed = [], []
+    changed = 0
+    with transaction.atomic():
+        for payment, response in zip(payments, responses):
+            if response is None:
+                continue
+            checked.append(payment.pk)
+            status = order_status(response)
+            if status is None or status == payment.status:
+                continue
+            if Payment.objects.filter(pk=payment.pk, status=payment.status).update(
+                status=status, status_checked_at=checked_at
+            ):
+                changed += 1
+                payment.status = status
+                if status == Payment.PaymentStatus.OK:
+                    completed.append(payment)
+        Payment.objects.filter(pk__in=checked).update(status_checked_at=checked_at)
+        # updates skip Payment.save, completed payments are handled here
+        if completed:
+            Payment.mark_entries_paid(completed)
+    return len(payments), changed, len(payments) - len(checked)
+
+
+def update_user_payments_statuses(user: User, contest=None, min_interval=None):
+    """
+    On-demand check of user's pending PayU payments,
+    ones checked within `min_interval` are skipped.
+    """
+    payments = Payment.pending_payu.filter(user=user, code__isnull=False)
+    if contest is not None:
+        payments = payments.filter(contest=contest)
+    if min_interval is not None:
+        payments = payments.exclude(status_checked_at__gt=timezone.now() - min_interval)
+    return reconcile_payments(payments.select_related("method"))
@@ -0,0 +1,147 @@
+"""
+Category standings by score: stored ranks, proposed places and final round
+qualification.
+
+Standings of any number of categories come from a single grouped query
+(average score of every entry) ranked in one pass. Entries with equal scores
+share the rank (standard competition ranking: 1, 2, 2, 4) and are marked as
+tied, so judges know which places have to be decided in the final round.
+"""
+
+from dataclasses import dataclass
+from itertools import groupby
+from operator import itemgetter
+from uuid import UUID
+
+from django.db import transaction
+from django.db.models import Case, Q, QuerySet, Value, When
+
+from .cache import bump_results_version
+from .models import Contest, Entry, ScoreSheet
+
+MEDAL_PLACES = 3
+
+
+@dataclass(frozen=True)
+class Standing:
+    entry_id: UUID
+    code: int
+    score: float
+    rank: int
+    tied: bool = False
+
+    @property
+    def proposed_place(self) -> int:
+        return self.rank if self.rank <= MEDAL_PLACES else 0
+
+
+def rank_rows(rows) -> list[Standing]:
+    """
+    Standings of (entry id, code, score) rows sorted by score descending.
+    """
+    rows = list(rows)
+    standings = []
+    for position, (entry_id, code, score) in enumerate(rows):
+        tied_above = position > 0 and rows[position - 1][2] == score
+        tied_below = position + 1 < len(rows) and rows[position + 1][2] == score
+        rank = standings[-1].rank if tied_above else position + 1
+        standings.append(
+            Standing(entry_id, code, score, rank, tied_above or tied_below)
+        )
+    return standings
+
+
+def standings(entries: QuerySet) -> dict:
+    """
+    {category id: [Standing, ...]} of scored `entries`, best first.
+    """
+    rows = (
+        entries.with_score()
+        .filter(score__isnull=False)
+        .order_by("category_id", "-score", "code")
+        .values_list("category_id", "id", "code", "score")
+    )
+    return {
+        category: rank_rows(row[1:] for row in category_rows)
+        for category, category_rows in groupby(rows, key=itemgetter(0))
+    }
+
+
+def final_standings(categories: QuerySet) -> dict:
+    """
+    Standings of finalists in categories with a final round,
+    of all scored entries in other ones.
+    """
+    entries = Entry.objects.filter(category__in=categories)
+    return {**standings(entries), **standings(entries.finalists())}
+
+
+def update_ranks(categories: QuerySet) -> int:
+    """
+    Stores ranks of entries of the categories, returns number of changed entries.
+    """
+    ranks = {
+        standing.entry_id: standing.rank
+        for category_standings in standings(
+            Entry.objects.filter(category__in=categories)
+        ).values()
+        for standing in category_standings
+    }
+    changed = []
+    for entry in Entry.objects.filter(category__in=categories).only("id", "rank"):
+        if entry.rank != ranks.get(entry.pk):
+            entry.rank = ranks.get(entry.pk)
+            changed.append(entry)
+    Entry.objects.bulk_update(changed, ["rank"], batch_size=500)
+    return len(changed)
+
+
+@transaction.atomic
+def apply_places(categories: QuerySet) -> int:
+    """
+    Sets proposed places (see final_standings), other entries of the categories
+    lose their places. Returns number of changed entries.
+    """
+    places = {
+        standing.entry_id: standing.proposed_place
+        for category_standings in final_standings(categories).values()
+        for standing in category_standings
+    }
+    changed = []
+    for entry in Entry.objects.filter(category__in=categories).only("id", "place"):
+        if entry.place != places.get(entry.pk, 0):
+            entry.place = places.get(entry.pk, 0)
+            changed.append(entry)
+    Entry.objects.bulk_update(changed, ["place"], batch_size=500)
+    # bulk_update does not send signals invalidating cached results
+    if changed:
+        for slug in Contest.objects.filter(categories__in=categories).values_list(
+            "slug", flat=True
+        ):
+            bump_results_version(slug)
+    return len(changed)
+
+
+def qualify_finalists(categories: QuerySet, top=None, threshold=None) -> int:
+    """
+    Marks scoresheets of the top `top` entries (ties included) or entries
+    scoring at least `threshold` as final round ones, unmarks the others.
+    Returns number of qualified entries.
+    """
+    if top is None and threshold is None:
+        raise ValueError("Number of finalists or score threshold is required.")
+    qualified = [
+        standing.entry_id
+        for category_standings in standings(
+            Entry.objects.filter(category__in=categories)
+        ).values()
+        for standing in category_standings
+        if (top is not None and standing.rank <= top)
+        or (threshold is not None and standing.score >= threshold)
+    ]
+    ScoreSheet.objects.filter(entry__category__in=categories).update(
+        final_round=Case(
+            When(Q(entry__in=qualified), then=Value(True)), default=Value(False)
+        )
+    )
+    return len(qualified)
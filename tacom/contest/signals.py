@@ -0,0 +1,159 @@
+from threading import local
+
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from .cache import bump_results_version, invalidate_user_groups
+from .models import (
+    BrewerEntriesCounter,
+    Category,
+    Contest,
+    ContestEntriesCounter,
+    Entry,
+    ScoreSheet,
+    User,
+)
+from .ranking import update_ranks
+
+
+def count_entry(contest_id, category_id, brewer_id, n):
+    BrewerEntriesCounter.objects.increment(
+        n, contest_id=contest_id, category_id=category_id, brewer_id=brewer_id
+    )
+    ContestEntriesCounter.objects.increment(n, contest_id=contest_id)
+
+
+@receiver(post_save, sender=Entry)
+def count_saved_entry(sender, instance: Entry, created, raw, **kwargs):
+    # fixtures are counted by `manage.py recount`
+    if raw:
+        return
+    old_category_id = getattr(instance, "_loaded_category_id", None)
+    instance._loaded_category_id = instance.category_id
+    if not created and old_category_id == instance.category_id:
+        return
+
+    contest_id = instance.category.contest_id
+    if not created:
+        old_contest_id = (
+            Category.objects.filter(pk=old_category_id)
+            .values_list("contest_id", flat=True)
+            .get()
+        )
+        count_entry(old_contest_id, old_category_id, instance.brewer_id, -1)
+    count_entry(contest_id, instance.category_id, instance.brewer_id, 1)
+
+
+@receiver(post_delete, sender=Entry)
+def count_deleted_entry(sender, instance: Entry, **kwargs):
+    # category may be already deleted on cascades, hence no instance.category here
+    BrewerEntriesCounter.objects.increment(
+        -1, category_id=instance.category_id, brewer_id=instance.brewer_id
+    )
+    ContestEntriesCounter.objects.increment(
+        -1, contest__categories=instance.category_id
+    )
+
+
+def bump_entry_results_version(category_id):
+    for slug in Contest.objects.filter(categories=category_id).values_list(
+        "slug", flat=True
+    ):
+        bump_results_version(slug)
+
+
+@receiver(post_save, sender=Entry)
+def invalidate_results_on_entry_save(sender, instance: Entry, raw, **kwargs):
+    old_place = getattr(instance, "_loaded_place", None)
+    instance._loaded_place = instance.place
+    # only placed entries are listed in results
+    if raw or not (instance.place or old_place):
+        return
+    bump_entry_results_version(instance.category_id)
+
+
+@receiver(post_delete, sender=Entry)
+def invalidate_results_on_entry_delete(sender, instance: Entry, **kwargs):
+    if instance.place:
+        bump_entry_results_version(instance.category_id)
+
+
+# categories waiting for ranking until the transaction commits
+_pending_rankings = local()
+
+
+def rank_on_commit(category_id):
+    """
+    Ranks the category once the transaction commits. Scoresheets deleted
+    by a cascade (entry, category or contest deletion) or saved in a loop
+    rank every category once, by the first callback run.
+    """
+    pending = _pending_rankings.__dict__.setdefault("categories", set())
+    pending.add(category_id)
+
+    def rank():
+        # categories of rolled back transactions are ranked too, harmlessly
+        categories = set(pending)
+        pending.clear()
+        if categories:
+            update_ranks(Category.objects.filter(pk__in=categories))
+
+    transaction.on_commit(rank)
+
+
+@receiver(post_save, sender=ScoreSheet)
+@receiver(post_delete, sender=ScoreSheet)
+def rank_scored_entries(sender, instance: ScoreSheet, raw=False, **kwargs):
+    # fixtures are ranked by `manage.py rank_entries`
+    if raw:
+        return
+    if ScoreSheet.entry.is_cached(instance):
+        category_id = instance.entry.category_id
+    else:
+        # scoresheets deleted by a cascade come without their entries
+        category_id = (
+            Entry.objects.filter(pk=instance.entry_id)
+            .values_list("category_id", flat=True)
+            .first()
+        )
+    if category_id is not None:
+        rank_on_commit(category_id)
+
+
+@receiver(post_save, sender=Contest)
+@receiver(post_delete, sender=Contest)
+def invalidate_results_on_contest_change(sender, instance: Contest, **kwargs):
+    # covers Best of Show, results publication and autopublish time changes
+    bump_results_version(instance.slug)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_groups_on_membership_change(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if reverse:
+        # group.user_set changed, pk_set holds users (None when cleared)
+        if action == "pre_clear":
+            instance._cleared_user_ids = list(
+                instance.user_set.values_list("pk", flat=True)
+            )
+        elif action == "post_clear":
+            invalidate_user_groups(instance._cleared_user_ids)
+        elif action in ("post_add", "post_remove"):
+            invalidate_user_groups(pk_set)
+    elif action in ("post_add", "post_remove", "post_clear"):
+        invalidate_user_groups([instance.pk])
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidate_groups_on_group_change(sender, instance: Group, **kwargs):
+    # renamed or deleted group
+    invalidate_user_groups(instance.user_set.values_list("pk", flat=True))
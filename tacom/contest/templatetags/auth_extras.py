@@ -1,3 +1,4 @@
+from contest.cache import get_user_groups
 from django import template
 
 register = template.Library()
@@ -6,7 +7,7 @@ register = template.Library()
 @register.simple_tag(takes_context=True)
 def get_user_permissions(context):
     user = context["request"].user
-    groups = user.groups.values_list("name", flat=True)
+    groups = get_user_groups(user)
     return {
         "is_translator": "translators" in groups,
         "is_contest_staff": "contest_staff" in groups,
@@ -0,0 +1,104 @@
+import pytest
+from contest.admin import (
+    JudgeApplicationAdin,
+    approve_judge_applications,
+    reject_judge_applications,
+)
+from contest.factories import ContestFactory, UserFactory
+from contest.models.judges import JudgeCertification, JudgeInCompetition
+from django.contrib.admin.sites import site
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+@pytest.mark.admin
+class JudgeApplicationAdminTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = UserFactory(is_staff=True, is_superuser=True)
+        cls.contest = ContestFactory()
+        cls.certified = cls.application(mjp_level=3)
+        cls.not_certified = cls.application(certification=False)
+        cls.url = reverse("admin:contest_judgeincompetition_changelist")
+
+    @classmethod
+    def application(cls, certification=True, **kwargs):
+        user = UserFactory(profile=True)
+        if certification:
+            JudgeCertification.objects.create(
+                user=user, is_mjp=True, is_mead_bjcp=True, **kwargs
+            )
+        return JudgeInCompetition.objects.create(user=user, contest=cls.contest)
+
+    def get(self):
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                self.url, {"contest__id__exact": self.contest.pk}
+            )
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_changelist_queries_do_not_depend_on_applications(self):
+        queries = self.get()[1]
+        for i in range(5):
+            self.application(certification=i % 2, mjp_level=i + 1)
+
+        self.assertEqual(self.get()[1], queries)
+
+    def test_certification_columns(self):
+        admin = JudgeApplicationAdin(JudgeInCompetition, site)
+        applications = {
+            application.pk: application
+            for application in admin.get_queryset(None).select_related(
+                *admin.list_select_related
+            )
+        }
+        certified = applications[self.certified.pk]
+        not_certified = applications[self.not_certified.pk]
+
+        with self.assertNumQueries(0):
+            self.assertEqual(admin.mjp_level(certified), 3)
+            self.assertTrue(admin.bjcp(certified))
+            self.assertEqual(admin.mjp_level(not_certified), "-")
+            self.assertFalse(admin.bjcp(not_certified))
+            self.assertEqual(admin.other(not_certified), "-")
+
+    def run_action(self, action):
+        request = RequestFactory().post(self.url)
+        request.user = self.admin
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        with self.assertNumQueries(1):
+            action(
+                JudgeApplicationAdin(JudgeInCompetition, site),
+                request,
+                JudgeInCompetition.objects.filter(contest=self.contest),
+            )
+        return [str(message) for message in request._messages]
+
+    def test_bulk_approve_and_reject(self):
+        JudgeInCompetition.objects.filter(pk=self.certified.pk).update(
+            status=JudgeInCompetition.Status.APPROVED
+        )
+
+        messages = self.run_action(approve_judge_applications)
+
+        self.assertFalse(
+            JudgeInCompetition.objects.exclude(
+                status=JudgeInCompetition.Status.APPROVED
+            ).exists()
+        )
+        self.assertIn(": 1.", messages[0])
+
+        self.run_action(reject_judge_applications)
+
+        self.assertEqual(
+            JudgeInCompetition.objects.filter(
+                status=JudgeInCompetition.Status.REJECTED
+            ).count(),
+            2,
+        )
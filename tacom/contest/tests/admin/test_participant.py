@@ -0,0 +1,82 @@
+import pytest
+from contest.admin import ParticipantAdmin
+from contest.factories import CategoryFactory, EntryFactory, UserFactory
+from contest.models import Participant
+from django.contrib import admin
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+@pytest.mark.admin
+class ParticipantAdminTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = UserFactory(is_staff=True, is_superuser=True)
+        cls.category = CategoryFactory(entries_limit=10)
+        cls.brewer = cls.participant(paid=2, received=1, unpaid=1)
+        cls.url = reverse("admin:contest_participant_changelist")
+
+    @classmethod
+    def participant(cls, paid=0, received=0, unpaid=0):
+        brewer = UserFactory(profile=True)
+        for i in range(paid):
+            EntryFactory(
+                category=cls.category,
+                brewer=brewer,
+                is_paid=True,
+                is_received=i < received,
+            )
+        EntryFactory.create_batch(unpaid, category=cls.category, brewer=brewer)
+        return brewer
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def get(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_stats_are_annotated(self):
+        participant = Participant.objects.with_entries_stats().get(pk=self.brewer.pk)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                participant.entries_stats, {"total": 3, "paid": 2, "received": 1}
+            )
+
+    def test_stats_without_annotation(self):
+        participant = Participant.objects.get(pk=self.brewer.pk)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(participant.entries_total, 3)
+            self.assertEqual(participant.entries_paid, 2)
+            self.assertEqual(participant.entries_received, 1)
+
+    def test_changelist_queries_do_not_depend_on_participants(self):
+        queries = self.get()[1]
+        for _ in range(5):
+            self.participant(paid=3, received=2, unpaid=2)
+
+        self.assertEqual(self.get()[1], queries)
+
+    def test_changelist_sorted_by_stats(self):
+        top = self.participant(paid=5, received=4)
+        # "entries_paid" column, descending
+        response = self.get(o="-7")[0]
+
+        participants = list(response.context["cl"].result_list)
+        self.assertEqual(participants[0], top)
+        self.assertEqual(participants[0].paid_entries, 5)
+
+    def test_queryset_built_by_model_admin(self):
+        model_admin = ParticipantAdmin(Participant, admin.site)
+        model_admin.ordering = ("last_name",)
+
+        queryset = model_admin.get_queryset(RequestFactory().get(self.url))
+
+        self.assertEqual(queryset.query.order_by, ("last_name",))
+        self.assertEqual(queryset.get(pk=self.brewer.pk).total_entries, 3)
@@ -0,0 +1,102 @@
+from contest.factories import CategoryFactory, ContestFactory, UserFactory
+from contest.models import User
+from django.contrib import messages
+from django.contrib.auth.models import Group
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.contest = ContestFactory(entry_global_limit=100)
+        cls.category = CategoryFactory(contest=cls.contest)
+        cls.urls = {
+            reverse(name, args=(cls.contest.slug,)): queries
+            # validator queries: contest with categories and styles,
+            # details also check entries limit for registration button
+            for name, queries in (
+                ("contest:contest_detail", 2),
+                ("contest:contest_rules", 1),
+                ("contest:contest_address", 1),
+            )
+        }
+
+    def get(self, url, etag=None, **headers):
+        if etag:
+            headers["If-None-Match"] = etag
+        return self.client.get(url, headers=headers)
+
+    def test_not_modified(self):
+        for url, queries in self.urls.items():
+            with self.subTest(url=url):
+                etag = self.get(url)["ETag"]
+                with self.assertNumQueries(queries):
+                    response = self.get(url, etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b"")
+                self.assertIn("HX-Request", response["Vary"])
+
+    def test_modified(self):
+        changes = {
+            "contest": lambda: self.contest.save(),
+            "category": lambda: self.category.save(),
+            "style": lambda: self.category.style.save(),
+        }
+        for name, change in changes.items():
+            for url in self.urls:
+                with self.subTest(change=name, url=url):
+                    etag = self.get(url)["ETag"]
+                    change()
+                    response = self.get(url, etag)
+                    self.assertEqual(response.status_code, 200)
+                    self.assertNotEqual(response["ETag"], etag)
+
+    def test_validator_varies(self):
+        url = next(iter(self.urls))
+        etag = self.get(url)["ETag"]
+        variants = {
+            "htmx": lambda: self.get(url, etag, HX_Request="true"),
+            "language": lambda: self.get(url.replace("/en/", "/pl/", 1), etag),
+        }
+        for name, request in variants.items():
+            with self.subTest(variant=name):
+                self.assertEqual(request().status_code, 200)
+
+        self.client.force_login(UserFactory())
+        self.assertEqual(self.get(url, etag).status_code, 200)
+
+    def test_navbar_changes(self):
+        url = next(iter(self.urls))
+        user = UserFactory()
+        self.client.force_login(user)
+        changes = {
+            "groups": lambda: user.groups.add(Group.objects.create(name="judge")),
+            "staff": lambda: User.objects.filter(pk=user.pk).update(is_staff=True),
+        }
+        for name, change in changes.items():
+            with self.subTest(change=name):
+                etag = self.get(url)["ETag"]
+                with self.captureOnCommitCallbacks(execute=True):
+                    change()
+                self.assertEqual(self.get(url, etag).status_code, 200)
+
+    def test_pending_message_is_shown(self):
+        url = next(iter(self.urls))
+        etag = self.get(url)["ETag"]
+        storage = CookieStorage(RequestFactory().get(url))
+        storage.add(messages.INFO, "You have signed out.")
+        response = HttpResponse()
+        storage.update(response)
+        self.client.cookies.update(response.cookies)
+
+        response = self.get(url, etag)
+
+        self.assertContains(response, "You have signed out.")
+
+    def test_unpublished_not_found(self):
+        contest = ContestFactory(competition_is_published=False)
+        url = reverse("contest:contest_detail", args=(contest.slug,))
+        self.assertEqual(self.get(url, '"whatever"').status_code, 404)
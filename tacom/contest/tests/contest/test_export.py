@@ -0,0 +1,131 @@
+import csv
+from io import BytesIO, StringIO
+from unittest import skipUnless
+
+import pytest
+from contest import export
+from contest.factories import (
+    CategoryFactory,
+    ContestFactory,
+    EntryFactory,
+    ScoreSheetFactory,
+    UserFactory,
+)
+from django.contrib.auth.models import Group
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+
+
+@pytest.mark.unit
+class EntriesExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.contest = ContestFactory(slug="święto-miodu")
+        category = CategoryFactory(contest=cls.contest, entries_limit=5)
+        cls.brewer = UserFactory(profile=True, last_name="Żak")
+        cls.winner = EntryFactory(
+            category=category, brewer=cls.brewer, is_paid=True, place=1
+        )
+        ScoreSheetFactory(
+            entry=cls.winner,
+            appearance_score=10,
+            aroma_score=20,
+            flavor_score=30,
+            finish_score=10,
+            overall_score=10,
+        )
+        cls.other = EntryFactory(category=category, brewer=cls.brewer)
+        EntryFactory(category=CategoryFactory(entries_limit=5))
+        cls.staff = UserFactory(profile=True)
+        cls.staff.groups.add(Group.objects.create(name="contest_staff"))
+        cls.url = reverse(
+            "contest:contest_entries_export", args=(cls.contest.slug, "csv")
+        )
+
+    def read_csv(self, content: str):
+        return list(csv.DictReader(StringIO(content.removeprefix("\ufeff"))))
+
+    def test_rows(self):
+        rows = list(export.export_rows(self.contest, chunk_size=1))
+
+        self.assertEqual(len(rows), 2)
+        winner = next(row for row in rows if row[0] == self.winner.code)
+        self.assertEqual(
+            winner[2:],
+            (self.winner.name, "Żak", self.brewer.first_name)
+            + (self.brewer.email, True, False, 1, 80),
+        )
+
+    def test_csv_is_streamed(self):
+        self.client.force_login(self.staff)
+
+        response = self.client.get(self.url)
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            response["Content-Disposition"],
+            "attachment; filename*=utf-8''%C5%9Bwi%C4%99to-miodu-entries.csv",
+        )
+        rows = self.read_csv(b"".join(response.streaming_content).decode())
+        self.assertEqual(
+            sorted(row["Code"] for row in rows),
+            sorted(str(entry.code) for entry in (self.winner, self.other)),
+        )
+
+    def test_contest_staff_only(self):
+        self.client.force_login(UserFactory(profile=True, is_staff=True))
+        self.assertRedirects(
+            self.client.get(self.url),
+            reverse("contest:contest_list"),
+            fetch_redirect_response=False,
+        )
+
+    def test_formulas_are_escaped(self):
+        self.winner.name = '=HYPERLINK("http://evil")'
+        self.winner.save()
+        self.brewer.first_name = "@SUM(A1)"
+        self.brewer.save()
+
+        out = StringIO()
+        call_command("export_entries", self.contest.slug, stdout=out)
+
+        winner = next(
+            row
+            for row in self.read_csv(out.getvalue())
+            if row["Code"] == str(self.winner.code)
+        )
+        self.assertEqual(winner["Name"], '\'=HYPERLINK("http://evil")')
+        self.assertEqual(winner["First name"], "'@SUM(A1)")
+        self.assertEqual(winner["Last name"], "Żak")
+        self.assertEqual(export.escape_formula("-1+2"), "'-1+2")
+        self.assertEqual(export.escape_formula(-1), -1)
+
+    def test_unknown_format(self):
+        self.client.force_login(self.staff)
+        url = reverse("contest:contest_entries_export", args=(self.contest.slug, "pdf"))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    @skipUnless(export.xlsx_available(), "openpyxl is not installed")
+    def test_xlsx(self):
+        from openpyxl import load_workbook
+
+        self.client.force_login(self.staff)
+        url = reverse(
+            "contest:contest_entries_export", args=(self.contest.slug, "xlsx")
+        )
+
+        response = self.client.get(url)
+
+        workbook = load_workbook(BytesIO(b"".join(response.streaming_content)))
+        rows = list(workbook.active.values)
+        self.assertEqual(list(rows[0]), export.export_header())
+        self.assertEqual(len(rows), 3)
+
+    def test_command(self):
+        out = StringIO()
+        call_command("export_entries", self.contest.slug, stdout=out)
+        self.assertEqual(len(self.read_csv(out.getvalue())), 2)
+
+        with self.assertRaises(CommandError):
+            call_command("export_entries", "missing")
@@ -0,0 +1,233 @@
+import random
+from collections import Counter
+from io import StringIO
+from time import perf_counter
+
+import pytest
+from contest import judging
+from contest.factories import (
+    CategoryFactory,
+    ContestFactory,
+    EntryFactory,
+    UserFactory,
+)
+from contest.models import ScoreSheet
+from contest.models.judges import JudgeInCompetition, JudgingTable
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+
+@pytest.mark.unit
+class AllocateTests(SimpleTestCase):
+    def entries(self, sizes, brewers=None):
+        # (entry id, category id, brewer id) rows, category by category
+        return [
+            (f"{category}-{i}", category, brewers or i)
+            for category, size in enumerate(sizes)
+            for i in range(size)
+        ]
+
+    def test_categories_stay_together(self):
+        plan = judging.allocate(
+            self.entries([6, 5, 4, 3, 2]), [(j, 100 + j) for j in range(6)]
+        )
+
+        self.assertEqual(len(plan.tables), 3)
+        self.assertEqual([len(table.entries) for table in plan.tables], [6, 7, 7])
+        categories = [c for table in plan.tables for c in table.categories]
+        self.assertCountEqual(categories, range(5))
+        self.assertEqual([len(table.judges) for table in plan.tables], [2, 2, 2])
+
+    def test_large_category_is_split(self):
+        plan = judging.allocate(self.entries([10, 2]), [], tables=3)
+
+        self.assertEqual([len(table.entries) for table in plan.tables], [4, 4, 4])
+        self.assertEqual(plan.tables[0].categories, [0])
+
+    def test_judges_do_not_judge_own_entries(self):
+        entries = self.entries([3, 3, 3, 3])
+        # brewers 0, 1 and 2 have entries in every category
+        judges = [(j, j % 4) for j in range(8)]
+
+        plan = judging.allocate(entries, judges, tables=2)
+
+        self.assertEqual(plan.unassigned_judges, [0, 1, 2, 4, 5, 6])
+        for table in plan.tables:
+            self.assertFalse({j % 4 for j in table.judges} & table.brewers)
+
+    def test_conflicting_judge_gets_other_table(self):
+        entries = self.entries([2, 2]) + [("own", 2, "judge")]
+
+        plan = judging.allocate(entries, [(1, "judge"), (2, "other")], tables=2)
+
+        own_table = next(t for t in plan.tables if "own" in t.entries)
+        self.assertEqual(own_table.judges, [2])
+
+    def test_judgeless_tables_are_reported(self):
+        # both judges brewed the whole first category
+        entries = [(f"own-{i}", 0, "brewer") for i in range(3)] + self.entries([0, 3])
+
+        plan = judging.allocate(entries, [(1, "brewer"), (2, "brewer")], tables=2)
+
+        own_table = next(t for t in plan.tables if 0 in t.categories)
+        self.assertEqual(own_table.judges, [])
+        self.assertEqual(plan.judgeless_tables, [own_table.number])
+
+    def test_every_table_gets_a_judge_first(self):
+        first, second = judging.Table(1), judging.Table(2)
+        # judge 1, tried first, may sit at either table, judge 2 only at the first
+        judges = [(1, "x"), (2, "y")]
+        allowed = {1: [first, second], 2: [first]}
+
+        seats = judging.first_judges([first, second], judges, allowed)
+
+        self.assertEqual(seats, {1: second, 2: first})
+
+    def test_no_entries(self):
+        plan = judging.allocate([], [(1, 1)])
+
+        self.assertEqual(plan.tables, [])
+        self.assertEqual(plan.unassigned_judges, [1])
+
+    def test_large_contest(self):
+        random.seed(23)
+        entries = [
+            (i, random.randrange(60), random.randrange(400)) for i in range(1000)
+        ]
+        entries.sort(key=lambda entry: entry[1])
+        judges = [(j, random.randrange(800)) for j in range(40)]
+
+        start = perf_counter()
+        plan = judging.allocate(entries, judges)
+        elapsed = perf_counter() - start
+
+        self.assertLess(elapsed, 0.2)
+        self.assertEqual(len(plan.tables), 20)
+        sizes = [len(table.entries) for table in plan.tables]
+        self.assertLessEqual(max(sizes) - min(sizes), 10)
+        self.assertEqual(sum(sizes), 1000)
+        seated = Counter(len(table.judges) for table in plan.tables)
+        self.assertEqual(
+            sum(n * c for n, c in seated.items()) + len(plan.unassigned_judges), 40
+        )
+
+
+@pytest.mark.unit
+class JudgingPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.contest = ContestFactory(is_judging_eliminations=True)
+        group = Group.objects.create(name="judge")
+        cls.judges = UserFactory.create_batch(4, profile=True)
+        for judge in cls.judges:
+            judge.groups.add(group)
+            JudgeInCompetition.objects.create(
+                user=judge,
+                contest=cls.contest,
+                status=JudgeInCompetition.Status.APPROVED,
+            )
+        cls.rejected = JudgeInCompetition.objects.create(
+            user=UserFactory(),
+            contest=cls.contest,
+            status=JudgeInCompetition.Status.REJECTED,
+        )
+        categories = CategoryFactory.create_batch(
+            2, contest=cls.contest, entries_limit=10
+        )
+        received = {"is_paid": True, "is_received": True}
+        cls.entries = [
+            EntryFactory(category=category, **received)
+            for category in categories
+            for _ in range(3)
+        ]
+        cls.own_entry = EntryFactory(
+            category=categories[0], brewer=cls.judges[0], **received
+        )
+        cls.not_received = EntryFactory(category=categories[1], is_paid=True)
+
+    def judging_list(self, user):
+        self.client.force_login(user)
+        response = self.client.get(
+            reverse("contest:judging_list", args=(self.contest.slug,))
+        )
+        return {entry.pk for entry in response.context["entries"]}
+
+    def test_plan_is_stored(self):
+        call_command("allocate_judging", self.contest.slug, stdout=StringIO())
+
+        tables = JudgingTable.objects.filter(contest=self.contest)
+        self.assertEqual(tables.count(), 2)
+        self.assertEqual(
+            sum(table.entries.count() for table in tables), len(self.entries) + 1
+        )
+        self.assertEqual(
+            JudgeInCompetition.objects.filter(table__isnull=False).count(), 4
+        )
+        self.rejected.refresh_from_db()
+        self.assertIsNone(self.rejected.table)
+        own_table = tables.get(entries=self.own_entry)
+        self.assertFalse(own_table.judges.filter(user=self.judges[0]).exists())
+
+        # more tables than judges
+        out = StringIO()
+        call_command("allocate_judging", self.contest.slug, tables=7, stdout=out)
+        self.assertIn("Tables without judges (judged by staff only):", out.getvalue())
+        self.assertEqual(
+            JudgingTable.objects.filter(contest=self.contest, judges=None).count(), 3
+        )
+
+        # allocating again replaces the plan
+        call_command("allocate_judging", self.contest.slug, tables=1, stdout=StringIO())
+        self.assertEqual(JudgingTable.objects.filter(contest=self.contest).count(), 1)
+
+    def test_judge_sees_own_table(self):
+        judging.save_plan(self.contest, judging.plan_judging(self.contest))
+
+        for judge in self.judges:
+            table = JudgingTable.objects.get(judges__user=judge)
+            self.assertEqual(
+                self.judging_list(judge),
+                set(table.entries.values_list("pk", flat=True)),
+            )
+
+    def test_entries_received_after_plan_are_listed(self):
+        judging.save_plan(self.contest, judging.plan_judging(self.contest))
+        self.not_received.is_received = True
+        self.not_received.save()
+
+        for judge in self.judges:
+            table = JudgingTable.objects.get(judges__user=judge)
+            self.assertEqual(
+                self.judging_list(judge),
+                set(table.entries.values_list("pk", flat=True))
+                | {self.not_received.pk},
+            )
+
+    def test_own_entries_are_not_listed_without_plan(self):
+        entries = self.judging_list(self.judges[0])
+
+        self.assertEqual(entries, {entry.pk for entry in self.entries})
+
+    def test_staff_sees_all_tables(self):
+        judging.save_plan(self.contest, judging.plan_judging(self.contest))
+        staff = UserFactory(is_staff=True)
+        staff.groups.add(Group.objects.get(name="judge"))
+
+        self.assertEqual(
+            self.judging_list(staff),
+            {entry.pk for entry in self.entries} | {self.own_entry.pk},
+        )
+
+    def test_own_entry_cannot_be_scored(self):
+        self.client.force_login(self.judges[0])
+
+        response = self.client.get(
+            reverse("contest:scoresheet_create", args=(self.own_entry.pk,))
+        )
+
+        self.assertRedirects(
+            response, reverse("contest:contest_list"), fetch_redirect_response=False
+        )
+        self.assertFalse(ScoreSheet.objects.exists())
@@ -0,0 +1,206 @@
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+from contest import ranking, signals
+from contest.cache import results_version
+from contest.factories import (
+    CategoryFactory,
+    ContestFactory,
+    EntryFactory,
+    ScoreSheetFactory,
+    UserFactory,
+)
+from contest.models import Category, Entry, ScoreSheet
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+
+def score(entry, total, **kwargs):
+    # total points split into the five scores
+    appearance = min(total, 12)
+    return ScoreSheetFactory(
+        entry=entry,
+        appearance_score=appearance,
+        aroma_score=total - appearance,
+        flavor_score=0,
+        finish_score=0,
+        overall_score=0,
+        **kwargs,
+    )
+
+
+@pytest.mark.unit
+class RankRowsTests(SimpleTestCase):
+    def test_ties_share_rank(self):
+        standings = ranking.rank_rows(
+            [("a", 1, 40), ("b", 2, 35), ("c", 3, 35), ("d", 4, 30), ("e", 5, 20)]
+        )
+
+        self.assertEqual([s.rank for s in standings], [1, 2, 2, 4, 5])
+        self.assertEqual([s.tied for s in standings], [False, True, True, False, False])
+        self.assertEqual([s.proposed_place for s in standings], [1, 2, 2, 0, 0])
+
+    def test_empty(self):
+        self.assertEqual(ranking.rank_rows([]), [])
+
+
+@pytest.mark.unit
+class RankingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.contest = ContestFactory()
+        cls.category, cls.other_category = CategoryFactory.create_batch(
+            2, contest=cls.contest, entries_limit=10
+        )
+        cls.entries = EntryFactory.create_batch(5, category=cls.category)
+        cls.other = EntryFactory(category=cls.other_category)
+        cls.not_scored = EntryFactory(category=cls.category)
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for entry, total in zip(self.entries, (40, 35, 35, 30, 20)):
+                score(entry, total)
+            score(self.other, 10)
+
+    def ranks(self):
+        return list(
+            Entry.objects.filter(category=self.category)
+            .order_by(F("rank").asc(nulls_last=True), "code")
+            .values_list("rank", flat=True)
+        )
+
+    def test_ranks_are_updated_on_scoresheet_save(self):
+        self.assertEqual(self.ranks(), [1, 2, 2, 4, 5, None])
+        self.assertEqual(Entry.objects.get(pk=self.other.pk).rank, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            score(self.not_scored, 50)
+        self.assertEqual(self.ranks(), [1, 2, 3, 3, 5, 6])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ScoreSheet.objects.get(entry=self.not_scored).delete()
+        self.assertEqual(self.ranks(), [1, 2, 2, 4, 5, None])
+
+    def test_cascade_ranks_category_once(self):
+        # second scoresheet of the entry
+        score(self.entries[0], 45)
+        update_ranks = patch.object(
+            signals, "update_ranks", wraps=ranking.update_ranks
+        ).start()
+        self.addCleanup(patch.stopall)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Entry.objects.filter(pk__in=[e.pk for e in self.entries[:2]]).delete()
+
+        update_ranks.assert_called_once()
+        self.assertEqual(self.ranks(), [1, 2, 3, None])
+
+    def test_ranks_in_judging_list(self):
+        Entry.objects.update(is_paid=True, is_received=True)
+        judge = UserFactory(profile=True)
+        judge.groups.add(Group.objects.create(name="judge"))
+        self.client.force_login(judge)
+
+        response = self.client.get(
+            reverse("contest:judging_list", args=(self.contest.slug,))
+        )
+
+        self.assertContains(response, "Rank")
+        ranks = {entry.pk: entry.rank for entry in response.context["entries"]}
+        self.assertEqual(
+            [ranks[entry.pk] for entry in self.entries + [self.not_scored]],
+            [1, 2, 2, 4, 5, None],
+        )
+
+    def test_standings(self):
+        standings = ranking.standings(
+            Entry.objects.filter(category__contest=self.contest)
+        )
+
+        self.assertEqual(
+            list(standings), sorted([self.category.pk, self.other_category.pk])
+        )
+        self.assertEqual(
+            [s.entry_id for s in standings[self.category.pk]][:1], [self.entries[0].pk]
+        )
+        self.assertEqual(
+            [s.score for s in standings[self.category.pk]], [40, 35, 35, 30, 20]
+        )
+
+    def test_queries_do_not_grow_with_entries(self):
+        categories = Category.objects.filter(contest=self.contest)
+        Entry.objects.update(rank=None)
+        with self.assertNumQueries(3) as small:
+            ranking.update_ranks(categories)
+
+        for entry in EntryFactory.create_batch(4, category=self.other_category):
+            score(entry, 25)
+        Entry.objects.update(rank=None)
+        with self.assertNumQueries(len(small.captured_queries)):
+            ranking.update_ranks(categories)
+
+    def test_qualify_top_includes_ties(self):
+        qualified = ranking.qualify_finalists(
+            Category.objects.filter(pk=self.category.pk), top=2
+        )
+
+        self.assertEqual(qualified, 3)
+        self.assertCountEqual(
+            Entry.objects.finalists().values_list("pk", flat=True),
+            [entry.pk for entry in self.entries[:3]],
+        )
+
+    def test_qualify_by_threshold(self):
+        categories = Category.objects.filter(contest=self.contest)
+        ranking.qualify_finalists(categories, top=5)
+
+        qualified = ranking.qualify_finalists(categories, threshold=30)
+
+        self.assertEqual(qualified, 4)
+        self.assertEqual(Entry.objects.finalists().count(), 4)
+        with self.assertRaises(ValueError):
+            ranking.qualify_finalists(categories)
+
+    def test_apply_places(self):
+        self.entries[4].place = 1
+        self.entries[4].save()
+        version = results_version(self.contest.slug)
+
+        changed = ranking.apply_places(Category.objects.filter(contest=self.contest))
+
+        self.assertEqual(changed, 5)
+        places = dict(Entry.objects.values_list("pk", "place"))
+        self.assertEqual([places[entry.pk] for entry in self.entries], [1, 2, 2, 0, 0])
+        self.assertEqual(places[self.other.pk], 1)
+        self.assertNotEqual(results_version(self.contest.slug), version)
+
+    def test_places_of_finalists(self):
+        ranking.qualify_finalists(Category.objects.filter(pk=self.category.pk), top=4)
+        # final round decides the tie
+        score(self.entries[2], 55, final_round=True)
+
+        ranking.apply_places(Category.objects.filter(pk=self.category.pk))
+
+        self.assertEqual(
+            [Entry.objects.get(pk=entry.pk).place for entry in self.entries],
+            [2, 3, 1, 0, 0],
+        )
+
+    def test_command(self):
+        out = StringIO()
+
+        call_command(
+            "rank_entries",
+            self.contest.slug,
+            finalists_top=1,
+            apply_places=True,
+            stdout=out,
+        )
+
+        self.assertIn("Finalists: 2", out.getvalue())
+        self.assertEqual(Entry.objects.get(pk=self.entries[0].pk).place, 1)
+        self.assertEqual(Entry.objects.get(pk=self.other.pk).place, 1)
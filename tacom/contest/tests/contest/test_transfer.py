@@ -0,0 +1,241 @@
+import gzip
+import json
+import os
+from io import StringIO
+from tempfile import TemporaryDirectory
+
+import pytest
+from contest import transfer
+from contest.factories import (
+    CategoryFactory,
+    ContestFactory,
+    EntryFactory,
+    ScoreSheetFactory,
+    UserFactory,
+)
+from contest.models import (
+    Contest,
+    ContestEntriesCounter,
+    Entry,
+    EntryCodeCounter,
+    Payment,
+    PaymentMethod,
+    ScoreSheet,
+    User,
+)
+from contest.models.judges import JudgeCertification, JudgeInCompetition
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+
+@pytest.mark.unit
+class CompetitionTransferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.contest = ContestFactory(slug="miodobranie")
+        cls.method = PaymentMethod.objects.create(
+            code="transfer", name="Transfer", name_pl="Przelew"
+        )
+        cls.contest.payment_methods.add(cls.method)
+        cls.brewer = UserFactory(profile=True, username="brewer")
+        categories = CategoryFactory.create_batch(
+            2, contest=cls.contest, entries_limit=5
+        )
+        cls.entries = [
+            EntryFactory(category=category, brewer=cls.brewer, alcohol_content="12.50")
+            for category in categories
+            for _ in range(2)
+        ]
+        cls.contest.bos_entry = cls.entries[0]
+        cls.contest.save()
+        ScoreSheetFactory(entry=cls.entries[0], final_round=True)
+        payment = Payment.objects.create(
+            method=cls.method,
+            user=cls.brewer,
+            contest=cls.contest,
+            amount="40.00",
+            currency="PLN",
+        )
+        payment.entries.set(cls.entries[:2])
+        cls.judge = UserFactory(profile=True, username="judge")
+        JudgeCertification.objects.create(user=cls.judge, is_mjp=True, mjp_level=3)
+        JudgeInCompetition.objects.create(
+            user=cls.judge,
+            contest=cls.contest,
+            status=JudgeInCompetition.Status.APPROVED,
+        )
+        # other contest is not dumped
+        EntryFactory(category=CategoryFactory(entries_limit=5))
+
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "contest.jsonl.gz")
+
+    def dump(self):
+        call_command(
+            "dumpcompetition",
+            self.contest.slug,
+            output=self.path,
+            stdout=StringIO(),
+        )
+
+    def load(self, **options):
+        call_command("loadcompetition", self.path, stdout=StringIO(), **options)
+        return Contest.objects.get(slug=options.get("slug", self.contest.slug))
+
+    def test_dump_is_gzipped_json_lines(self):
+        self.dump()
+
+        with gzip.open(self.path, "rt", encoding="utf-8") as file:
+            records = [json.loads(line) for line in file]
+
+        self.assertEqual(records[0]["contest"], "miodobranie")
+        labels = [record["model"] for record in records[1:]]
+        self.assertEqual(labels.count("contest.entry"), 4)
+        self.assertEqual(labels.count("contest.user"), 2)
+        entry = next(r for r in records[1:] if r["model"] == "contest.entry")
+        self.assertEqual(entry["fields"]["brewer"], "brewer")
+        self.assertNotIn("id", entry["fields"])
+
+    def test_load_under_another_slug_reuses_shared_objects(self):
+        self.dump()
+        users = User.objects.count()
+
+        contest = self.load(slug="miodobranie-kopia")
+
+        self.assertEqual(User.objects.count(), users)
+        self.assertEqual(PaymentMethod.objects.count(), 1)
+        self.assertQuerySetEqual(contest.payment_methods.all(), [self.method])
+        entries = Entry.objects.filter(category__contest=contest)
+        self.assertEqual(
+            sorted(entries.values_list("code", "category__style", "brewer")),
+            sorted(
+                (entry.code, entry.category.style_id, self.brewer.pk)
+                for entry in self.entries
+            ),
+        )
+        self.assertTrue(entries.filter(alcohol_content="12.50").exists())
+        self.assertEqual(contest.bos_entry.code, self.entries[0].code)
+        self.assertEqual(contest.bos_entry.category.contest, contest)
+        self.assertEqual(
+            ScoreSheet.objects.get(entry__category__contest=contest).entry.code,
+            self.entries[0].code,
+        )
+        payment = Payment.objects.get(contest=contest)
+        self.assertEqual(
+            sorted(payment.entries.values_list("code", flat=True)),
+            sorted(entry.code for entry in self.entries[:2]),
+        )
+        self.assertTrue(payment.entries.filter(category__contest=contest).exists())
+        self.assertTrue(
+            JudgeInCompetition.approved.filter(
+                contest=contest, user=self.judge
+            ).exists()
+        )
+
+    def test_counters_are_rebuilt(self):
+        self.dump()
+
+        contest = self.load(slug="miodobranie-kopia")
+
+        self.assertEqual(ContestEntriesCounter.objects.get(contest=contest).count, 4)
+        last_code = max(entry.code for entry in self.entries)
+        self.assertEqual(
+            EntryCodeCounter.objects.allocate(contest),
+            range(last_code + 1, last_code + 2),
+        )
+
+    def test_load_into_another_database(self):
+        self.dump()
+        self.contest.delete()
+        User.objects.filter(username__in=("brewer", "judge")).delete()
+
+        contest = self.load()
+
+        brewer = User.objects.get(username="brewer")
+        self.assertEqual(brewer.email, self.brewer.email)
+        self.assertFalse(brewer.has_usable_password())
+        self.assertEqual(brewer.entries.filter(category__contest=contest).count(), 4)
+        self.assertEqual(
+            JudgeCertification.objects.get(user__username="judge").mjp_level, 3
+        )
+
+    def test_credentials_are_not_dumped(self):
+        User.objects.filter(pk=self.judge.pk).update(
+            is_staff=True, is_superuser=True, last_login=timezone.now()
+        )
+        self.dump()
+        with gzip.open(self.path, "rt") as file:
+            users = [
+                record["fields"]
+                for record in map(json.loads, list(file)[1:])
+                if record["model"] == "contest.user"
+            ]
+        self.assertEqual(len(users), 2)
+        for fields in users:
+            self.assertFalse(
+                {"password", "last_login", "is_staff", "is_superuser"} & set(fields)
+            )
+
+        self.contest.delete()
+        User.objects.filter(username__in=("brewer", "judge")).delete()
+        self.load()
+
+        judge = User.objects.get(username="judge")
+        self.assertFalse(judge.is_staff or judge.is_superuser)
+        self.assertIsNone(judge.last_login)
+        self.assertFalse(judge.has_usable_password())
+
+    def test_user_with_another_email_is_not_reused(self):
+        self.dump()
+        User.objects.filter(pk=self.brewer.pk).update(email="someone@example.com")
+
+        with self.assertRaisesMessage(
+            CommandError, "contest.user brewer already exists with another email"
+        ):
+            self.load(slug="miodobranie-kopia")
+
+        self.assertFalse(Contest.objects.filter(slug="miodobranie-kopia").exists())
+
+    def test_existing_contest_is_not_overwritten(self):
+        self.dump()
+
+        with self.assertRaisesMessage(CommandError, "Contest already exists"):
+            self.load()
+
+        self.assertEqual(Contest.objects.filter(slug=self.contest.slug).count(), 1)
+
+    def test_not_a_dump(self):
+        with gzip.open(self.path, "wt") as file:
+            file.write('{"model": "contest.entry"}\n')
+
+        with self.assertRaisesMessage(CommandError, "Not a competition dump"):
+            self.load()
+
+    def test_queries_do_not_depend_on_number_of_entries(self):
+        self.dump()
+        with CaptureQueriesContext(connection) as queries:
+            self.load(slug="miodobranie-kopia")
+        EntryFactory.create_batch(
+            5, category=self.entries[0].category, brewer=UserFactory(profile=True)
+        )
+        self.dump()
+
+        with self.assertNumQueries(len(queries)):
+            self.load(slug="miodobranie-kopia-2")
+
+    def test_batches(self):
+        self.dump()
+
+        contest, counts = transfer.load_competition(
+            self.path, slug="miodobranie-kopia", batch_size=1
+        )
+
+        self.assertEqual(counts["contest.entry"], 4)
+        self.assertEqual(counts["contest.payment_entries"], 2)
+        self.assertNotIn("contest.user", counts)
+        self.assertEqual(Entry.objects.filter(category__contest=contest).count(), 4)
@@ -0,0 +1,85 @@
+from datetime import timedelta
+from io import StringIO
+
+from contest.factories import ContestFactory, ContestState, PeriodState
+from contest.models import Contest
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+
+class ContestPhaseTests(TestCase):
+    def test_phase_stored_on_save(self):
+        cases = {
+            Contest.Phase.DRAFT: ContestState(competition_is_published=False),
+            Contest.Phase.RESULTS: ContestState(),
+            Contest.Phase.REGISTRATION: ContestState(result_is_published=False),
+            Contest.Phase.JUDGING: ContestState(
+                registration=PeriodState.after, result_is_published=False
+            ),
+            Contest.Phase.DELIVERY: ContestState(
+                registration=PeriodState.after,
+                judging=PeriodState.before,
+                result_is_published=False,
+            ),
+            Contest.Phase.PUBLISHED: ContestState(
+                registration=PeriodState.before,
+                delivery=PeriodState.before,
+                judging=PeriodState.before,
+                result_is_published=False,
+            ),
+        }
+        for phase, state in cases.items():
+            with self.subTest(phase=phase):
+                contest = ContestFactory(_state=state)
+                self.assertEqual(
+                    Contest.objects.values_list("phase", flat=True).get(pk=contest.pk),
+                    phase,
+                )
+
+    def test_phase_saved_with_update_fields(self):
+        contest = ContestFactory(_state=ContestState(result_is_published=False))
+        contest.result_is_published = True
+        contest.save(update_fields=["result_is_published"])
+        contest.refresh_from_db()
+        self.assertEqual(contest.phase, Contest.Phase.RESULTS)
+
+    def test_managers_filter_on_phase(self):
+        draft = ContestFactory(_state=ContestState(competition_is_published=False))
+        registration = ContestFactory(_state=ContestState(result_is_published=False))
+        results = ContestFactory()
+
+        self.assertQuerySetEqual(
+            Contest.published.all(), [registration, results], ordered=False
+        )
+        self.assertQuerySetEqual(Contest.registrable.all(), [registration])
+        self.assertNotIn(draft, Contest.published.all())
+        self.assertIn('"phase"', str(Contest.registrable.all().query))
+
+    def test_tick_autopublish(self):
+        now = timezone.now()
+        contest = ContestFactory(
+            _state=ContestState(
+                competition_is_published=False,
+                competition_autopublish_datetime=now + timedelta(hours=1),
+                result_is_published=False,
+                result_autopublish_datetime=now + timedelta(days=1),
+            )
+        )
+        self.assertFalse(Contest.published.exists())
+
+        self.assertEqual(Contest.objects.tick(now), [])
+        changed = Contest.objects.tick(now + timedelta(hours=2))
+        self.assertEqual(changed, [contest])
+        self.assertEqual(changed[0].previous_phase, Contest.Phase.DRAFT)
+        self.assertEqual(Contest.registrable.get(), contest)
+
+        Contest.objects.tick(now + timedelta(days=2))
+        self.assertEqual(Contest.published.get().phase, Contest.Phase.RESULTS)
+
+    def test_tick_command(self):
+        contest = ContestFactory(_state=ContestState(result_is_published=False))
+        Contest.objects.update(phase=Contest.Phase.DRAFT)
+        out = StringIO()
+        call_command("tick_contests", stdout=out)
+        self.assertIn(f"{contest.slug}: draft -> registration", out.getvalue())
@@ -0,0 +1,60 @@
+import pytest
+from contest.factories import (
+    CategoryFactory,
+    ContestFactory,
+    EntryFactory,
+    UserFactory,
+)
+from contest.models import Category
+from django.test import TestCase
+
+
+@pytest.mark.unit
+class CategoryAvailabilityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.contest = ContestFactory()
+        cls.user = UserFactory.create(profile=True)
+        cls.full = CategoryFactory(contest=cls.contest, entries_limit=1)
+        cls.partial = CategoryFactory(contest=cls.contest, entries_limit=3)
+        cls.empty = CategoryFactory(contest=cls.contest, entries_limit=2)
+        cls.other_contest = CategoryFactory(entries_limit=1)
+
+        EntryFactory(category=cls.full, brewer=cls.user)
+        EntryFactory(category=cls.partial, brewer=cls.user)
+        # other participants do not count towards user's limits
+        EntryFactory.create_batch(2, category=cls.empty)
+        EntryFactory(category=cls.other_contest, brewer=cls.user)
+
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            categories = list(Category.objects.availability(self.contest, self.user))
+            [category.style.name for category in categories]
+        self.assertEqual(len(categories), 3)
+
+    def test_annotations(self):
+        categories = {
+            category.pk: (
+                category.user_entries_count,
+                category.slots_left,
+                category.is_full,
+            )
+            for category in Category.objects.availability(self.contest, self.user)
+        }
+        self.assertEqual(
+            categories,
+            {
+                self.full.pk: (1, 0, True),
+                self.partial.pk: (1, 2, False),
+                self.empty.pk: (0, 2, False),
+            },
+        )
+
+    def test_full_and_not_full(self):
+        self.assertEqual(
+            set(Category.objects.full(self.user)), {self.full, self.other_contest}
+        )
+        self.assertEqual(
+            set(Category.objects.not_full(self.user).filter(contest=self.contest)),
+            {self.partial, self.empty},
+        )
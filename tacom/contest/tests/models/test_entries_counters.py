@@ -0,0 +1,105 @@
+from io import StringIO
+
+import pytest
+from contest.factories import (
+    CategoryFactory,
+    ContestFactory,
+    EntryFactory,
+    UserFactory,
+)
+from contest.models import (
+    BrewerEntriesCounter,
+    Category,
+    ContestEntriesCounter,
+)
+from django.core.management import call_command
+from django.test import TestCase
+
+
+@pytest.mark.unit
+class EntriesCountersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.contest = ContestFactory(entry_global_limit=10, entry_user_limit=5)
+        cls.category = CategoryFactory(contest=cls.contest, entries_limit=2)
+        cls.other_category = CategoryFactory(contest=cls.contest, entries_limit=2)
+        cls.user = UserFactory.create(profile=True)
+
+    def counter(self, category=None, user=None):
+        return BrewerEntriesCounter.objects.get(
+            category=category or self.category, brewer=user or self.user
+        ).count
+
+    def total(self):
+        return ContestEntriesCounter.objects.get(contest=self.contest).count
+
+    def test_insert(self):
+        EntryFactory.create_batch(2, category=self.category, brewer=self.user)
+        EntryFactory(category=self.other_category)
+        self.assertEqual(self.counter(), 2)
+        self.assertEqual(self.total(), 3)
+
+    def test_delete(self):
+        entry = EntryFactory(category=self.category, brewer=self.user)
+        EntryFactory(category=self.category, brewer=self.user)
+        entry.delete()
+        self.assertEqual(self.counter(), 1)
+        self.assertEqual(self.total(), 1)
+
+    def test_category_change(self):
+        entry = EntryFactory(category=self.category, brewer=self.user)
+        entry.category = self.other_category
+        entry.save()
+        entry.name = "renamed"
+        entry.save()
+        self.assertEqual(self.counter(), 0)
+        self.assertEqual(self.counter(category=self.other_category), 1)
+        self.assertEqual(self.total(), 1)
+
+    def test_category_deleted(self):
+        EntryFactory(category=self.category, brewer=self.user)
+        EntryFactory(category=self.other_category, brewer=self.user)
+        Category.objects.filter(pk=self.category.pk).delete()
+        self.assertEqual(self.total(), 1)
+        self.assertFalse(
+            BrewerEntriesCounter.objects.filter(category=self.category).exists()
+        )
+
+    def test_limits_left(self):
+        EntryFactory.create_batch(2, category=self.category, brewer=self.user)
+        EntryFactory(category=self.other_category)
+        self.assertEqual(self.contest.global_limit_left, 7)
+        self.assertEqual(self.contest.user_limit_left(self.user), 3)
+
+    def test_limits_left_read_counters_only(self):
+        EntryFactory(category=self.category, brewer=self.user)
+        with self.assertNumQueries(2):
+            self.contest.global_limit_left
+            self.contest.user_limit_left(self.user)
+
+    def test_full_categories(self):
+        EntryFactory.create_batch(2, category=self.category, brewer=self.user)
+        EntryFactory(category=self.other_category, brewer=self.user)
+        EntryFactory.create_batch(2, category=self.other_category)
+        self.assertEqual(list(Category.objects.full(self.user)), [self.category])
+        self.assertEqual(
+            list(Category.objects.not_full(self.user).filter(contest=self.contest)),
+            [self.other_category],
+        )
+
+    def test_recount_repairs_drift(self):
+        EntryFactory.create_batch(2, category=self.category, brewer=self.user)
+        BrewerEntriesCounter.objects.update(count=7)
+        ContestEntriesCounter.objects.update(count=0)
+        self.assertEqual(self.contest.recount_entries(), 2)
+        self.assertEqual(self.counter(), 2)
+        self.assertEqual(self.total(), 2)
+        self.assertEqual(self.contest.recount_entries(), 0)
+
+    def test_recount_command(self):
+        EntryFactory(category=self.category, brewer=self.user)
+        BrewerEntriesCounter.objects.all().delete()
+        out = StringIO()
+        call_command("recount", self.contest.slug, stdout=out)
+        self.assertIn("1 counters corrected", out.getvalue())
+        self.assertEqual(self.counter(), 1)
@@ -0,0 +1,58 @@
+import pytest
+from contest.factories import CategoryFactory, ContestFactory, EntryFactory
+from contest.models import EntryCodeCounter
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.mark.unit
+class EntryCodeCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.contest = ContestFactory()
+        cls.category = CategoryFactory(contest=cls.contest, entries_limit=100)
+
+    def test_first_code_in_contest(self):
+        entry = EntryFactory(category=self.category)
+        self.assertEqual(entry.code, EntryCodeCounter.objects.first_code)
+
+    def test_codes_are_sequential(self):
+        codes = [EntryFactory(category=self.category).code for _ in range(5)]
+        self.assertEqual(codes, list(range(1000, 1005)))
+
+    def test_codes_are_counted_per_contest(self):
+        EntryFactory(category=self.category)
+        other = EntryFactory(category=CategoryFactory())
+        self.assertEqual(other.code, 1000)
+
+    def test_counter_is_seeded_from_existing_entries(self):
+        entry = EntryFactory(category=self.category, code=2500)
+        EntryCodeCounter.objects.filter(contest=self.contest).delete()
+        self.assertEqual(entry.code, 2500)
+        self.assertEqual(EntryFactory(category=self.category).code, 2501)
+
+    def test_explicit_code_is_kept(self):
+        self.assertEqual(EntryFactory(category=self.category, code=42).code, 42)
+
+    def test_allocate_bulk(self):
+        EntryFactory(category=self.category)
+        codes = EntryCodeCounter.objects.allocate(self.contest, 10)
+        self.assertEqual(codes, range(1001, 1011))
+        self.assertEqual(EntryFactory(category=self.category).code, 1011)
+
+    def test_allocate_nothing(self):
+        with self.assertRaises(ValueError):
+            EntryCodeCounter.objects.allocate(self.contest, 0)
+
+    def test_allocation_cost_does_not_depend_on_entries_count(self):
+        EntryCodeCounter.objects.allocate(self.contest)
+        with CaptureQueriesContext(connection) as first:
+            EntryCodeCounter.objects.allocate(self.contest)
+        EntryFactory.create_batch(30, category=self.category)
+        with CaptureQueriesContext(connection) as later:
+            EntryCodeCounter.objects.allocate(self.contest)
+        self.assertEqual(len(first), len(later))
+        self.assertFalse(
+            any("MAX(" in q["sql"].upper() for q in later.captured_queries)
+        )
@@ -0,0 +1,74 @@
+import pytest
+from contest.factories import (
+    CategoryFactory,
+    ContestFactory,
+    EntryFactory,
+    UserFactory,
+)
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.mark.unit
+class EntryLimitsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.contest = ContestFactory(entry_global_limit=4, entry_user_limit=3)
+        cls.category = CategoryFactory(contest=cls.contest, entries_limit=2)
+        cls.other_category = CategoryFactory(contest=cls.contest, entries_limit=2)
+        cls.user = UserFactory.create(profile=True)
+
+    def new_entry(self, category=None, user=None):
+        return EntryFactory.build(
+            category=category or self.category, brewer=user or self.user
+        )
+
+    def test_count_entries(self):
+        EntryFactory(category=self.category, brewer=self.user)
+        EntryFactory(category=self.other_category, brewer=self.user)
+        EntryFactory(category=self.category)
+        count = self.contest.count_entries(self.user, self.category)
+        self.assertEqual((count.total, count.user, count.category), (3, 2, 1))
+
+    def test_new_entry_within_limits(self):
+        EntryFactory(category=self.category, brewer=self.user)
+        self.new_entry().clean()
+
+    def test_category_limit(self):
+        EntryFactory.create_batch(2, category=self.category, brewer=self.user)
+        with self.assertRaisesMessage(ValidationError, "limit for this category"):
+            self.new_entry().clean()
+
+    def test_user_limit(self):
+        EntryFactory.create_batch(2, category=self.category, brewer=self.user)
+        EntryFactory(category=self.other_category, brewer=self.user)
+        with self.assertRaisesMessage(ValidationError, "per user"):
+            self.new_entry(category=CategoryFactory(contest=self.contest)).clean()
+
+    def test_global_limit(self):
+        EntryFactory.create_batch(4, category=self.other_category)
+        with self.assertRaisesMessage(ValidationError, "maximum number of entries"):
+            self.new_entry().clean()
+
+    def test_category_change_to_full_category(self):
+        EntryFactory.create_batch(2, category=self.other_category, brewer=self.user)
+        entry = EntryFactory(category=self.category, brewer=self.user)
+        entry.category = self.other_category
+        with self.assertRaisesMessage(ValidationError, "target category limit"):
+            entry.clean()
+
+    def test_update_without_category_change_skips_counting(self):
+        entry = EntryFactory(category=self.category, brewer=self.user)
+        entry.name = "changed"
+        with CaptureQueriesContext(connection) as ctx:
+            entry.clean()
+        self.assertEqual(len(ctx), 1)
+
+    def test_limits_validated_with_single_count_query(self):
+        entry = self.new_entry()
+        with CaptureQueriesContext(connection) as ctx:
+            entry.clean()
+        count_queries = [q for q in ctx.captured_queries if "COUNT(" in q["sql"]]
+        self.assertEqual(len(count_queries), 1)
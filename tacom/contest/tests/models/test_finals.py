@@ -0,0 +1,147 @@
+import pytest
+from contest.factories import (
+    CategoryFactory,
+    ContestFactory,
+    EntryFactory,
+    ScoreSheetFactory,
+    UserFactory,
+)
+from contest.models import Category, Entry
+from django.contrib.auth.models import Group
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+def category_with_finals(contest, entries=0, finalists=0, placed=0):
+    category = CategoryFactory(contest=contest)
+    for i in range(entries):
+        entry = EntryFactory(category=category, place=i + 1 if i < placed else 0)
+        ScoreSheetFactory(entry=entry, final_round=i < finalists)
+    return category
+
+
+@pytest.mark.unit
+class FinalRoundTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.contest = ContestFactory()
+        cls.pending = category_with_finals(cls.contest, 4, finalists=3, placed=2)
+        cls.no_finals = category_with_finals(cls.contest, 2)
+        cls.all_placed = category_with_finals(cls.contest, 3, finalists=2, placed=2)
+        cls.podium = category_with_finals(cls.contest, 5, finalists=5, placed=3)
+
+    def test_categories_annotated_in_one_query(self):
+        with self.assertNumQueries(1):
+            categories = {
+                category.pk: category
+                for category in Category.objects.with_finals().filter(
+                    contest=self.contest
+                )
+            }
+
+        expected = {
+            self.pending.pk: (3, 2, False),
+            self.no_finals.pk: (0, 0, True),
+            self.all_placed.pk: (2, 2, True),
+            self.podium.pk: (5, 3, True),
+        }
+        for pk, (finals_count, places_count, done) in expected.items():
+            with self.subTest(category=pk):
+                category = categories[pk]
+                self.assertEqual(category.finals_count, finals_count)
+                self.assertEqual(category.places_count, places_count)
+                self.assertIs(category.is_final_round_done, done)
+
+    def test_finalist_with_many_scoresheets_counted_once(self):
+        ScoreSheetFactory(entry=self.pending.entries.first(), final_round=True)
+        ScoreSheetFactory(entry=self.pending.entries.first(), final_round=False)
+
+        category = Category.objects.with_finals().get(pk=self.pending.pk)
+
+        self.assertEqual(category.finals_count, 3)
+
+    def test_model_properties_match_annotations(self):
+        category = Category.objects.get(pk=self.pending.pk)
+
+        with self.assertNumQueries(2):
+            self.assertFalse(category.is_final_round_done)
+            self.assertEqual(len(category.entries_in_final), 3)
+        self.assertTrue(Category.objects.get(pk=self.podium.pk).is_final_round_done)
+
+    def test_entries_annotated_with_final_round(self):
+        entries = Entry.objects.filter(category=self.pending).with_final_round()
+
+        with self.assertNumQueries(1):
+            flags = sorted(entry.in_final_round for entry in entries)
+
+        self.assertEqual(flags, [False, True, True, True])
+
+
+@pytest.mark.unit
+class JudgingFinalsListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.contest = ContestFactory()
+        cls.judge = UserFactory(profile=True)
+        cls.judge.groups.add(Group.objects.create(name="judge_final"))
+        category_with_finals(cls.contest, 3, finalists=2, placed=1)
+
+    def get(self):
+        self.client.force_login(self.judge)
+        url = reverse("contest:judging_finals_list", args=(self.contest.slug,))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_queries_do_not_depend_on_number_of_categories(self):
+        self.get()  # user's groups get cached
+        queries = self.get()[1]
+        for _ in range(3):
+            category_with_finals(self.contest, 4, finalists=3, placed=3)
+
+        response, more_queries = self.get()
+
+        self.assertEqual(more_queries, queries)
+        self.assertContains(response, "3 / 0")
+
+
+@pytest.mark.unit
+class JudgingFinalsCategoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.contest = ContestFactory()
+        cls.judge = UserFactory(profile=True)
+        cls.judge.groups.add(Group.objects.create(name="judge_final"))
+        cls.category = CategoryFactory(contest=cls.contest)
+        cls.entries = EntryFactory.create_batch(4, category=cls.category)
+        for entry, total in zip(cls.entries, (40, 35, 35, 20)):
+            ScoreSheetFactory(
+                entry=entry,
+                appearance_score=10,
+                aroma_score=total - 10,
+                flavor_score=0,
+                finish_score=0,
+                overall_score=0,
+                final_round=True,
+            )
+
+    def test_places_are_proposed(self):
+        self.client.force_login(self.judge)
+        url = reverse(
+            "contest:judging_finals_category",
+            args=(self.contest.slug, self.category.pk),
+        )
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {
+                form.instance.pk: form.initial["place"]
+                for form in response.context["formset"]
+            },
+            dict(zip((entry.pk for entry in self.entries), (1, 2, 2, 0))),
+        )
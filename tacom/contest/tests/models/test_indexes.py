@@ -0,0 +1,45 @@
+from io import StringIO
+
+import pytest
+from contest.models import Entry, Payment
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+
+
+@pytest.mark.unit
+class HotPathIndexesTests(TestCase):
+    def index_names(self, model):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, model._meta.db_table
+            )
+        return {name for name, info in constraints.items() if info["index"]}
+
+    def test_benchmark_reports_plans_and_restores_indexes(self):
+        out = StringIO()
+        call_command(
+            "benchmark_queries",
+            contests=1,
+            categories=2,
+            entries=20,
+            brewers=5,
+            repeat=1,
+            i_know_this_locks_tables=True,
+            stdout=out,
+        )
+
+        self.assertIn("entry by code", out.getvalue())
+        self.assertIn("no indexes", out.getvalue())
+        # seeded data and dropped indexes are rolled back
+        self.assertFalse(Entry.objects.exists())
+        for model in (Entry, Payment):
+            self.assertLessEqual(
+                {index.name for index in model._meta.indexes}, self.index_names(model)
+            )
+
+    def test_benchmark_refuses_to_lock_tables(self):
+        with self.assertRaisesMessage(CommandError, "--i-know-this-locks-tables"):
+            call_command("benchmark_queries", entries=20, stdout=StringIO())
+
+        self.assertFalse(Entry.objects.exists())
@@ -0,0 +1,120 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from contest.factories import EntryFactory, UserFactory
+from contest.models import OutboxEmail
+from contest.utils import mail_entry_status_change
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+
+class FailingForSomeBackend(EmailBackend):
+    """
+    Local memory backend refusing recipients from `failing.example.com`
+    """
+
+    opened = 0
+
+    def open(self):
+        FailingForSomeBackend.opened += 1
+        return super().open()
+
+    def send_messages(self, messages):
+        for message in messages:
+            if any(to.endswith("@failing.example.com") for to in message.to):
+                raise ConnectionError("recipient refused")
+        return super().send_messages(messages)
+
+
+@pytest.mark.unit
+class OutboxTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory.create(profile=True, email="brewer@example.com")
+        cls.entries = EntryFactory.create_batch(2, brewer=cls.user)
+
+    def queue(self, entries=None, status="PAID"):
+        with self.captureOnCommitCallbacks(execute=True):
+            mail_entry_status_change(entries or self.entries, status)
+
+    def test_queued_after_commit_not_sent(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            mail_entry_status_change(self.entries, "PAID")
+        self.assertFalse(OutboxEmail.objects.exists())
+        callbacks[0]()
+
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.to, ["brewer@example.com"])
+        self.assertEqual(email.status, OutboxEmail.Status.PENDING)
+        self.assertIn(self.entries[0].name, email.body)
+        self.assertIn(self.entries[0].name, email.html)
+        self.assertEqual(mail.outbox, [])
+
+    def test_unknown_status(self):
+        with self.assertRaises(ValueError):
+            mail_entry_status_change(self.entries, "JUDGED")
+
+    def test_deduplication(self):
+        self.queue()
+        self.queue()
+        self.queue(status="RECEIVED")
+        self.queue(entries=self.entries[:1])
+        self.assertEqual(OutboxEmail.objects.count(), 3)
+
+    def test_send_outbox(self):
+        self.queue()
+        self.queue(status="RECEIVED")
+        out = StringIO()
+        call_command("send_outbox", stdout=out)
+
+        self.assertIn("Sent: 2, failed: 0", out.getvalue())
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].alternatives[0].mimetype, "text/html")
+        self.assertFalse(
+            OutboxEmail.objects.exclude(status=OutboxEmail.Status.SENT).exists()
+        )
+
+        call_command("send_outbox", stdout=out)
+        self.assertEqual(len(mail.outbox), 2)
+
+    @override_settings(
+        EMAIL_BACKEND="contest.tests.models.test_outbox.FailingForSomeBackend"
+    )
+    def test_batch_uses_one_connection_and_retries_failures(self):
+        failing = UserFactory.create(profile=True, email="brewer@failing.example.com")
+        self.queue()
+        self.queue(entries=[EntryFactory(brewer=failing)])
+        for _ in range(3):
+            self.queue(entries=[EntryFactory(brewer=self.user)])
+        FailingForSomeBackend.opened = 0
+
+        sent, failed = OutboxEmail.objects.send_pending(batch_size=10)
+
+        self.assertEqual((sent, failed), (4, 1))
+        self.assertEqual(FailingForSomeBackend.opened, 1)
+        email = OutboxEmail.objects.get(status=OutboxEmail.Status.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertIn("recipient refused", email.last_error)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+
+        # not due yet
+        self.assertEqual(OutboxEmail.objects.send_pending(), (0, 0))
+
+    @override_settings(
+        EMAIL_BACKEND="contest.tests.models.test_outbox.FailingForSomeBackend"
+    )
+    def test_gives_up_after_max_attempts(self):
+        failing = UserFactory.create(profile=True, email="brewer@failing.example.com")
+        self.queue(entries=[EntryFactory(brewer=failing)])
+        email = OutboxEmail.objects.get()
+        for _ in range(OutboxEmail.objects.max_attempts):
+            OutboxEmail.objects.update(next_attempt_at=timezone.now() - timedelta(1))
+            OutboxEmail.objects.send_pending()
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.Status.FAILED)
+        self.assertEqual(email.attempts, OutboxEmail.objects.max_attempts)
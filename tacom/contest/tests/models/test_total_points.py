@@ -0,0 +1,85 @@
+from importlib import import_module
+
+import pytest
+from contest.factories import (
+    CategoryFactory,
+    ContestFactory,
+    EntryFactory,
+    ScoreSheetFactory,
+)
+from contest.models import Category, Entry, ScoreSheet
+from django.apps import apps
+from django.test import TestCase
+
+backfill = import_module("contest.migrations.0037_scoresheet_total_points")
+
+
+def scoresheet(entry, appearance, aroma, flavor=20, finish=10, overall=8):
+    return ScoreSheetFactory(
+        entry=entry,
+        appearance_score=appearance,
+        aroma_score=aroma,
+        flavor_score=flavor,
+        finish_score=finish,
+        overall_score=overall,
+    )
+
+
+@pytest.mark.unit
+class TotalPointsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        contest = ContestFactory()
+        cls.category = CategoryFactory(contest=contest, entries_limit=10)
+        cls.entries = EntryFactory.create_batch(3, category=cls.category)
+        cls.scoresheets = [
+            scoresheet(cls.entries[0], 10, 20),
+            scoresheet(cls.entries[0], 12, 28),
+            scoresheet(cls.entries[1], 5, 15),
+        ]
+
+    def test_stored_on_save(self):
+        self.assertEqual(
+            sorted(ScoreSheet.objects.values_list("total_points", flat=True)),
+            [58, 68, 78],
+        )
+
+        scoresheet = ScoreSheet.objects.get(pk=self.scoresheets[2].pk)
+        scoresheet.aroma_score = 30
+        scoresheet.save(update_fields=["aroma_score"])
+
+        scoresheet.refresh_from_db()
+        self.assertEqual(scoresheet.total_points, 73)
+
+    def test_sorted_and_averaged_in_database(self):
+        self.assertEqual(
+            list(
+                ScoreSheet.objects.order_by("-total_points").values_list(
+                    "total_points", flat=True
+                )
+            ),
+            [78, 68, 58],
+        )
+        scores = dict(
+            Entry.objects.filter(category=self.category)
+            .with_score()
+            .values_list("pk", "score")
+        )
+        self.assertEqual(scores[self.entries[0].pk], 73)
+        self.assertEqual(scores[self.entries[1].pk], 58)
+        self.assertIsNone(scores[self.entries[2].pk])
+
+        with self.assertNumQueries(1):
+            category = Category.objects.with_finals().get(pk=self.category.pk)
+        self.assertAlmostEqual(category.average_score, (68 + 78 + 58) / 3)
+
+    def test_backfill(self):
+        ScoreSheet.objects.update(total_points=0)
+
+        backfill.set_total_points(apps, None)
+
+        self.assertEqual(
+            sorted(ScoreSheet.objects.values_list("total_points", flat=True)),
+            [58, 68, 78],
+        )
+        self.assertNotIn(0, ScoreSheet.history.values_list("total_points", flat=True))
@@ -0,0 +1,343 @@
+import json
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from threading import Thread
+from unittest.mock import Mock, patch
+
+import pytest
+from contest import payu
+from contest.admin import check_payu_status
+from contest.factories import ContestFactory, EntryFactory, UserFactory
+from contest.models import Entry, OutboxEmail, Payment, PaymentMethod
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+
+class FakePayUHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        server = self.server
+        server.connections.add(self.client_address)
+        if self.path == payu.PAYU_OAUTH_ENDPOINT:
+            server.tokens_issued += 1
+            server.token = f"token-{server.tokens_issued}"
+            self.reply(
+                200, {"access_token": server.token, "expires_in": server.expires_in}
+            )
+        else:
+            self.reply(404, {})
+
+    def do_GET(self):
+        server = self.server
+        server.connections.add(self.client_address)
+        if self.headers["Authorization"] != f"Bearer {server.token}":
+            self.reply(401, {})
+            return
+        server.orders_checked += 1
+        code = self.path.rstrip("/").rsplit("/", 1)[-1]
+        status = server.order_statuses.get(code, server.order_status)
+        self.reply(200, {"orders": [{"status": status}]})
+
+
+class FakePayUServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakePayUHandler)
+        self.connections = set()
+        self.tokens_issued = 0
+        self.orders_checked = 0
+        self.token = None
+        self.expires_in = 43199
+        self.order_status = "PENDING"
+        self.order_statuses = {}
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+@pytest.mark.unit
+class PayUClientTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FakePayUServer()
+        Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.settings = override_settings(PAYU_URL=cls.server.url)
+        cls.settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.contest = ContestFactory()
+        cls.user = UserFactory.create(profile=True)
+        cls.payment = Payment.objects.create(
+            method=PaymentMethod.objects.create(
+                name="PayU", name_pl="PayU", code="payu"
+            ),
+            user=cls.user,
+            contest=cls.contest,
+            amount=10,
+            currency="PLN",
+            status=Payment.PaymentStatus.AWAITING,
+            code="ORDER1",
+        )
+
+    def setUp(self):
+        cache.delete(payu.PayUClient.token_cache_key)
+        self.server.connections.clear()
+        self.server.tokens_issued = 0
+        self.server.orders_checked = 0
+        self.server.token = None
+        self.server.expires_in = 43199
+        self.server.order_status = "PENDING"
+        self.server.order_statuses = {}
+        # new session, so connections from previous tests are not reused
+        client = payu.PayUClient()
+        self.addCleanup(client.session.close)
+        patcher = patch.object(payu, "client", client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_checks_reuse_token_and_connection(self):
+        for _ in range(5):
+            payu.update_user_payments_statuses(self.user)
+
+        self.assertEqual(self.server.tokens_issued, 1)
+        self.assertEqual(self.server.orders_checked, 5)
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_page_loads_read_local_state(self):
+        self.client.force_login(self.user)
+        url = reverse("contest:user_entry_list", args=(self.contest.slug,))
+        for _ in range(5):
+            response = self.client.get(url)
+            self.assertContains(response, "payu_status_widget")
+
+        self.assertEqual(self.server.tokens_issued, 0)
+        self.assertEqual(self.server.orders_checked, 0)
+
+    def test_refresh_status_on_demand(self):
+        self.client.force_login(self.user)
+        url = reverse("contest:payment_payu_status", args=(self.contest.slug,))
+
+        response = self.client.post(url)
+        self.assertNotIn("HX-Refresh", response)
+        self.assertContains(response, "Check status")
+
+        # checked recently, PayU is not asked again
+        self.server.order_status = "COMPLETED"
+        self.client.post(url)
+        self.assertEqual(self.server.orders_checked, 1)
+
+        Payment.objects.update(status_checked_at=None)
+        response = self.client.post(url)
+        self.assertEqual(response["HX-Refresh"], "true")
+        self.assertNotContains(response, "Check status")
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.PaymentStatus.OK)
+
+    def test_token_not_cached_past_expiry(self):
+        self.server.expires_in = payu.PayUClient.token_expiry_margin
+        payu.get_oauth_token()
+        payu.get_oauth_token()
+        self.assertEqual(self.server.tokens_issued, 2)
+
+    def test_rejected_token_renewed(self):
+        cache.set(payu.PayUClient.token_cache_key, "revoked")
+        self.server.order_status = "COMPLETED"
+
+        payu.update_payment_status(self.payment)
+
+        self.assertEqual(self.server.tokens_issued, 1)
+        self.assertEqual(cache.get(payu.PayUClient.token_cache_key), "token-1")
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.PaymentStatus.OK)
+
+    def test_unchanged_status_keeps_notified_one(self):
+        # notification completes the payment while its status is being checked
+        Payment.objects.filter(pk=self.payment.pk).update(
+            status=Payment.PaymentStatus.OK
+        )
+
+        changed = payu.update_payment_status(self.payment)
+
+        self.assertFalse(changed)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.PaymentStatus.OK)
+        self.assertIsNotNone(self.payment.status_checked_at)
+
+    def test_due_for_check_by_age(self):
+        now = timezone.now()
+        # (age, last checked ago)
+        cases = {
+            "new": (timedelta(minutes=5), None),
+            "young_due": (timedelta(minutes=5), timedelta(minutes=2)),
+            "young_not_due": (timedelta(minutes=5), timedelta(seconds=30)),
+            "hours_due": (timedelta(hours=1), timedelta(minutes=10)),
+            "hours_not_due": (timedelta(hours=1), timedelta(minutes=2)),
+            "old_due": (timedelta(days=3), timedelta(hours=7)),
+            "old_not_due": (timedelta(days=3), timedelta(hours=1)),
+        }
+        for code, (age, checked_ago) in cases.items():
+            payment = Payment.objects.create(
+                method=self.payment.method,
+                user=self.user,
+                contest=self.contest,
+                amount=10,
+                currency="PLN",
+                code=code,
+            )
+            Payment.objects.filter(pk=payment.pk).update(
+                created_at=now - age,
+                status_checked_at=now - checked_ago if checked_ago else None,
+            )
+        Payment.objects.filter(pk=self.payment.pk).update(status_checked_at=now)
+
+        self.assertEqual(
+            set(payu.payments_due_for_check(now).values_list("code", flat=True)),
+            {"new", "young_due", "hours_due", "old_due"},
+        )
+
+    def test_reconcile_command(self):
+        self.server.order_status = "COMPLETED"
+        for _ in range(3):
+            Payment.objects.create(
+                method=self.payment.method,
+                user=self.user,
+                contest=self.contest,
+                amount=10,
+                currency="PLN",
+                code="ORDER",
+            )
+        out = StringIO()
+        call_command("reconcile_payu", batch_size=2, workers=2, stdout=out)
+
+        self.assertIn("Checked: 4, changed: 4, errors: 0", out.getvalue())
+        self.assertEqual(self.server.tokens_issued, 1)
+        self.assertFalse(Payment.pending_payu.exists())
+
+        call_command("reconcile_payu", stdout=out)
+        self.assertEqual(self.server.orders_checked, 4)
+
+    def create_payments(self, count, contest=None):
+        payments = []
+        for i in range(count):
+            entry = EntryFactory(brewer=self.user, category__entries_limit=10)
+            payment = Payment.objects.create(
+                method=self.payment.method,
+                user=self.user,
+                contest=contest or self.contest,
+                amount=10,
+                currency="PLN",
+                status=Payment.PaymentStatus.AWAITING,
+                code=f"BULK{i}",
+            )
+            payment.entries.add(entry)
+            payments.append(payment)
+        return payments
+
+    def test_bulk_reconcile(self):
+        payments = self.create_payments(6)
+        self.server.order_statuses = {"BULK0": "COMPLETED", "BULK1": "CANCELED"}
+
+        with self.captureOnCommitCallbacks(execute=True):
+            # savepoint, 2 status updates, check time update, mark entries paid,
+            # select entries for notification, release savepoint
+            with self.assertNumQueries(7):
+                result = payu.reconcile_payments(payments, workers=3)
+
+        self.assertEqual(result, (6, 2, 0))
+        self.assertEqual(
+            dict(
+                Payment.objects.filter(code__startswith="BULK").values_list(
+                    "code", "status"
+                )
+            ),
+            {
+                "BULK0": Payment.PaymentStatus.OK,
+                "BULK1": Payment.PaymentStatus.FAILED,
+                **{f"BULK{i}": Payment.PaymentStatus.AWAITING for i in range(2, 6)},
+            },
+        )
+        self.assertEqual(
+            list(Entry.objects.filter(is_paid=True)),
+            list(payments[0].entries.all()),
+        )
+        self.assertEqual(OutboxEmail.objects.count(), 1)
+        self.assertFalse(
+            Payment.objects.filter(
+                code__startswith="BULK", status_checked_at=None
+            ).exists()
+        )
+
+    def test_reconcile_keeps_notified_status(self):
+        payments = self.create_payments(2)
+        self.server.order_statuses = {"BULK1": "CANCELED"}
+        # notifications change both payments while their statuses are fetched
+        Payment.objects.filter(code__startswith="BULK").update(
+            status=Payment.PaymentStatus.OK
+        )
+
+        result = payu.reconcile_payments(payments, workers=2)
+
+        self.assertEqual(result, (2, 0, 0))
+        self.assertEqual(
+            set(
+                Payment.objects.filter(code__startswith="BULK").values_list(
+                    "status", flat=True
+                )
+            ),
+            {Payment.PaymentStatus.OK},
+        )
+
+    def test_reconcile_unknown_contest(self):
+        with self.assertRaisesMessage(CommandError, "Contest not found: nope"):
+            call_command("reconcile_payu", contest="nope", stdout=StringIO())
+
+    def test_reconcile_contest_forced(self):
+        self.create_payments(3, contest=ContestFactory())
+        Payment.objects.update(status_checked_at=timezone.now())
+
+        call_command("reconcile_payu", contest=self.contest.slug, stdout=StringIO())
+        self.assertEqual(self.server.orders_checked, 0)
+
+        out = StringIO()
+        call_command(
+            "reconcile_payu", contest=self.contest.slug, force=True, stdout=out
+        )
+        self.assertIn("Checked: 1, changed: 0, errors: 0", out.getvalue())
+
+    def test_admin_action(self):
+        self.create_payments(2)
+        self.server.order_status = "COMPLETED"
+        modeladmin = Mock()
+
+        check_payu_status(modeladmin, None, Payment.objects.all())
+
+        self.assertIn("Checked: 3, changed: 3", modeladmin.message_user.call_args[0][1])
+        self.assertFalse(Payment.pending_payu.exists())
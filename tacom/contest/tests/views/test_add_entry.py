@@ -0,0 +1,117 @@
+from threading import Barrier, Thread
+
+from contest.factories import CategoryFactory, ContestFactory, UserFactory
+from contest.models import Entry
+from django.db import connection
+from django.test import (
+    Client,
+    TestCase,
+    TransactionTestCase,
+    skipUnlessDBFeature,
+)
+from django.urls import reverse
+
+ENTRY_DATA = {
+    "name": "Trójniak",
+    "sweetness": Entry.SweetnessLevel.SWEET,
+    "carbonation": Entry.CarbonationLevel.STILL,
+    "extra_info": "",
+    "alcohol_content": "",
+}
+
+
+class AddEntryViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = CategoryFactory(contest=ContestFactory(), entries_limit=2)
+        cls.user = UserFactory.create(profile=True)
+        cls.url = reverse("contest:add_entry_category", kwargs={"pk": cls.category.pk})
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_entry_gets_code(self):
+        self.client.post(self.url, ENTRY_DATA)
+        self.client.post(self.url, ENTRY_DATA)
+        self.assertEqual(
+            list(Entry.objects.order_by("code").values_list("code", flat=True)),
+            [1000, 1001],
+        )
+
+    def test_category_limit_blocks_registration(self):
+        for _ in range(3):
+            self.client.post(self.url, ENTRY_DATA)
+        self.assertEqual(Entry.objects.count(), 2)
+
+
+# SQLite serialises writers on the database level, concurrency needs a real server
+@skipUnlessDBFeature("has_select_for_update")
+class AddEntryViewConcurrencyTests(TransactionTestCase):
+    threads = 20
+
+    def setUp(self):
+        self.category = CategoryFactory(contest=ContestFactory(), entries_limit=5)
+        self.url = reverse(
+            "contest:add_entry_category", kwargs={"pk": self.category.pk}
+        )
+        self.users = [UserFactory.create(profile=True) for _ in range(self.threads)]
+
+    def test_concurrent_registrations_get_unique_codes(self):
+        barrier = Barrier(self.threads)
+        errors = []
+
+        def register(user):
+            client = Client()
+            client.force_login(user)
+            try:
+                barrier.wait()
+                client.post(self.url, ENTRY_DATA)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        workers = [Thread(target=register, args=(user,)) for user in self.users]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        codes = list(Entry.objects.values_list("code", flat=True))
+        self.assertEqual(len(codes), self.threads)
+        self.assertEqual(sorted(codes), list(range(1000, 1000 + self.threads)))
+
+
+@skipUnlessDBFeature("has_select_for_update")
+class AddEntryViewGlobalLimitConcurrencyTests(TransactionTestCase):
+    threads = 20
+    global_limit = 5
+
+    def setUp(self):
+        contest = ContestFactory(entry_global_limit=self.global_limit)
+        self.category = CategoryFactory(contest=contest, entries_limit=5)
+        self.url = reverse(
+            "contest:add_entry_category", kwargs={"pk": self.category.pk}
+        )
+        self.users = [UserFactory.create(profile=True) for _ in range(self.threads)]
+
+    def test_global_limit_is_not_exceeded(self):
+        barrier = Barrier(self.threads)
+
+        def register(user):
+            client = Client()
+            client.force_login(user)
+            try:
+                barrier.wait()
+                client.post(self.url, ENTRY_DATA)
+            finally:
+                connection.close()
+
+        workers = [Thread(target=register, args=(user,)) for user in self.users]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(Entry.objects.count(), self.global_limit)
@@ -0,0 +1,113 @@
+import os
+from io import BytesIO
+from unittest import mock, skipUnless
+
+import pytest
+from contest import labels
+from contest.factories import CategoryFactory, EntryFactory, UserFactory
+from contest.models import EntriesPackage
+from django.contrib.auth.models import Group
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+try:
+    import reportlab
+
+    # any TrueType font will do for tests, the ones bundled with reportlab
+    # have no Polish characters
+    TEST_FONT = os.path.join(os.path.dirname(reportlab.__file__), "fonts", "Vera.ttf")
+except ImportError:
+    TEST_FONT = None
+
+
+@pytest.mark.unit
+@skipUnless(labels.Canvas, "reportlab is not installed")
+@override_settings(LABELS_FONT=TEST_FONT)
+class LabelsPdfTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = CategoryFactory(entries_limit=20)
+        cls.brewer = UserFactory(profile=True)
+        cls.package = EntriesPackage.objects.create(
+            owner=cls.brewer, contest=cls.category.contest
+        )
+        cls.package.entries.add(
+            *EntryFactory.create_batch(13, category=cls.category, brewer=cls.brewer)
+        )
+        cls.url = reverse("contest:labels_pdf", args=(cls.package.id,))
+
+    def test_pages(self):
+        file = BytesIO()
+
+        # 2 copies of 13 entries on 24 labels per page
+        pages = labels.render_labels(labels.package_label_rows(self.package), file)
+
+        self.assertEqual(pages, 2)
+        self.assertEqual(file.getvalue().count(b"/Type /Page\n"), 2)
+
+    def test_layout_and_copies(self):
+        layout = labels.LabelLayout(columns=2, rows=5)
+        rows = [(1000 + i, "Style", "pl") for i in range(10)]
+
+        pages = labels.render_labels(rows, BytesIO(), layout=layout, copies=1)
+
+        self.assertEqual(pages, 1)
+        self.assertEqual(len(labels.label_positions(layout)), 10)
+
+    def test_long_style_name_is_fitted(self):
+        text, size = labels.fit_text("Miód pitny " * 10, "Helvetica", 9, 100)
+
+        self.assertTrue(text.endswith("…"))
+        self.assertEqual(size, 6)
+        self.assertEqual(
+            labels.fit_text("Trójniak", "Helvetica", 9, 100), ("Trójniak", 9)
+        )
+
+    def test_owner_gets_pdf(self):
+        self.client.force_login(self.brewer)
+
+        response = self.client.get(self.url, {"barcodes": "0"})
+
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+
+    def test_other_user(self):
+        self.client.force_login(UserFactory(profile=True))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_html_printout_without_reportlab(self):
+        self.client.force_login(self.brewer)
+        with mock.patch.object(labels, "Canvas", None):
+            response = self.client.get(self.url)
+        self.assertRedirects(
+            response,
+            reverse("contest:labels_print", args=(self.package.id,)),
+            fetch_redirect_response=False,
+        )
+
+    def test_html_printout_without_font(self):
+        self.client.force_login(self.brewer)
+        with override_settings(LABELS_FONT=None):
+            response = self.client.get(self.url)
+        self.assertRedirects(
+            response,
+            reverse("contest:labels_print", args=(self.package.id,)),
+            fetch_redirect_response=False,
+        )
+
+    def test_contest_labels_for_contest_staff(self):
+        url = reverse("contest:contest_labels", args=(self.category.contest.slug,))
+        self.client.force_login(UserFactory(profile=True, is_staff=True))
+        self.assertRedirects(
+            self.client.get(url),
+            reverse("contest:contest_list"),
+            fetch_redirect_response=False,
+        )
+
+        staff = UserFactory(profile=True)
+        staff.groups.add(Group.objects.create(name="contest_staff"))
+        self.client.force_login(staff)
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
@@ -0,0 +1,85 @@
+import pytest
+from contest.factories import CategoryFactory, EntryFactory, UserFactory
+from contest.models import EntriesPackage, Entry, OutboxEmail
+from contest.tests.models.test_outbox import FailingForSomeBackend
+from django.contrib.auth.models import Group
+from django.contrib.messages import get_messages
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+
+@pytest.mark.unit
+@override_settings(
+    EMAIL_BACKEND="contest.tests.models.test_outbox.FailingForSomeBackend"
+)
+class ProcessPackageDeliveredTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = CategoryFactory(entries_limit=10)
+        cls.reception = UserFactory.create(profile=True)
+        cls.reception.groups.add(Group.objects.create(name="reception"))
+        cls.brewers = [
+            UserFactory.create(profile=True, email=f"brewer{i}@example.com")
+            for i in range(3)
+        ]
+        cls.brewers[0].language = "pl"
+        cls.brewers[0].save()
+
+    def setUp(self):
+        self.client.force_login(self.reception)
+
+    def package(self, brewers):
+        package = EntriesPackage.objects.create(
+            owner=self.reception, contest=self.category.contest
+        )
+        for brewer in brewers:
+            package.entries.add(
+                *EntryFactory.create_batch(
+                    2, category=self.category, brewer=brewer, is_paid=True
+                )
+            )
+        return package
+
+    def process(self, package):
+        return self.client.post(reverse("contest:delivery_process", args=(package.pk,)))
+
+    def test_one_message_per_brewer_over_one_connection(self):
+        package = self.package(self.brewers)
+        FailingForSomeBackend.opened = 0
+
+        response = self.process(package)
+
+        self.assertRedirects(
+            response,
+            reverse("contest:delivery_select", args=(self.category.contest.slug,)),
+            fetch_redirect_response=False,
+        )
+        self.assertEqual(FailingForSomeBackend.opened, 1)
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            [brewer.email for brewer in self.brewers],
+        )
+        self.assertEqual(
+            OutboxEmail.objects.filter(status=OutboxEmail.Status.SENT).count(), 3
+        )
+        self.assertFalse(Entry.objects.filter(is_received=False).exists())
+        self.assertFalse(EntriesPackage.objects.exists())
+
+    def test_failed_recipients_reported(self):
+        failing = UserFactory.create(profile=True, email="brewer@failing.example.com")
+        package = self.package([self.brewers[0], failing])
+
+        response = self.process(package)
+
+        self.assertFalse(Entry.objects.filter(is_received=False).exists())
+        self.assertEqual(
+            [message.to for message in mail.outbox], [[self.brewers[0].email]]
+        )
+        self.assertIn(
+            "brewer@failing.example.com",
+            str(list(get_messages(response.wsgi_request))[0]),
+        )
+        email = OutboxEmail.objects.get(status=OutboxEmail.Status.PENDING)
+        self.assertEqual(email.to, ["brewer@failing.example.com"])
+        self.assertEqual(email.attempts, 1)
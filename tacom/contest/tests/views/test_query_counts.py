@@ -0,0 +1,117 @@
+import pytest
+from contest.factories import (
+    CategoryFactory,
+    ContestFactory,
+    EntryFactory,
+    ScoreSheetFactory,
+    UserFactory,
+)
+from contest.models import Entry
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+@pytest.mark.unit
+class EntryScoresheetAccessorsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = CategoryFactory(entries_limit=10)
+        cls.scored = ScoreSheetFactory(
+            entry__category=cls.category, final_round=True
+        ).entry
+        cls.not_scored = EntryFactory(category=cls.category)
+        cls.twice_scored = EntryFactory(category=cls.category)
+        ScoreSheetFactory.create_batch(2, entry=cls.twice_scored)
+
+    def entries(self, queryset):
+        entries = {entry.pk: entry for entry in queryset}
+        return (
+            entries[self.scored.pk],
+            entries[self.not_scored.pk],
+            entries[self.twice_scored.pk],
+        )
+
+    def assert_accessors(self, scored, not_scored, twice_scored):
+        self.assertEqual(scored.scoresheet.entry_id, scored.pk)
+        self.assertTrue(scored.in_final_round)
+        self.assertIsNone(not_scored.scoresheet)
+        self.assertFalse(not_scored.in_final_round)
+        self.assertIsNone(twice_scored.scoresheet)
+        self.assertFalse(twice_scored.in_final_round)
+
+    def test_with_scoresheet_does_not_query(self):
+        entries = self.entries(Entry.objects.with_scoresheet())
+        with self.assertNumQueries(0):
+            self.assert_accessors(*entries)
+
+    def test_prefetch_related_is_reused(self):
+        entries = self.entries(Entry.objects.prefetch_related("scoresheets"))
+        with self.assertNumQueries(0):
+            self.assert_accessors(*entries)
+
+    def test_not_prefetched(self):
+        entries = self.entries(Entry.objects.all())
+        with self.assertNumQueries(6):
+            self.assert_accessors(*entries)
+
+
+@pytest.mark.unit
+class EntryListsQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.contest = ContestFactory(result_is_published=True)
+        cls.category = CategoryFactory(contest=cls.contest, entries_limit=20)
+        cls.brewer = UserFactory(profile=True)
+        cls.judge = UserFactory(profile=True)
+        cls.judge.groups.add(Group.objects.create(name="judge"))
+        cls.add_entries(cls)
+
+    def setUp(self):
+        cache.clear()
+
+    def add_entries(self, n=2):
+        for place in range(1, n + 1):
+            entry = EntryFactory(
+                category=self.category,
+                brewer=self.brewer,
+                is_paid=True,
+                is_received=True,
+                place=place,
+            )
+            ScoreSheetFactory(entry=entry)
+        EntryFactory(category=self.category, brewer=self.brewer)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assert_constant_queries(self, url):
+        self.count_queries(url)  # user's groups get cached
+        queries = self.count_queries(url)
+        self.add_entries(3)
+        self.assertEqual(self.count_queries(url), queries)
+
+    def test_judging_list(self):
+        self.client.force_login(self.judge)
+        self.assert_constant_queries(
+            reverse("contest:judging_list", args=(self.contest.slug,))
+        )
+
+    def test_results(self):
+        url = reverse("contest:contest_results", args=(self.contest.slug,))
+        queries = self.count_queries(url)
+        # cached results are invalidated by new places and rendered again
+        self.add_entries(3)
+        self.assertEqual(self.count_queries(url), queries)
+
+    def test_user_entry_list(self):
+        self.client.force_login(self.brewer)
+        self.assert_constant_queries(
+            reverse("contest:user_entry_list", args=(self.contest.slug,))
+        )
@@ -0,0 +1,85 @@
+from io import StringIO
+from tempfile import TemporaryDirectory
+
+import pytest
+from contest.checks import check_shared_cache
+from contest.factories import CategoryFactory, ContestFactory, EntryFactory
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+FILE_CACHE = "django.core.cache.backends.filebased.FileBasedCache"
+
+
+@pytest.mark.unit
+class ResultsCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.contest = ContestFactory(result_is_published=True)
+        category = CategoryFactory(contest=cls.contest, entries_limit=5)
+        cls.winner = EntryFactory(category=category, name="Winner", place=1)
+        cls.other = EntryFactory(category=category, name="Runner")
+        cls.url = reverse("contest:contest_results", args=(cls.contest.slug,))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_results_do_not_query(self):
+        self.assertContains(self.client.get(self.url), "Winner")
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertContains(response, "Winner")
+        self.assertNotContains(response, "Runner")
+        # cached HTML is not escaped again
+        self.assertContains(response, "<table")
+
+    def test_place_change_invalidates(self):
+        self.client.get(self.url)
+        self.other.place = 2
+        self.other.save()
+        self.assertContains(self.client.get(self.url), "Runner")
+
+        self.other.place = 0
+        self.other.save()
+        self.assertNotContains(self.client.get(self.url), "Runner")
+
+    def test_not_placed_entry_change_keeps_cache(self):
+        self.client.get(self.url)
+        self.other.name = "Renamed"
+        self.other.save()
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+    def test_contest_change_invalidates(self):
+        self.client.get(self.url)
+        self.contest.bos_entry = self.winner
+        self.contest.save()
+        self.assertContains(self.client.get(self.url), "Best Of Show")
+
+        self.contest.result_is_published = False
+        self.contest.save()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_language_cached_separately(self):
+        self.assertContains(self.client.get(self.url), "Place")
+        pl_url = self.url.replace("/en/", "/pl/", 1)
+        self.assertEqual(self.client.get(pl_url).status_code, 200)
+        with self.assertNumQueries(0):
+            self.client.get(pl_url)
+
+    def test_warm_up_command(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        shared = {"default": {"BACKEND": FILE_CACHE, "LOCATION": directory.name}}
+        out = StringIO()
+        with override_settings(CACHES=shared):
+            call_command("warm_results_cache", stdout=out)
+            self.assertIn(f"{self.contest.slug}: results cached.", out.getvalue())
+            with self.assertNumQueries(0):
+                self.assertContains(self.client.get(self.url), "Winner")
+
+    def test_warm_up_needs_shared_cache(self):
+        with self.assertRaisesMessage(CommandError, "local to this process"):
+            call_command("warm_results_cache", stdout=StringIO())
+        self.assertIn("contest.W001", [w.id for w in check_shared_cache(None)])
@@ -0,0 +1,84 @@
+import pytest
+from contest.cache import get_user_groups, user_groups_key
+from contest.factories import ContestFactory, UserFactory
+from contest.models import User
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+@pytest.mark.unit
+class UserGroupsCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.contest = ContestFactory()
+        cls.reception = Group.objects.create(name="reception")
+        cls.user = UserFactory.create(profile=True)
+        cls.user.groups.add(cls.reception)
+        cls.delivery_url = reverse("contest:delivery_select", args=(cls.contest.slug,))
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def groups_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), [q for q in queries if '"auth_group"' in q["sql"]]
+
+    def test_page_drops_groups_query(self):
+        rules_url = reverse("contest:contest_rules", args=(self.contest.slug,))
+        for url in (rules_url, self.delivery_url):
+            with self.subTest(url=url):
+                cache.clear()
+                count, groups = self.groups_queries(url)
+                # mixin and navbar share one lookup
+                self.assertEqual(len(groups), 1)
+
+                cached_count, groups = self.groups_queries(url)
+                self.assertEqual(groups, [])
+                self.assertEqual(cached_count, count - 1)
+
+    def test_membership_change_invalidates(self):
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(get_user_groups(user), {"reception"})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.remove(self.reception)
+        self.assertEqual(self.client.get(self.delivery_url).status_code, 302)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reception.user_set.add(self.user)
+        self.assertEqual(self.client.get(self.delivery_url).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reception.user_set.clear()
+        self.assertEqual(self.client.get(self.delivery_url).status_code, 302)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.set([self.reception])
+        self.assertEqual(self.client.get(self.delivery_url).status_code, 200)
+
+    def test_invalidated_on_commit(self):
+        self.client.get(self.delivery_url)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.groups.remove(self.reception)
+        # concurrent request reads groups before the commit and caches them
+        cache.set(user_groups_key(self.user.pk), frozenset({"reception"}))
+        self.assertEqual(self.client.get(self.delivery_url).status_code, 200)
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(self.client.get(self.delivery_url).status_code, 302)
+
+    def test_group_rename_invalidates(self):
+        self.client.get(self.delivery_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reception.name = "reception_old"
+            self.reception.save()
+        self.assertEqual(self.client.get(self.delivery_url).status_code, 302)
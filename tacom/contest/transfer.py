@@ -0,0 +1,371 @@
+"""
+Moving a single contest between environments (dumpcompetition / loadcompetition).
+
+Dump is gzip-compressed JSON Lines: a header followed by one line per object,
+grouped by model in the order of TRANSFERS, so every referenced object is loaded
+before the objects referring to it. Objects refer to each other with natural keys
+(username, style slug, entry code...) instead of primary keys, the contest itself
+is implied, so the dump can be loaded under another slug or into another database.
+"""
+
+import gzip
+import json
+from collections import Counter
+from dataclasses import dataclass, field
+from itertools import groupby, islice
+from operator import itemgetter
+from typing import Callable
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Max, Q, QuerySet
+
+from .cache import bump_results_version
+from .models import (
+    Category,
+    Contest,
+    Entry,
+    EntryCodeCounter,
+    Payment,
+    PaymentMethod,
+    ScoreSheet,
+    Style,
+    User,
+)
+from .models.judges import JudgeCertification, JudgeInCompetition
+
+DUMP_FORMAT = "tacom-competition"
+DUMP_VERSION = 1
+TRANSFER_BATCH_SIZE = 1000
+
+
+def contest_users(contest: Contest) -> QuerySet:
+    return User.objects.filter(
+        Q(pk__in=Entry.objects.filter(category__contest=contest).values("brewer"))
+        | Q(pk__in=Payment.objects.filter(contest=contest).values("user"))
+        | Q(pk__in=JudgeInCompetition.objects.filter(contest=contest).values("user"))
+    )
+
+
+def contest_payment_methods(contest: Contest) -> QuerySet:
+    return PaymentMethod.objects.filter(
+        Q(contests=contest)
+        | Q(pk__in=Payment.objects.filter(contest=contest).values("method"))
+    ).distinct()
+
+
+@dataclass(frozen=True)
+class ModelTransfer:
+    """
+    How objects of the model are dumped and loaded.
+
+    `key` is the lookup of object's natural key, needed when other objects refer
+    to it. `relations` map foreign keys to lookups of natural keys of the related
+    objects, foreign keys to the contest are implied and other ones (audit fields)
+    are left empty. `deferred` relations point to objects loaded later and are set
+    at the end. `shared` objects (users, styles...) are not contest specific,
+    existing ones are reused and never overwritten, unless their `matched` fields
+    differ from the dumped ones (another object under the same key). `excluded`
+    fields are never dumped, loaded objects get their defaults.
+    """
+
+    model: type
+    objects: Callable[[Contest], QuerySet]
+    key: str | None = None
+    relations: dict = field(default_factory=dict)
+    deferred: dict = field(default_factory=dict)
+    shared: bool = False
+    matched: tuple = ()
+    excluded: tuple = ()
+
+    @property
+    def label(self):
+        return self.model._meta.label_lower
+
+    @property
+    def fields(self):
+        # timestamps maintained by the database layer cannot be restored
+        return [
+            model_field
+            for model_field in self.model._meta.concrete_fields
+            if not model_field.primary_key
+            and not model_field.is_relation
+            and model_field.name not in self.excluded
+            and not getattr(model_field, "auto_now", False)
+            and not getattr(model_field, "auto_now_add", False)
+        ]
+
+
+TRANSFERS = (
+    # credentials and privileges do not leave the database, loaded users
+    # cannot log in until they reset their passwords; existing user with the same
+    # username and another email is another person
+    ModelTransfer(
+        User,
+        contest_users,
+        key="username",
+        shared=True,
+        matched=("email",),
+        excluded=("password", "last_login", "is_staff", "is_superuser"),
+    ),
+    ModelTransfer(
+        JudgeCertification,
+        lambda contest: JudgeCertification.objects.filter(
+            user__judgeincompetition__contest=contest
+        ),
+        key="user__username",
+        relations={"user": "user__username"},
+        shared=True,
+    ),
+    ModelTransfer(
+        Style,
+        lambda contest: Style.objects.filter(categories__contest=contest),
+        key="slug",
+        shared=True,
+    ),
+    ModelTransfer(PaymentMethod, contest_payment_methods, key="code", shared=True),
+    ModelTransfer(
+        Contest,
+        lambda contest: Contest.objects.filter(pk=contest.pk),
+        deferred={"bos_entry": "bos_entry__code"},
+    ),
+    ModelTransfer(
+        Contest.payment_methods.through,
+        lambda contest: Contest.payment_methods.through.objects.filter(contest=contest),
+        relations={"paymentmethod": "paymentmethod__code"},
+    ),
+    ModelTransfer(
+        Category,
+        lambda contest: Category.objects.filter(contest=contest),
+        key="style__slug",
+        relations={"style": "style__slug"},
+    ),
+    ModelTransfer(
+        Entry,
+        lambda contest: Entry.objects.filter(category__contest=contest),
+        key="code",
+        relations={"category": "category__style__slug", "brewer": "brewer__username"},
+    ),
+    ModelTransfer(
+        ScoreSheet,
+        lambda contest: ScoreSheet.objects.filter(entry__category__contest=contest),
+        relations={"entry": "entry__code"},
+    ),
+    ModelTransfer(
+        Payment,
+        lambda contest: Payment.objects.filter(contest=contest),
+        key="id",
+        relations={"method": "method__code", "user": "user__username"},
+    ),
+    ModelTransfer(
+        Payment.entries.through,
+        lambda contest: Payment.entries.through.objects.filter(
+            payment__contest=contest
+        ),
+        relations={"payment": "payment_id", "entry": "entry__code"},
+    ),
+    ModelTransfer(
+        JudgeInCompetition,
+        lambda contest: JudgeInCompetition.objects.filter(contest=contest),
+        relations={"user": "user__username"},
+    ),
+)
+TRANSFERS_BY_LABEL = {transfer.label: transfer for transfer in TRANSFERS}
+TRANSFERS_BY_MODEL = {transfer.model: transfer for transfer in TRANSFERS}
+
+
+def dump_records(contest: Contest, chunk_size=TRANSFER_BATCH_SIZE):
+    """
+    Objects of the contest as dictionaries, model by model.
+    Rows are fetched in chunks, so memory use does not depend on the contest size.
+    """
+    for transfer in TRANSFERS:
+        names = [model_field.name for model_field in transfer.fields]
+        names += [*transfer.relations, *transfer.deferred]
+        lookups = [model_field.attname for model_field in transfer.fields]
+        lookups += [*transfer.relations.values(), *transfer.deferred.values()]
+        if transfer.key:
+            lookups.append(transfer.key)
+        rows = (
+            transfer.objects(contest)
+            .order_by()
+            .values_list(*lookups)
+            .iterator(chunk_size=chunk_size)
+        )
+        for row in rows:
+            record = {"model": transfer.label, "fields": dict(zip(names, row))}
+            if transfer.key:
+                record["key"] = row[-1]
+            yield record
+
+
+def dump_competition(contest: Contest, path, chunk_size=TRANSFER_BATCH_SIZE) -> Counter:
+    """
+    Writes the contest to gzip-compressed JSON Lines file,
+    returns numbers of dumped objects by model.
+    """
+    counts = Counter()
+    header = {"format": DUMP_FORMAT, "version": DUMP_VERSION, "contest": contest.slug}
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        file.write(json.dumps(header) + "\n")
+        for record in dump_records(contest, chunk_size):
+            file.write(json.dumps(record, cls=DjangoJSONEncoder) + "\n")
+            counts[record["model"]] += 1
+    return counts
+
+
+class CompetitionLoader:
+    """
+    Inserts dumped objects with bulk_create in batches. Natural keys are
+    resolved through in-memory maps of loaded (or reused) objects:
+    {model label: {natural key: primary key}}.
+
+    bulk_create skips save() and signals, entries counters and entry codes
+    counter of the loaded contest are rebuilt at the end.
+    """
+
+    def __init__(self, slug=None, batch_size=TRANSFER_BATCH_SIZE):
+        self.slug = slug
+        self.batch_size = batch_size
+        self.keys = {transfer.label: {} for transfer in TRANSFERS}
+        self.deferred = []
+        self.counts = Counter()
+        self.contest = None
+
+    def load(self, lines) -> Contest:
+        lines = iter(lines)
+        header = json.loads(next(lines, "{}"))
+        if header.get("format") != DUMP_FORMAT:
+            raise ValueError("Not a competition dump.")
+        if header.get("version") != DUMP_VERSION:
+            raise ValueError(f"Unsupported dump version: {header.get('version')}.")
+
+        records = (json.loads(line) for line in lines if line.strip())
+        with transaction.atomic():
+            for label, model_records in groupby(records, key=itemgetter("model")):
+                transfer = TRANSFERS_BY_LABEL.get(label)
+                if transfer is None:
+                    raise ValueError(f"Unknown model in the dump: {label}.")
+                while batch := list(islice(model_records, self.batch_size)):
+                    self.load_batch(transfer, batch)
+            if self.contest is None:
+                raise ValueError("No contest in the dump.")
+            self.finish()
+        return self.contest
+
+    def resolve(self, model_field, key):
+        if key is None:
+            return None
+        related = TRANSFERS_BY_MODEL[model_field.related_model]
+        try:
+            return self.keys[related.label][key]
+        except KeyError:
+            raise ValueError(f"{related.label} not found in the dump: {key}.") from None
+
+    def build(self, transfer: ModelTransfer, record):
+        values = record["fields"]
+        objects = {
+            model_field.attname: model_field.to_python(values[model_field.name])
+            for model_field in transfer.fields
+            if model_field.name in values
+        }
+        for name in transfer.relations:
+            model_field = transfer.model._meta.get_field(name)
+            objects[model_field.attname] = self.resolve(model_field, values[name])
+        for model_field in transfer.model._meta.concrete_fields:
+            if model_field.is_relation and model_field.related_model is Contest:
+                objects[model_field.attname] = self.contest.pk
+        obj = transfer.model(**objects)
+        if transfer.model is User:
+            obj.set_unusable_password()
+        return obj
+
+    def load_batch(self, transfer: ModelTransfer, records):
+        if transfer.model is Contest:
+            return self.load_contest(transfer, records)
+        keys = self.keys[transfer.label]
+        if transfer.shared:
+            existing = {
+                key: (pk, matched)
+                for key, pk, *matched in transfer.model.objects.filter(
+                    **{f"{transfer.key}__in": [record["key"] for record in records]}
+                ).values_list(transfer.key, "pk", *transfer.matched)
+            }
+            for record in records:
+                if record["key"] not in existing:
+                    continue
+                dumped = [record["fields"].get(name) for name in transfer.matched]
+                if dumped != existing[record["key"]][1]:
+                    raise ValueError(
+                        f"{transfer.label} {record['key']} already exists with "
+                        f"another {', '.join(transfer.matched)}."
+                    )
+            keys.update((key, pk) for key, (pk, _matched) in existing.items())
+            records = [record for record in records if record["key"] not in keys]
+            if not records:
+                return
+        if self.contest is None and not transfer.shared:
+            raise ValueError("Contest has to be dumped before its objects.")
+
+        objects = [self.build(transfer, record) for record in records]
+        transfer.model.objects.bulk_create(objects)
+        self.counts[transfer.label] += len(objects)
+        if not transfer.key:
+            return
+        keys.update(
+            (record["key"], obj.pk)
+            for record, obj in zip(records, objects)
+            if obj.pk is not None
+        )
+        if any(obj.pk is None for obj in objects):
+            # database does not return primary keys of inserted rows
+            keys.update(
+                transfer.model.objects.filter(
+                    **{f"{transfer.key}__in": [record["key"] for record in records]}
+                ).values_list(transfer.key, "pk")
+            )
+
+    def load_contest(self, transfer: ModelTransfer, records):
+        if self.contest is not None or len(records) != 1:
+            raise ValueError("Dump has to contain exactly one contest.")
+        (record,) = records
+        contest = self.build(transfer, record)
+        if self.slug:
+            contest.slug = self.slug
+        if Contest.objects.filter(slug=contest.slug).exists():
+            raise ValueError(f"Contest already exists: {contest.slug}.")
+        contest.save()
+        self.contest = contest
+        self.counts[transfer.label] += 1
+        for name in transfer.deferred:
+            self.deferred.append((contest, name, record["fields"][name]))
+
+    def finish(self):
+        for obj, name, key in self.deferred:
+            model_field = obj._meta.get_field(name)
+            setattr(obj, model_field.attname, self.resolve(model_field, key))
+            obj.save(update_fields=[name])
+
+        # registration of new entries continues after the loaded codes
+        last_code = Entry.objects.filter(category__contest=self.contest).aggregate(
+            last_code=Max("code")
+        )["last_code"]
+        EntryCodeCounter.objects.update_or_create(
+            contest=self.contest,
+            defaults={
+                "last_code": last_code or EntryCodeCounter.objects.first_code - 1
+            },
+        )
+        self.contest.recount_entries()
+        bump_results_version(self.contest.slug)
+
+
+def load_competition(path, slug=None, batch_size=TRANSFER_BATCH_SIZE):
+    """
+    Loads the contest from the dump written by dump_competition, optionally
+    under another slug. Returns the contest and numbers of created objects by model.
+    """
+    loader = CompetitionLoader(slug, batch_size)
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        contest = loader.load(file)
+    return contest, loader.counts
@@ -17,4 +17,14 @@ urlpatterns = [
         views.ContestDeliveryAddressView.as_view(),
         name="contest_address",
     ),
+    path(
+        "details/<str:slug>/entries.<str:export_format>",
+        views.ContestEntriesExportView.as_view(),
+        name="contest_entries_export",
+    ),
+    path(
+        "details/<str:slug>/labels.pdf",
+        views.ContestLabelsView.as_view(),
+        name="contest_labels",
+    ),
 ]
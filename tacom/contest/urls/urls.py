@@ -67,6 +67,11 @@ urlpatterns = [
         views.PayUNotificationView.as_view(),
         name="payment_payu_notification",
     ),
+    path(
+        "payment/payu/status/<str:slug>/",
+        views.PayUStatusRefreshView.as_view(),
+        name="payment_payu_status",
+    ),
     path(
         "payment/<uuid:payment_id>/paypal/",
         views.PayPalDispatchView.as_view(),
@@ -90,6 +95,11 @@ urlpatterns = [
         views.LabelPrintoutView.as_view(),
         name="labels_print",
     ),
+    path(
+        "print/<uuid:package_id>/pdf/",
+        views.LabelsPdfView.as_view(),
+        name="labels_pdf",
+    ),
     path(
         "<str:slug>/mgmt/delivery/",
         views.AddPackageOfDelivered.as_view(),
@@ -1,20 +1,56 @@
-from datetime import date
+from collections import defaultdict
+from hashlib import sha256
 
 from django.conf import settings
 from django.core.mail import EmailMultiAlternatives
+from django.db import transaction
+from django.db.models import QuerySet
 from django.template.loader import get_template
 from django.urls import reverse
-from django.utils import translation
+from django.utils import timezone, translation
+
+ENTRY_STATUS_TEMPLATES = {
+    "PAID": "entries_paid",
+    "RECEIVED": "entries_received",
+}
 
 
 def open_contests():
     from .models import Contest
 
-    return (
-        Contest.objects.filter(competition_is_published=True)
-        .filter(registration_date_from__lte=date.today())
-        .filter(registration_date_to__gte=date.today())
-    )
+    return Contest.objects.filter(phase=Contest.Phase.REGISTRATION)
+
+
+def contest_phase(contest, now=None) -> str:
+    """
+    Lifecycle phase of the contest derived from publication flags and dates.
+    """
+    now = now or timezone.now()
+    today = now.date()
+
+    def passed(moment):
+        return moment is not None and moment <= now
+
+    def started(day):
+        return day is not None and day <= today
+
+    if not (
+        contest.competition_is_published
+        or passed(contest.competition_autopublish_datetime)
+    ):
+        return "draft"
+    if contest.result_is_published or passed(contest.result_autopublish_datetime):
+        return "results"
+    if started(contest.registration_date_from) and (
+        contest.registration_date_to is not None
+        and today <= contest.registration_date_to
+    ):
+        return "registration"
+    if started(contest.judging_date_from):
+        return "judging"
+    if started(contest.delivery_date_from):
+        return "delivery"
+    return "published"
 
 
 def get_client_ip(request):
@@ -27,37 +63,75 @@ def get_client_ip(request):
 
 
 def mail_entry_status_change(entries, new_status):
-    template = {
-        "PAID": "entries_paid",
-        "RECEIVED": "entries_received",
-    }
-    old_language = translation.get_language()
+    """
+    Queues notifications about entries status change to their brewers.
+    Messages are rendered and queued once the current transaction commits,
+    they are sent by `manage.py send_outbox`.
+    """
+    entries = evaluate_entries(entries, new_status)
+    if entries:
+        transaction.on_commit(lambda: queue_entry_status_change(entries, new_status))
+
 
-    if new_status not in template.keys():
+def evaluate_entries(entries, new_status):
+    if new_status not in ENTRY_STATUS_TEMPLATES.keys():
         raise ValueError(
             f"mail_entry_status_change: no template defined for status: {new_status}."
         )
-    template_txt = get_template("contest/email/" + template.get(new_status) + ".txt")
-    template_html = get_template("contest/email/" + template.get(new_status) + ".html")
-
-    user = entries[0].brewer
-    translation.activate(user.language)
-    contest = entries[0].category.contest
-    context = {
-        "username": user.first_name,
-        "new_status": new_status,
-        "entries": entries,
-        "contest": contest.title,
-        "link": settings.DEFAULT_DOMAIN
-        + reverse("contest:add_entry_contest", args=(contest.slug,)),
-    }
+    # evaluate now, relations (eg. package entries) may be gone after commit
+    if isinstance(entries, QuerySet):
+        entries = entries.select_related(
+            "brewer", "category__style", "category__contest"
+        ).order_by("brewer_id", "code")
+    return list(entries)
+
+
+def queue_entry_status_change(entries, new_status):
+    """
+    Renders one message per brewer and stores them in the outbox.
+    Brewers are grouped by language, so each language is activated once
+    and both templates are compiled once for the whole batch.
+    Returns queued messages, already queued ones are skipped.
+    """
+    from .models import OutboxEmail
+
+    entries = evaluate_entries(entries, new_status)
+    template = ENTRY_STATUS_TEMPLATES[new_status]
+    template_txt = get_template("contest/email/" + template + ".txt")
+    template_html = get_template("contest/email/" + template + ".html")
+
+    brewers_entries = defaultdict(list)
+    for entry in entries:
+        brewers_entries[entry.brewer].append(entry)
+    languages = defaultdict(list)
+    for user in brewers_entries:
+        languages[user.language].append(user)
+
     subject = "KMP Bartnik - status change"
     from_email = "KMP Bartnik <KMP.Bartnik@gmail.com>"
-    to = user.email
-    text_content = template_txt.render(context)
-    html_content = template_html.render(context)
-    msg = EmailMultiAlternatives(subject, text_content, from_email, [to])
-    msg.attach_alternative(html_content, "text/html")
-    msg.send()
-
-    translation.activate(old_language)
+    queued = []
+    for language, users in languages.items():
+        with translation.override(language):
+            for user in users:
+                user_entries = brewers_entries[user]
+                contest = user_entries[0].category.contest
+                context = {
+                    "username": user.first_name,
+                    "new_status": new_status,
+                    "entries": user_entries,
+                    "contest": contest.title,
+                    "link": settings.DEFAULT_DOMAIN
+                    + reverse("contest:add_entry_contest", args=(contest.slug,)),
+                }
+                msg = EmailMultiAlternatives(
+                    subject, template_txt.render(context), from_email, [user.email]
+                )
+                msg.attach_alternative(template_html.render(context), "text/html")
+
+                # the same status change of the same entries is notified only once
+                entries_ids = ",".join(sorted(str(entry.pk) for entry in user_entries))
+                dedup_key = f"{new_status}:{sha256(entries_ids.encode()).hexdigest()}"
+                email = OutboxEmail.objects.enqueue(msg, dedup_key=dedup_key)
+                if email is not None:
+                    queued.append(email)
+    return queued
@@ -1,12 +1,77 @@
+from hashlib import sha256
+from tempfile import TemporaryFile
+
+from contest import export, labels
+from contest.cache import get_user_groups
 from contest.models import Category, Contest
-from django.db.models import Prefetch
+from contest.views.views import GroupRequiredMixin
+from django.contrib import messages
+from django.db.models import Max, Prefetch
+from django.http import FileResponse, Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from django.utils.functional import cached_property
-from django.views.generic import DetailView
+from django.utils.http import content_disposition_header
+from django.utils.translation import get_language
+from django.views.decorators.http import condition
+from django.views.generic import DetailView, View
 from django.views.generic.base import ContextMixin
 
 
-class ContestDetailView(DetailView):
+class ContestConditionalGetMixin:
+    """
+    Answers conditional GET with 304 Not Modified, without rendering the page,
+    when the contest, its categories and styles have not been modified.
+    ETag also covers language, user with groups and staff flag (navbar),
+    htmx request (template used) and whatever get_etag_state returns for date
+    dependent content. Pages with pending messages are always rendered.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        response = condition(etag_func=self.get_etag)(super().dispatch)(
+            request, *args, **kwargs
+        )
+        patch_vary_headers(response, ("HX-Request",))
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def get_etag_state(self, contest: Contest) -> tuple:
+        return ()
+
+    def get_etag(self, request, *args, **kwargs):
+        # len() does not mark the messages as shown
+        if len(messages.get_messages(request)):
+            return None
+        contest = (
+            self.get_queryset()
+            .prefetch_related(None)
+            .filter(slug=self.kwargs["slug"])
+            .annotate(
+                categories_modified_at=Max("categories__modified_at"),
+                styles_modified_at=Max("categories__style__modified_at"),
+            )
+            .order_by()
+            .first()
+        )
+        if contest is None:
+            return None
+        state = (
+            self.__class__.__name__,
+            contest.pk,
+            contest.modified_at,
+            contest.categories_modified_at,
+            contest.styles_modified_at,
+            get_language(),
+            request.user.pk,
+            request.user.is_staff,
+            sorted(get_user_groups(request.user)),
+            request.headers.get("HX-Request") == "true",
+            *self.get_etag_state(contest),
+        )
+        return sha256(repr(state).encode()).hexdigest()
+
+
+class ContestDetailView(ContestConditionalGetMixin, DetailView):
     model = Contest
     # queryset = Contest.objects.prefetch_related('categories__style')  # 2 queries
     # queryset = Contest.published.prefetch_related(
@@ -32,13 +97,21 @@ class ContestDetailView(DetailView):
         else:
             return ["contest/contest/contest_detail_standalone.html"]
 
+    def get_etag_state(self, contest: Contest) -> tuple:
+        # buttons depend on current date and number of entries
+        return (
+            contest.is_registrable,
+            contest.show_results,
+            contest.can_judges_register,
+        )
+
 
-class ContestRulesView(DetailView):
+class ContestRulesView(ContestConditionalGetMixin, DetailView):
     model = Contest
     template_name = "contest/contest/contest_rules.html"
 
 
-class ContestDeliveryAddressView(DetailView):
+class ContestDeliveryAddressView(ContestConditionalGetMixin, DetailView):
     model = Contest
     template_name = "contest/contest/contest_delivery_addr.html"
     queryset = Contest.published
@@ -57,3 +130,54 @@ class ContestContextMixin(ContextMixin):
         context = super().get_context_data(**kwargs)
         context["contest"] = self.contest
         return context
+
+
+class ContestEntriesExportView(GroupRequiredMixin, ContestContextMixin, View):
+    """
+    Entries of the contest for organisers (contest staff): CSV is streamed
+    as rows are read, XLSX (needs openpyxl) is built in a temporary file.
+    """
+
+    groups_required = ("contest_staff",)
+
+    def get(self, request, *args, **kwargs):
+        export_format = self.kwargs["export_format"]
+        filename = f"{self.contest.slug}-entries.{export_format}"
+        if export_format == "csv":
+            response = StreamingHttpResponse(
+                export.csv_lines(self.contest), content_type="text/csv"
+            )
+            response["Content-Disposition"] = content_disposition_header(
+                True, filename
+            )
+            return response
+        if export_format == "xlsx" and export.xlsx_available():
+            file = TemporaryFile()
+            export.write_xlsx(self.contest, file)
+            file.seek(0)
+            return FileResponse(file, as_attachment=True, filename=filename)
+        raise Http404
+
+
+class ContestLabelsView(GroupRequiredMixin, ContestContextMixin, View):
+    """
+    Labels of all entries of the contest as PDF, for organisers (contest staff).
+    """
+
+    groups_required = ("contest_staff",)
+
+    def get(self, request, *args, **kwargs):
+        if not labels.pdf_available():
+            raise Http404
+        file = TemporaryFile()
+        labels.render_labels(
+            labels.contest_label_rows(self.contest),
+            file,
+            barcodes=request.GET.get("barcodes") != "0",
+        )
+        file.seek(0)
+        return FileResponse(
+            file,
+            filename=f"{self.contest.slug}-labels.pdf",
+            content_type="application/pdf",
+        )
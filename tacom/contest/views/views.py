@@ -1,10 +1,14 @@
 import abc
 import json
 import os
+from datetime import timedelta
 from decimal import Decimal
 from logging import getLogger
+from tempfile import TemporaryFile
 
-from contest import payu
+import requests
+from contest import judging, labels, payu, ranking
+from contest.cache import get_results, get_user_groups
 from contest.forms import (
     BlankForm,
     ContestBestOfShowForm,
@@ -23,18 +27,21 @@ from contest.models import (
     Contest,
     EntriesPackage,
     Entry,
+    OutboxEmail,
     Payment,
     RebateCode,
     ScoreSheet,
     User,
 )
-from contest.utils import get_client_ip, mail_entry_status_change
+from contest.models.judges import JudgingTable
+from contest.utils import get_client_ip, queue_entry_status_change
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.core.exceptions import PermissionDenied
-from django.db.models import Case, Count, IntegerField, Prefetch, When
-from django.http import HttpResponse, HttpResponseRedirect
+from django.db import transaction
+from django.db.models import Count, Prefetch, Q
+from django.http import FileResponse, HttpResponse, HttpResponseRedirect
 from django.shortcuts import Http404, get_object_or_404, redirect, render
 from django.urls import reverse, reverse_lazy
 from django.utils.decorators import method_decorator
@@ -138,8 +145,7 @@ class GroupRequiredMixin(UserPassesTestMixin):
         if len(self.groups_required) == 0:
             return True
         groups = set(self.groups_required)
-        user_groups = set(self.request.user.groups.values_list("name", flat=True))
-        return groups == groups.intersection(user_groups)
+        return groups <= get_user_groups(self.request.user)
 
     def handle_no_permission(self):
         messages.warning(
@@ -159,7 +165,24 @@ class UserOwnsPackageMixin(UserPassesTestMixin):
         raise Http404
 
 
-class UsersEntryListView(LoginRequiredMixin, UserFullProfileMixin, ListView):
+class PendingPayUPaymentsMixin(ContextMixin):
+    """
+    Adds user's PayU payments awaiting confirmation to the context.
+    Statuses are updated by `manage.py reconcile_payu`,
+    user can request a check with PayUStatusRefreshView.
+    """
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["pending_payu_payments"] = Payment.pending_payu.filter(
+            user=self.request.user, contest=self.contest, code__isnull=False
+        )
+        return context
+
+
+class UsersEntryListView(
+    LoginRequiredMixin, UserFullProfileMixin, PendingPayUPaymentsMixin, ListView
+):
     """
     Displays list of user's entries - priomary purpose is to let him view
     the results after the registration has ended
@@ -177,7 +200,6 @@ class UsersEntryListView(LoginRequiredMixin, UserFullProfileMixin, ListView):
         return super().dispatch(request, *args, **kwargs)
 
     def get_queryset(self):
-        payu.update_user_payments_statuses(self.request.user)
         return (
             Entry.objects.filter(brewer=self.request.user)
             .filter(category__contest=self.contest)
@@ -191,7 +213,11 @@ class UsersEntryListView(LoginRequiredMixin, UserFullProfileMixin, ListView):
 
 
 class AddEntryStyleListView(
-    LoginRequiredMixin, UserFullProfileMixin, ContestAcceptsRegistration, ListView
+    LoginRequiredMixin,
+    UserFullProfileMixin,
+    ContestAcceptsRegistration,
+    PendingPayUPaymentsMixin,
+    ListView,
 ):
     """
     Allows selection of the Style (via Category), to which user wants to register.
@@ -202,13 +228,7 @@ class AddEntryStyleListView(
     context_object_name = "categories"
 
     def get_queryset(self):
-        payu.update_user_payments_statuses(self.request.user)
-        return (
-            Category.objects.not_full(self.request.user)
-            .filter(contest=self.contest)
-            .select_related("style")
-            .order_by("style__name")
-        )
+        return Category.objects.availability(self.contest, self.request.user)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -275,6 +295,11 @@ class AddEntryView(LoginRequiredMixin, UserFullProfileMixin, CreateView):
         form_kwargs["return_url"] = self.get_success_url()
         return form_kwargs
 
+    @method_decorator(transaction.atomic)
+    def post(self, request, *args, **kwargs):
+        # contest row locked by Entry.clean() stays locked until the entry is saved
+        return super().post(request, *args, **kwargs)
+
     def get_success_url(self):
         return reverse(
             "contest:add_entry_contest",
@@ -312,6 +337,11 @@ class EditEntryView(UserPassesTestMixin, UpdateView):
         form_kwargs["return_url"] = self.get_success_url()
         return form_kwargs
 
+    @method_decorator(transaction.atomic)
+    def post(self, request, *args, **kwargs):
+        # contest row locked by Entry.clean() stays locked until the entry is saved
+        return super().post(request, *args, **kwargs)
+
     def get_success_url(self):
         next_url = self.request.POST.get("next")
         if next_url:
@@ -464,7 +494,10 @@ class AddPackageForPrinting(AddPackageView):
         return kwargs
 
     def get_success_url(self):
-        return reverse("contest:labels_print", kwargs={"package_id": self.object.id})
+        view = (
+            "contest:labels_pdf" if labels.pdf_available() else "contest:labels_print"
+        )
+        return reverse(view, kwargs={"package_id": self.object.id})
 
 
 class AddPackageOfDelivered(GroupRequiredMixin, AddPackageView):
@@ -503,12 +536,23 @@ class ProcessPackageDelivered(GroupRequiredMixin, UserOwnsPackageMixin, DeleteVi
 
     def get_success_url(self):
         contest = self.object.contest
-        brewers = set(self.object.entries.values_list("brewer", flat=True))
-        for brewer in brewers:
-            mail_entry_status_change(
-                self.object.entries.filter(brewer__id=brewer).all(), "RECEIVED"
+        with transaction.atomic():
+            self.object.entries.update(is_received=True)
+            emails = queue_entry_status_change(self.object.entries.all(), "RECEIVED")
+        # entries are marked as received even if notifications cannot be sent,
+        # failed ones stay in the outbox and are retried by `send_outbox`
+        try:
+            failed = OutboxEmail.objects.send_now(emails)[1]
+        except OSError as e:
+            logger.error(f"ProcessPackageDelivered: cannot connect: {e!r}")
+            failed = emails
+        if failed:
+            recipients = ", ".join(sorted({to for email in failed for to in email.to}))
+            messages.warning(
+                self.request,
+                _("Notifications could not be sent to: %(recipients)s")
+                % {"recipients": recipients},
             )
-        self.object.entries.update(is_received=True)
         return reverse("contest:delivery_select", args=(contest.slug,))
 
 
@@ -654,6 +698,39 @@ class PayUPaymentRedirectView(RedirectView):
         return reverse("contest:add_entry_contest", args=(self.kwargs["contest_slug"],))
 
 
+class PayUStatusRefreshView(LoginRequiredMixin, PendingPayUPaymentsMixin, TemplateView):
+    """
+    htmx widget - checks user's pending PayU payments on demand
+    """
+
+    template_name = "contest/widgets/payu_status.html"
+    # protects PayU from users clicking repeatedly
+    min_interval = timedelta(seconds=30)
+
+    @cached_property
+    def contest(self):
+        return get_object_or_404(Contest, slug=self.kwargs["slug"])
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["contest"] = self.contest
+        return context
+
+    def post(self, request, *args, **kwargs):
+        try:
+            changed = payu.update_user_payments_statuses(
+                request.user, self.contest, self.min_interval
+            )[1]
+        except requests.RequestException as e:
+            logger.warning(f"PayUStatusRefreshView: {e!r}")
+            changed = 0
+        response = self.get(request, *args, **kwargs)
+        if changed:
+            # entries statuses changed as well
+            response["HX-Refresh"] = "true"
+        return response
+
+
 @method_decorator(csrf_exempt, name="dispatch")
 class PayUNotificationView(View):
     def post(self, request, payment_id):
@@ -762,6 +839,30 @@ class LabelPrintoutView(LoginRequiredMixin, UserOwnsPackageMixin, TemplateView):
         return context
 
 
+class LabelsPdfView(LoginRequiredMixin, UserOwnsPackageMixin, View):
+    """
+    Labels of package entries as PDF, see contest.labels.
+    Falls back to HTML printout, when PDF cannot be generated.
+    """
+
+    def get(self, request, *args, **kwargs):
+        if not labels.pdf_available():
+            return redirect(
+                "contest:labels_print", package_id=self.kwargs["package_id"]
+            )
+        package = get_object_or_404(EntriesPackage, id=self.kwargs["package_id"])
+        file = TemporaryFile()
+        labels.render_labels(
+            labels.package_label_rows(package),
+            file,
+            barcodes=request.GET.get("barcodes") != "0",
+        )
+        file.seek(0)
+        return FileResponse(
+            file, filename=f"labels-{package.id}.pdf", content_type="application/pdf"
+        )
+
+
 class PaymentManagementView(GroupRequiredMixin, ListView):
     groups_required = ("payment_mgmt",)
     model = Payment
@@ -842,14 +943,25 @@ class JudgingListView(GroupRequiredMixin, ListView):
     groups_required = ("judge",)
 
     def get_queryset(self):
-        return (
+        entries = (
             Entry.objects.filter(is_received=True)
             .filter(is_paid=True)
             .filter(category__contest__slug=self.kwargs["slug"])
+        )
+        return (
+            judging.judge_entries(entries, self.request.user, self.kwargs["slug"])
             .select_related("category__style", "brewer")
+            .with_scoresheet()
             .order_by("category__style__name", "code")
         )
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["judging_table"] = JudgingTable.objects.filter(
+            contest__slug=self.kwargs["slug"], judges__user=self.request.user
+        ).first()
+        return context
+
 
 class ScoreSheetView(GroupRequiredMixin, DetailView):
     model = ScoreSheet
@@ -1084,6 +1196,17 @@ class ScoreSheetCreate(
     form_class = ScoreSheetForm
     groups_required = ("judge",)
 
+    def test_func(self):
+        # tests of the mixins do not chain, judges group is checked explicitly
+        if not (super().test_func() and GroupRequiredMixin.test_func(self)):
+            return False
+        # own entries and entries of other tables are not judged
+        return judging.judge_entries(
+            Entry.objects.filter(pk=self.kwargs["entry"]),
+            self.request.user,
+            self.get_contest().slug,
+        ).exists()
+
     def form_valid(self, form):
         form.instance.entry = get_object_or_404(Entry, pk=self.kwargs["entry"])
         return super().form_valid(form)
@@ -1102,36 +1225,19 @@ class ScoreSheetCreate(
         return Entry.objects.get(pk=self.kwargs["entry"]).category.contest
 
 
-class MedalsListView(ListView):
-    template_name = "contest/medal_list_by_style.html"
-    context_object_name = "entries"
-
-    def __init__(self, *args, **kwargs):
-        self.contest = None
-        super().__init__(*args, **kwargs)
+class MedalsListView(TemplateView):
+    """
+    Published results, rendered results are cached (see contest.cache)
+    """
 
-    def get_queryset(self):
-        return (
-            Entry.objects.filter(category__contest=self.contest)
-            # .filter(scoresheets__has_medal=True)
-            # .distinct()
-            .filter(place__gt=0)
-            .order_by("category__style__name", "brewer")
-            .select_related("brewer", "category__style")
-            .prefetch_related("scoresheets")
-        )
+    template_name = "contest/medal_list_by_style.html"
 
-    def dispatch(self, request, *args, **kwargs):
-        self.contest = Contest.objects.prefetch_related("bos_entry").get(
-            slug=self.kwargs["contest_slug"]
-        )
-        if not (self.contest and self.contest.show_results):
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        results = get_results(self.kwargs["contest_slug"], get_language())
+        if results is None:
             raise Http404
-        return super().dispatch(request, *args, **kwargs)
-
-    def get_context_data(self, *args, **kwargs):
-        context = super().get_context_data(*args, **kwargs)
-        context["best_of_show"] = self.contest.bos_entry
+        context["results"] = results
         return context
 
 
@@ -1191,21 +1297,15 @@ class JudgingFinalsListView(ContestJudgingFinalsMixin, GroupRequiredMixin, ListV
 
     def get_queryset(self):
         categories = (
-            Category.objects.filter(contest__slug=self.kwargs["slug"])
+            Category.objects.with_finals()
+            .filter(contest__slug=self.kwargs["slug"])
             .annotate(
-                finals_count=Count(
-                    Case(
-                        When(entries__scoresheets__final_round=True, then=1),
-                        output_field=IntegerField(),
-                    )
-                ),
                 entries_delivered=Count(
-                    Case(
-                        When(entries__is_paid=True, entries__is_received=True, then=1),
-                        output_field=IntegerField(),
-                    )
+                    "entries",
+                    filter=Q(entries__is_paid=True, entries__is_received=True),
                 ),
             )
+            .select_related("contest", "style")
             .prefetch_related(
                 Prefetch(
                     "entries",
@@ -1231,15 +1331,30 @@ class JudgingFinalsCategoryView(
         return reverse("contest:judging_finals_list", args=(self.kwargs["slug"],))
 
     def get_queryset(self):
-        finals = Category.objects.get(id=self.kwargs["category_id"]).entries_in_final
-        return Entry.objects.filter(id__in=finals)
+        return (
+            Entry.objects.filter(category_id=self.kwargs["category_id"])
+            .finalists()
+            .with_score()
+            .order_by("-score", "code")
+        )
 
     def get_contest(self) -> Contest:
         return Contest.objects.get(slug=self.kwargs["slug"])
 
     def get(self, request, *args, **kwargs):
+        formset = FinalEntriesFormset(queryset=self.get_queryset())
+        # places proposed by scores of the final round, judges decide ties
+        proposed = {
+            standing.entry_id: standing.proposed_place
+            for standing in ranking.standings(self.get_queryset()).get(
+                self.kwargs["category_id"], []
+            )
+        }
+        for form in formset:
+            if not form.instance.place and proposed.get(form.instance.pk):
+                form.initial["place"] = proposed[form.instance.pk]
         context = {
-            "formset": FinalEntriesFormset(queryset=self.get_queryset()),
+            "formset": formset,
             "style": Category.objects.get(id=self.kwargs["category_id"]).style.name,
         }
 
@@ -21,13 +21,23 @@ class RandomLocaleDjangoModelFactory(factory.django.DjangoModelFactory):
             _faker_cache[locale] = Faker(locale)
         return _faker_cache[locale]
 
-    @classmethod
-    def _create(cls, model_class, *args, **kwargs):
+    @staticmethod
+    def _exclude_factory_attributes(kwargs):
         """
-        Factory Boy classes do not inherit _meta.exclude, hence this override.
+        Factory Boy classes do not inherit _meta.exclude, hence this helper.
         It ensures Factory level attributes are not passed to the model.
         """
         exclude = ("faker", "_locale")
         for item in exclude:
             kwargs.pop(item, None)
+        return kwargs
+
+    @classmethod
+    def _create(cls, model_class, *args, **kwargs):
+        kwargs = cls._exclude_factory_attributes(kwargs)
         return super()._create(model_class, *args, **kwargs)
+
+    @classmethod
+    def _build(cls, model_class, *args, **kwargs):
+        kwargs = cls._exclude_factory_attributes(kwargs)
+        return super()._build(model_class, *args, **kwargs)
@@ -0,0 +1,320 @@
+"""
+PostgreSQL backups used by backup_database.py and restore_database.py.
+
+Backup is a directory with pg_dump output (directory format dumped by parallel
+jobs, or a single custom format file) and manifest.json with checksums
+and timings. Compression is done by pg_dump itself, Python never reads
+the dumped data except for computing checksums (as bytes, in chunks).
+"""
+
+import hashlib
+import json
+import os
+import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from time import perf_counter
+
+MANIFEST = "manifest.json"
+MANIFEST_VERSION = 1
+CHECKSUM_CHUNK_SIZE = 1024 * 1024
+
+# backup format -> (pg_dump --format, name of the output inside the backup)
+FORMATS = {
+    "directory": ("d", "data"),
+    "custom": ("c", "database.dump"),
+}
+COMPRESSIONS = ("zstd", "gzip", "none")
+
+
+class BackupError(Exception):
+    pass
+
+
+def connection_args(db_config) -> list[str]:
+    """
+    pg_dump / pg_restore / psql connection options for django-environ `env.db()`.
+    """
+    args = []
+    for option, key in (("-U", "USER"), ("-h", "HOST"), ("-p", "PORT")):
+        if db_config.get(key):
+            args += [option, str(db_config[key])]
+    return args + ["-d", db_config["NAME"]]
+
+
+def connection_env(db_config) -> dict:
+    env = os.environ.copy()
+    if db_config.get("PASSWORD"):
+        env["PGPASSWORD"] = db_config["PASSWORD"]
+    return env
+
+
+def schema_name(db_config) -> str | None:
+    # schema is set as `options=-c search_path=<schema>` in DATABASE_URL
+    options = db_config.get("OPTIONS", {}).get("options", "")
+    match = re.search(r"search_path=([\w$]+)", options)
+    return match.group(1) if match else None
+
+
+def pg_version(program="pg_dump") -> int:
+    """
+    Major version of the PostgreSQL client program.
+    """
+    try:
+        output = subprocess.run(
+            [program, "--version"], check=True, capture_output=True, text=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise BackupError(f"{program} is not available: {e}")
+    return int(re.search(r"(\d+)", output).group(1))
+
+
+def default_compression(version) -> str:
+    # zstd needs pg_dump 16 or newer
+    return "zstd" if version >= 16 else "gzip"
+
+
+def compress_option(compression, level=None, version=16) -> str:
+    """
+    pg_dump --compress value. zstd needs pg_dump 16 or newer,
+    older versions accept gzip level only. No compression given means
+    the best one supported by the version.
+    """
+    if compression is None:
+        compression = default_compression(version)
+    if compression not in COMPRESSIONS:
+        raise BackupError(f"Unknown compression: {compression}")
+    if compression == "none":
+        return "0"
+    if version < 16:
+        if compression != "gzip":
+            raise BackupError(f"{compression} compression needs pg_dump 16 or newer")
+        return str(6 if level is None else level)
+    return compression if level is None else f"{compression}:{level}"
+
+
+def file_checksum(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(CHECKSUM_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def backup_files(backup_dir) -> list[str]:
+    """
+    Paths of dumped files relative to the backup directory, manifest excluded.
+    """
+    paths = []
+    for root, _dirs, files in os.walk(backup_dir):
+        for name in files:
+            path = os.path.relpath(os.path.join(root, name), backup_dir)
+            if path != MANIFEST:
+                paths.append(path.replace(os.sep, "/"))
+    return sorted(paths)
+
+
+def checksums(backup_dir, jobs=1) -> dict:
+    """
+    {relative path: {"size": bytes, "sha256": hex digest}} of dumped files.
+    hashlib releases GIL on large chunks, so files are hashed in threads.
+    """
+    paths = backup_files(backup_dir)
+
+    def describe(path):
+        full_path = os.path.join(backup_dir, path)
+        return path, {
+            "size": os.path.getsize(full_path),
+            "sha256": file_checksum(full_path),
+        }
+
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        return dict(executor.map(describe, paths))
+
+
+def write_manifest(backup_dir, manifest):
+    with open(os.path.join(backup_dir, MANIFEST), "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2)
+
+
+def read_manifest(backup_dir) -> dict:
+    path = os.path.join(backup_dir, MANIFEST)
+    try:
+        with open(path, encoding="utf-8") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError) as e:
+        raise BackupError(f"Cannot read manifest {path}: {e}")
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise BackupError(f"Unsupported manifest version: {manifest.get('version')}")
+    return manifest
+
+
+def verify(backup_dir, manifest, jobs=1):
+    """
+    Raises BackupError when dumped files differ from the manifest.
+    """
+    actual = checksums(backup_dir, jobs)
+    expected = manifest["files"]
+    missing = expected.keys() - actual.keys()
+    unexpected = actual.keys() - expected.keys()
+    changed = [
+        path
+        for path in expected.keys() & actual.keys()
+        if expected[path] != actual[path]
+    ]
+    problems = [
+        f"{label}: {', '.join(sorted(paths))}"
+        for label, paths in (
+            ("missing", missing),
+            ("unexpected", unexpected),
+            ("changed", changed),
+        )
+        if paths
+    ]
+    if problems:
+        raise BackupError(f"Backup {backup_dir} is damaged ({'; '.join(problems)})")
+
+
+def run(cmd, env):
+    try:
+        subprocess.run(cmd, check=True, env=env)
+    except OSError as e:
+        raise BackupError(f"{cmd[0]} is not available: {e}")
+    except subprocess.CalledProcessError as e:
+        raise BackupError(f"{cmd[0]} failed with exit code {e.returncode}")
+
+
+def backup(
+    db_config,
+    backup_root,
+    backup_format="directory",
+    compression=None,
+    level=None,
+    jobs=None,
+) -> str:
+    """
+    Dumps the database (its schema, when set in DATABASE_URL options)
+    to a new directory in `backup_root`, returns path of the backup.
+    """
+    if backup_format not in FORMATS:
+        raise BackupError(f"Unknown format: {backup_format}")
+    jobs = jobs or os.cpu_count() or 1
+    version = pg_version("pg_dump")
+    compress = compress_option(compression, level, version)
+    started_at = datetime.now()
+    backup_dir = os.path.join(
+        backup_root, f"backup_{started_at.strftime('%Y-%m-%d_%H%M%S')}"
+    )
+    os.makedirs(backup_dir)
+
+    format_option, output = FORMATS[backup_format]
+    cmd = [
+        "pg_dump",
+        *connection_args(db_config),
+        f"--format={format_option}",
+        f"--compress={compress}",
+        f"--file={os.path.join(backup_dir, output)}",
+    ]
+    # only the directory format can be dumped by parallel jobs
+    if backup_format == "directory":
+        cmd.append(f"--jobs={jobs}")
+    schema = schema_name(db_config)
+    if schema:
+        cmd += ["-n", schema]
+
+    start = perf_counter()
+    run(cmd, connection_env(db_config))
+    dump_time = perf_counter() - start
+    start = perf_counter()
+    files = checksums(backup_dir, jobs)
+    checksum_time = perf_counter() - start
+
+    write_manifest(
+        backup_dir,
+        {
+            "version": MANIFEST_VERSION,
+            "created_at": started_at.isoformat(timespec="seconds"),
+            "database": db_config["NAME"],
+            "schema": schema,
+            "format": backup_format,
+            "output": output,
+            "compression": compress,
+            "jobs": jobs if backup_format == "directory" else 1,
+            "pg_dump_version": version,
+            "timings": {
+                "dump": round(dump_time, 3),
+                "checksums": round(checksum_time, 3),
+            },
+            "size": sum(file["size"] for file in files.values()),
+            "files": files,
+        },
+    )
+    return backup_dir
+
+
+def drop_schema(db_config, schema):
+    run(
+        [
+            "psql",
+            *connection_args(db_config),
+            "-v",
+            "ON_ERROR_STOP=1",
+            "-c",
+            f'DROP SCHEMA IF EXISTS "{schema}" CASCADE;',
+        ],
+        connection_env(db_config),
+    )
+
+
+def restore(db_config, backup_dir, jobs=None, check=True) -> dict:
+    """
+    Restores the backup written by `backup()` with parallel pg_restore jobs.
+    The schema is dropped first. Returns timings of the steps.
+    """
+    manifest = read_manifest(backup_dir)
+    jobs = jobs or os.cpu_count() or 1
+    timings = {}
+    if check:
+        start = perf_counter()
+        verify(backup_dir, manifest, jobs)
+        timings["verify"] = perf_counter() - start
+
+    schema = schema_name(db_config) or manifest["schema"]
+    start = perf_counter()
+    if schema:
+        drop_schema(db_config, schema)
+    cmd = [
+        "pg_restore",
+        *connection_args(db_config),
+        f"--jobs={jobs}",
+        "--no-owner",
+        "--exit-on-error",
+        os.path.join(backup_dir, manifest["output"]),
+    ]
+    if not schema:
+        cmd[-1:-1] = ["--clean", "--if-exists"]
+    run(cmd, connection_env(db_config))
+    timings["restore"] = perf_counter() - start
+    return timings
+
+
+def restore_plain(db_config, backup_file):
+    """
+    Restores gzipped plain SQL backup written by the former backup script.
+    Decompression and psql run in separate processes connected by a pipe.
+    """
+    env = connection_env(db_config)
+    schema = schema_name(db_config)
+    if schema:
+        drop_schema(db_config, schema)
+    with subprocess.Popen(
+        ["psql", *connection_args(db_config), "-v", "ON_ERROR_STOP=1"],
+        stdin=subprocess.PIPE,
+        env=env,
+    ) as psql:
+        gunzip = subprocess.run(["gzip", "-dc", backup_file], stdout=psql.stdin)
+        psql.stdin.close()
+        psql.wait()
+    if gunzip.returncode or psql.returncode:
+        raise BackupError(f"Restoring {backup_file} failed")
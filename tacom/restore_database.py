@@ -1,8 +1,9 @@
+import argparse
 import os
-import subprocess
 import sys
 
 import environ
+from pgbackup import BackupError, restore, restore_plain
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -11,72 +12,38 @@ env.read_env(env_file=f"{SCRIPT_DIR}/tacom/.env")
 
 backup_dir = "db_backup"
 
-if len(sys.argv) != 2:
-    print("Usage: python restore_database.py <backup_file.gz>")
-    sys.exit(1)
-
-backup_file = sys.argv[1]
-backup_path = os.path.join(SCRIPT_DIR, backup_dir, backup_file)
-
+parser = argparse.ArgumentParser(
+    description="Drop the database schema and restore it from a backup. "
+    "Backups written by the former script (plain SQL .gz files) are restored by psql."
+)
+parser.add_argument("backup", help="Backup directory or file in db_backup (or a path)")
+parser.add_argument(
+    "-j", "--jobs", type=int, help="Parallel pg_restore jobs (CPU count by default)"
+)
+parser.add_argument(
+    "--no-verify", action="store_true", help="Skip checking files against manifest"
+)
+args = parser.parse_args()
+
+backup_path = args.backup
 if not os.path.exists(backup_path):
-    print(f"Backup file not found: {backup_path}")
+    backup_path = os.path.join(SCRIPT_DIR, backup_dir, args.backup)
+if not os.path.exists(backup_path):
+    print(f"Backup not found: {args.backup}")
     sys.exit(1)
 
 db_config = env.db()
-schema_name = db_config["OPTIONS"]["options"].split("=")[1]
-
-env_vars = os.environ.copy()
-env_vars["PGPASSWORD"] = db_config["PASSWORD"]
-
-
-def run_psql_command(sql):
-    subprocess.run(
-        [
-            "psql",
-            "-U",
-            db_config["USER"],
-            "-h",
-            db_config["HOST"],
-            "-p",
-            str(db_config["PORT"]),
-            "-d",
-            db_config["NAME"],
-            "-v",
-            "ON_ERROR_STOP=1",
-            "-c",
-            sql,
-        ],
-        check=True,
-        env=env_vars,
-        text=True,
-    )
-
-
-# 1. Drop schema if it exists
-print(f"Dropping schema '{schema_name}'...")
-run_psql_command(f"DROP SCHEMA IF EXISTS {schema_name} CASCADE;")
-
-# 2. Restore backup (ignore ownership / run as current user)
-print(f"Restoring from backup '{backup_file}'...")
-with subprocess.Popen(
-    [
-        "psql",
-        "-U",
-        db_config["USER"],
-        "-h",
-        db_config["HOST"],
-        "-p",
-        str(db_config["PORT"]),
-        "-d",
-        db_config["NAME"],
-        "-v",
-        "ON_ERROR_STOP=1",
-    ],  # <- ignore role/ownership from dump
-    stdin=subprocess.PIPE,
-    env=env_vars,
-) as psql_proc:
-    subprocess.run(["gzip", "-dc", backup_path], stdout=psql_proc.stdin, check=True)
-    psql_proc.stdin.close()
-    psql_proc.wait()
+print(f"Restoring from backup '{backup_path}'...")
+try:
+    if os.path.isdir(backup_path):
+        timings = restore(
+            db_config, backup_path, jobs=args.jobs, check=not args.no_verify
+        )
+        print(", ".join(f"{step} {time:.1f} s" for step, time in timings.items()))
+    else:
+        restore_plain(db_config, backup_path)
+except BackupError as e:
+    print(e, file=sys.stderr)
+    sys.exit(1)
 
 print("Database schema dropped and backup restored successfully.")
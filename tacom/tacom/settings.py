@@ -114,10 +114,23 @@ if env("DB_USE_SQLITE", default=True):
             "NAME": BASE_DIR / "db.sqlite3",
         }
     }
+    DEFAULT_CACHE_URL = "locmemcache://"
 else:
     DATABASES = {
         "default": env.db(),
     }
+    # table created by migrations (or `manage.py createcachetable`)
+    DEFAULT_CACHE_URL = "dbcache://django_cache"
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Cached results and users' groups are invalidated by signals in the process
+# changing them, so the cache has to be shared by all web workers
+# and management commands (`manage.py check --deploy` warns if it is not).
+
+CACHES = {
+    "default": env.cache("CACHE_URL", default=DEFAULT_CACHE_URL),
+}
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -296,6 +309,10 @@ else:
 # Countries
 COUNTRIES_FIRST = ["PL"]
 
+# Labels, path to TrueType font with Polish characters used in PDF labels
+# (labels are printed from HTML if not set)
+LABELS_FONT = env("LABELS_FONT", default=None)
+
 # PayU
 PAYU_POS_ID = env("PAYU_POS_ID")
 PAYU_MD5 = env("PAYU_MD5")